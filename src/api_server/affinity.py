@@ -0,0 +1,74 @@
+import contextlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger("app")
+
+# Set by `serve` for the worker processes it launches, so that only supervised workers pin themselves to CPUs
+SUPERVISED_WORKERS_ENV = "API_SERVER_WORKERS"
+
+# Slot lock held for the lifetime of the worker process. The OS releases it when the process dies, so a worker
+# restarted by the supervisor takes over the slot (and CPUs) of the one it replaces.
+_slot_lock: IO[str] | None = None
+
+
+def claim_worker_slot(n_slots: int, group: str) -> int | None:
+    """Claims the first free worker slot in [0, n_slots) among processes sharing the same group."""
+    global _slot_lock
+
+    if fcntl is None:
+        return None
+
+    lock_dir = Path(tempfile.gettempdir())
+    for slot in range(n_slots):
+        with contextlib.ExitStack() as stack:
+            lock_file = stack.enter_context(
+                open(lock_dir / f"api_server-{group}-slot-{slot}.lock", "w")
+            )
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue
+            # Claimed, so the file stays open (and locked) after the with block
+            stack.pop_all()
+        _slot_lock = lock_file
+        return slot
+
+    return None
+
+
+def cpus_for_slot(slot: int, n_slots: int, cpus: list[int]) -> set[int]:
+    """Splits cpus into n_slots contiguous groups and returns the group of slot (wrapping if slots outnumber CPUs)."""
+    if n_slots >= len(cpus):
+        return {cpus[slot % len(cpus)]}
+    per_slot = len(cpus) // n_slots
+    return set(cpus[slot * per_slot : (slot + 1) * per_slot])
+
+
+def pin_worker_to_cpus(n_workers: int) -> set[int] | None:
+    """
+    Pins the calling worker process to its share of the CPUs available to the server.
+
+    Workers of the same server are grouped by their parent (supervisor) process id. Returns the pinned CPUs, or None
+    when pinning is not supported on this platform.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+
+    slot = claim_worker_slot(n_workers, group=str(os.getppid()))
+    if slot is None:
+        logger.warning("WARN: No free worker slot found. Worker is not pinned.")
+        return None
+
+    cpus = cpus_for_slot(slot, n_workers, sorted(os.sched_getaffinity(0)))
+    os.sched_setaffinity(0, cpus)
+    logger.info(f"Worker slot {slot} pinned to CPUs {sorted(cpus)}.")
+    return cpus
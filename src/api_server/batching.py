@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any
+
+from .executor import ExecutorSaturatedError
+from .metrics import Histogram
+
+logger = logging.getLogger("app")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class MicroBatcher[T]:
+    """
+    Collects concurrent single-record predictions on an asyncio queue and scores them together.
+
+    A batch is flushed as soon as it holds max_batch_size records or max_wait_ms has passed since its first record
+    arrived, whichever comes first. Every caller then receives the result (e.g. the probability) of its own record.
+    At most max_queue_size records wait for a batch, further ones are rejected with ExecutorSaturatedError.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[Sequence[Any]], Awaitable[Sequence[T]]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_size: int = 1024,
+    ) -> None:
+        self._predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[tuple[Any, asyncio.Future[T]]] = asyncio.Queue(
+            max_queue_size
+        )
+        self._task: asyncio.Task[None] | None = None
+
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    async def submit(self, record: Any) -> T:
+        """Queues a record for the next batch and waits for its result."""
+        if self._task is None:
+            raise RuntimeError("Micro-batcher is not running")
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self.queue_depth.observe(self._queue.qsize())
+        try:
+            self._queue.put_nowait((record, future))
+        except asyncio.QueueFull as e:
+            raise ExecutorSaturatedError("Micro-batch queue is full") from e
+        return await future
+
+    async def _collect(self) -> list[tuple[Any, asyncio.Future[T]]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            # Callers that went away (e.g. client disconnects) don't need scoring
+            batch = [(r, f) for r, f in batch if not f.done()]
+            if not batch:
+                continue
+
+            self.batch_size.observe(len(batch))
+
+            try:
+                results = await self._predict([r for r, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(
+                        f"Micro-batch prediction returned {len(results)} results for {len(batch)} records"
+                    )
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.exception("ERROR: Micro-batch prediction failed due to error")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results, strict=True):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_size": self._queue.qsize(),
+            "batch_size": self.batch_size.snapshot(),
+            "queue_depth": self.queue_depth.snapshot(),
+        }
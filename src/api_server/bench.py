@@ -0,0 +1,261 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+import numpy as np
+import pandas as pd
+from colorama import Fore, Style, init
+
+from utils import get_data_dir
+
+from .settings import load_settings
+
+init()
+
+PERCENTILES = {"p50": 50.0, "p90": 90.0, "p99": 99.0, "p99.9": 99.9}
+
+
+@dataclass
+class BenchmarkResults:
+    latencies_s: list[float] = field(default_factory=list)
+    status_codes: Counter[str] = field(default_factory=Counter)
+    errors: int = 0
+
+
+def build_payloads(rows: list[dict[str, Any]], batch_size: int) -> list[bytes]:
+    """Pre-serializes the request bodies, one customer each, or batch_size customers each for the batch endpoint."""
+    if batch_size <= 1:
+        return [json.dumps(row).encode() for row in rows]
+    return [
+        json.dumps(rows[start : start + batch_size]).encode()
+        for start in range(0, len(rows), batch_size)
+    ]
+
+
+def summarize(
+    results: BenchmarkResults,
+    elapsed_s: float,
+    records_per_request: int,
+    config: dict[str, Any],
+) -> dict[str, Any]:
+    """Reduces the raw measurements to throughput, error rate and latency percentiles (in milliseconds)."""
+    requests = len(results.latencies_s)
+    latencies_ms = np.asarray(results.latencies_s) * 1000
+    successes = results.status_codes.get("200", 0)
+
+    latency_ms: dict[str, float | None] = dict.fromkeys(
+        ["mean", *PERCENTILES, "max"], None
+    )
+    if requests:
+        latency_ms["mean"] = float(latencies_ms.mean())
+        for name, q in PERCENTILES.items():
+            latency_ms[name] = float(np.percentile(latencies_ms, q))
+        latency_ms["max"] = float(latencies_ms.max())
+
+    return {
+        **config,
+        "duration_s": elapsed_s,
+        "requests": requests,
+        "errors": results.errors,
+        "error_rate": (requests - successes) / requests if requests else 0.0,
+        "status_codes": dict(sorted(results.status_codes.items())),
+        "throughput_rps": requests / elapsed_s if elapsed_s else 0.0,
+        "records_per_s": successes * records_per_request / elapsed_s
+        if elapsed_s
+        else 0.0,
+        "latency_ms": latency_ms,
+    }
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    path: str,
+    payload: bytes,
+    started: float,
+    results: BenchmarkResults,
+) -> None:
+    try:
+        response = await client.post(
+            path, content=payload, headers={"Content-Type": "application/json"}
+        )
+        results.status_codes[str(response.status_code)] += 1
+    except httpx.HTTPError as e:
+        results.status_codes[type(e).__name__] += 1
+        results.errors += 1
+    results.latencies_s.append(time.perf_counter() - started)
+
+
+async def run_benchmark(
+    base_url: str,
+    path: str,
+    payloads: list[bytes],
+    concurrency: int,
+    duration_s: float,
+    rps: float | None = None,
+    timeout_s: float = 10.0,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> tuple[BenchmarkResults, float]:
+    """
+    Replays the payloads round-robin for duration_s over at most concurrency pooled keep-alive connections.
+
+    Without a target rps, concurrency clients send requests back to back (closed loop). With one, requests are
+    started on a fixed schedule (open loop) and their latency counts from their scheduled start, so that a slow
+    server isn't hidden by requests that couldn't be sent on time. Returns the measurements and the elapsed time.
+    """
+    results = BenchmarkResults()
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout_s, transport=transport
+    ) as client:
+        start = time.perf_counter()
+        deadline = start + duration_s
+
+        if rps is None:
+
+            async def closed_loop_client(offset: int) -> None:
+                i = offset
+                while time.perf_counter() < deadline:
+                    await _send(
+                        client,
+                        path,
+                        payloads[i % len(payloads)],
+                        time.perf_counter(),
+                        results,
+                    )
+                    i += concurrency
+
+            await asyncio.gather(*(closed_loop_client(c) for c in range(concurrency)))
+        else:
+            slots = asyncio.Semaphore(concurrency)
+
+            async def scheduled(payload: bytes, scheduled_at: float) -> None:
+                async with slots:
+                    await _send(client, path, payload, scheduled_at, results)
+
+            tasks = []
+            i = 0
+            while (scheduled_at := start + i / rps) < deadline:
+                await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+                tasks.append(
+                    asyncio.create_task(
+                        scheduled(payloads[i % len(payloads)], scheduled_at)
+                    )
+                )
+                i += 1
+            await asyncio.gather(*tasks)
+
+        elapsed_s = time.perf_counter() - start
+
+    return results, elapsed_s
+
+
+def main() -> None:
+    settings = load_settings()
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the term subscription prediction endpoints with replayed dataset rows."
+    )
+    parser.add_argument("--host", default=settings.HOST, help="API server address.")
+    parser.add_argument(
+        "--port", type=int, default=settings.PORT, help="API server port."
+    )
+    parser.add_argument(
+        "--endpoint",
+        choices=["predict", "batch"],
+        default="predict",
+        help="Benchmark /predict or /predict/batch.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Customers per request to /predict/batch.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Concurrent requests (and keep-alive connections).",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        help="Target requests per second. Without it, requests are sent back to back.",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="Duration in seconds."
+    )
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=1.0,
+        help="Seconds of unmeasured load sent before the benchmark.",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=10.0, help="Request timeout in seconds."
+    )
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+
+    args = parser.parse_args()
+
+    df = pd.read_csv(get_data_dir() / "dataset.csv", sep=";")
+    rows = json.loads(df.drop(columns=["y"]).to_json(orient="records"))
+    batch_size = args.batch_size if args.endpoint == "batch" else 1
+    payloads = build_payloads(rows, batch_size)
+    path = "/predict/batch" if args.endpoint == "batch" else "/predict"
+    base_url = f"http://{args.host}:{args.port}"
+
+    # Only the JSON report goes to stdout
+    print(
+        Fore.GREEN
+        + f"Benchmarking {base_url}{path} for {args.duration}s"
+        + Style.RESET_ALL,
+        file=sys.stderr,
+    )
+    if args.warmup > 0:
+        asyncio.run(
+            run_benchmark(
+                base_url, path, payloads, args.concurrency, args.warmup, args.rps
+            )
+        )
+    results, elapsed_s = asyncio.run(
+        run_benchmark(
+            base_url,
+            path,
+            payloads,
+            args.concurrency,
+            args.duration,
+            args.rps,
+            args.timeout,
+        )
+    )
+
+    report = summarize(
+        results,
+        elapsed_s,
+        batch_size,
+        {
+            "url": f"{base_url}{path}",
+            "concurrency": args.concurrency,
+            "target_rps": args.rps,
+            "batch_size": batch_size,
+        },
+    )
+    report_json = json.dumps(report, indent=2)
+    print(report_json)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import hashlib
+import importlib
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from pydantic import BaseModel
+
+
+class CacheBackend(Protocol):
+    """
+    Shared cache (e.g. Redis or memcached) consulted after the in-process cache misses.
+
+    Its methods are coroutines, so that a remote backend's network round trips don't block the event loop.
+    """
+
+    async def get(self, key: str) -> float | None: ...
+
+    async def set(self, key: str, value: float, ttl_s: float) -> None: ...
+
+
+class LocalSharedBackend:
+    """In-process stand-in for a shared backend, for tests and single-process development."""
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[float, float]] = {}
+
+    async def get(self, key: str) -> float | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: float, ttl_s: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_s, value)
+
+
+def load_cache_backend(import_path: str) -> CacheBackend:
+    """Creates a shared backend from a "module:factory" import path."""
+    module_name, _, factory_name = import_path.partition(":")
+    if not factory_name:
+        raise ValueError(
+            f"Cache backend must be given as 'module:factory', got '{import_path}'"
+        )
+    backend: CacheBackend = getattr(
+        importlib.import_module(module_name), factory_name
+    )()
+    return backend
+
+
+class PredictionCache:
+    """
+    LRU cache with TTL of prediction probabilities, keyed on the model version and a hash of the request.
+
+    The request is hashed once from its JSON dump, whose field order is fixed by the model definition. Because the
+    key includes the version of the model that produced the entry, entries of a previous model artifact are never
+    served once a new one is loaded; they age out of the LRU order.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_s: float,
+        shared_backend: CacheBackend | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.shared_backend = shared_backend
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def request_digest(data: BaseModel) -> str:
+        return hashlib.blake2b(
+            data.model_dump_json().encode(), digest_size=16
+        ).hexdigest()
+
+    @staticmethod
+    def key(request_digest: str, model_version: str) -> str:
+        return f"{model_version}:{request_digest}"
+
+    async def get(self, key: str) -> float | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        if self.shared_backend is not None:
+            shared_value = await self.shared_backend.get(key)
+            if shared_value is not None:
+                self.shared_hits += 1
+                self._store(key, shared_value)
+                return shared_value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: float) -> None:
+        self._store(key, value)
+        if self.shared_backend is not None:
+            await self.shared_backend.set(key, value, self.ttl_s)
+
+    def _store(self, key: str, value: float) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
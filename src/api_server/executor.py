@@ -0,0 +1,136 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Literal
+
+import numpy as np
+
+from .inference import Predictor, load_predictor
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the inference executor already holds its maximum number of pending tasks."""
+
+
+class InferenceTimeoutError(Exception):
+    """Raised when an inference task does not finish within the configured timeout."""
+
+
+# Predictor owned by each process pool worker, built once by the pool initializer, and the time it took to load
+_process_predictor: Predictor | None = None
+_process_load_time_s = 0.0
+
+
+def _init_process_worker(*load_predictor_args: Any) -> None:
+    global _process_predictor, _process_load_time_s
+    start = time.perf_counter()
+    _process_predictor = load_predictor(*load_predictor_args)
+    _process_load_time_s = time.perf_counter() - start
+
+
+def _process_predictor_info() -> tuple[str, float]:
+    return type(_process_predictor).__name__, _process_load_time_s
+
+
+def _process_predict_proba(records: Sequence[Any]) -> np.ndarray:
+    if _process_predictor is None:
+        raise RuntimeError("Process worker predictor not initialized")
+    return np.asarray(_process_predictor.predict_proba(records))
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model inference off the event loop with bounded concurrency.
+
+    At most max_workers tasks run at once and at most max_pending are accepted (running or queued). Further tasks
+    are rejected with ExecutorSaturatedError so callers can shed load instead of queueing without limit.
+    """
+
+    def __init__(
+        self,
+        kind: Literal["thread", "process"],
+        max_workers: int,
+        max_pending: int,
+        timeout_s: float,
+        process_init_args: tuple[Any, ...] | None = None,
+    ) -> None:
+        self.kind = kind
+        self.max_workers = max_workers
+        self.timeout_s = timeout_s
+        self._slots = threading.BoundedSemaphore(max(max_pending, max_workers))
+
+        self._pool: concurrent.futures.Executor
+        if kind == "thread":
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="inference"
+            )
+        elif kind == "process":
+            if process_init_args is None:
+                raise ValueError(
+                    "A process pool needs the load_predictor arguments of its workers"
+                )
+            # Spawn rather than fork: forking a process running XGBoost/OpenMP threads can deadlock the child
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=process_init_args,
+            )
+        else:
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+    def worker_predictor_info(self, timeout_s: float) -> tuple[str, float]:
+        """
+        Starts a process worker if none is running yet, and returns the type name of its predictor and the time it
+        took to load.
+
+        Raises BrokenProcessPool if the worker failed to load the model.
+        """
+        if self.kind != "process":
+            raise ValueError("Only process pool workers load their own predictor")
+        return self._pool.submit(_process_predictor_info).result(timeout_s)
+
+    async def predict_proba(
+        self,
+        predictor: Predictor | None,
+        records: Sequence[Any],
+        timeout_s: float | None = None,
+    ) -> np.ndarray:
+        """
+        Scores records in the pool. Process workers use their own copy of the model instead of predictor.
+
+        timeout_s overrides the executor's timeout for this task.
+        """
+        if timeout_s is None:
+            timeout_s = self.timeout_s
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturatedError("Inference executor is saturated")
+
+        try:
+            if self.kind == "thread":
+                if predictor is None:
+                    raise ValueError("A thread pool needs the predictor to run")
+                future = self._pool.submit(predictor.predict_proba, records)
+            else:
+                future = self._pool.submit(_process_predict_proba, list(records))
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the task really finishes, even if the caller times out before that
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return np.asarray(
+                await asyncio.wait_for(asyncio.wrap_future(future), timeout_s)
+            )
+        except TimeoutError as e:
+            future.cancel()
+            raise InferenceTimeoutError(
+                f"Inference did not finish within {timeout_s}s"
+            ) from e
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=cancel_futures)
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, Protocol
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from utils import encode_binary_columns
+from utils.compiled import CompiledPipeline
+
+from .metrics import stage_latency
+
+if TYPE_CHECKING:
+    from utils.onnx_model import OnnxPipeline
+
+logger = logging.getLogger("app")
+
+
+class Predictor(Protocol):
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        """Returns the positive class probability for each record."""
+        ...
+
+
+class SklearnPredictor:
+    """Scores records through the original sklearn pipeline via a DataFrame with the training column order."""
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        training_features: list[str],
+        binary_features: list[str],
+    ) -> None:
+        self.pipeline = pipeline
+        self.training_features = training_features
+        self.binary_features = binary_features
+
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        # Use training_features persisted together with the trained pipeline to construct a data frame with the same
+        # column order as the training data
+        with stage_latency.time("dataframe"):
+            # Built column by column from the validated models' attributes, without dumping each of them to a dict
+            input_df = pd.DataFrame(
+                {
+                    feature: [getattr(r, feature) for r in records]
+                    for feature in self.training_features
+                },
+                columns=self.training_features,
+            )
+        with stage_latency.time("encode_binary"):
+            input_df = encode_binary_columns(input_df, self.binary_features)
+        # Run the pipeline step by step (as Pipeline.predict_proba does) to time the preprocessing separately
+        with stage_latency.time("transform"):
+            features = self.pipeline[:-1].transform(input_df)
+        with stage_latency.time("predict"):
+            return np.asarray(self.pipeline[-1].predict_proba(features)[:, 1])
+
+
+class CompiledPredictor:
+    """Scores records through a CompiledPipeline."""
+
+    def __init__(self, pipeline: CompiledPipeline) -> None:
+        self.pipeline = pipeline
+
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        with stage_latency.time("transform"):
+            matrix = self.pipeline.transform(records)
+        with stage_latency.time("predict"):
+            return self.pipeline.predict_matrix(matrix)
+
+
+class OnnxPredictor:
+    """Scores records through the ONNX export of the pipeline with ONNX Runtime on CPU."""
+
+    def __init__(self, pipeline: "OnnxPipeline") -> None:
+        self.pipeline = pipeline
+
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        with stage_latency.time("transform"):
+            inputs = self.pipeline.inputs(records)
+        with stage_latency.time("predict"):
+            return self.pipeline.predict_inputs(inputs)
+
+
+def set_xgb_nthread(pipeline: Pipeline, nthread: int) -> None:
+    """Limits the threads XGBoost uses for inference, so that several workers don't oversubscribe the CPUs."""
+    pipeline.named_steps["classifier"].set_params(n_jobs=nthread)
+
+
+def build_predictor(
+    backend: str,
+    pipeline: Pipeline,
+    training_features: list[str],
+    binary_features: list[str],
+) -> Predictor:
+    """Creates the predictor for the configured inference backend, falling back to the sklearn pipeline."""
+    if backend == "compiled":
+        try:
+            return CompiledPredictor(
+                CompiledPipeline.from_pipeline(pipeline, binary_features)
+            )
+        except (TypeError, ValueError, KeyError, AttributeError):
+            logger.warning(
+                "WARN: Failed to compile model pipeline. Falling back to sklearn inference.",
+                exc_info=True,
+            )
+    elif backend == "onnx":
+        raise ValueError("The onnx backend can only serve ONNX model artifacts")
+    elif backend != "sklearn":
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    return SklearnPredictor(pipeline, training_features, binary_features)
+
+
+def load_predictor(
+    model_format: str,
+    model_path: Path,
+    backend: str,
+    training_features: list[str],
+    binary_features: list[str],
+    mmap: bool = True,
+    xgb_nthread: int = 0,
+) -> Predictor:
+    """
+    Loads the model artifact and creates its predictor.
+
+    "joblib" artifacts are the pickled sklearn pipeline, "flat" artifacts the directory written by
+    CompiledPipeline.save, which can only be served by the compiled backend, and "onnx" artifacts the graph written
+    by OnnxPipeline.save, which can only be served by the onnx backend.
+    """
+    mmap_mode: Literal["r"] | None = "r" if mmap else None
+
+    if model_format == "flat":
+        if backend != "compiled":
+            raise ValueError(
+                "Flat model artifacts can only be served by the compiled backend"
+            )
+        return CompiledPredictor(
+            CompiledPipeline.load(model_path, mmap_mode=mmap_mode, nthread=xgb_nthread)
+        )
+    elif model_format == "onnx":
+        if backend != "onnx":
+            raise ValueError(
+                "ONNX model artifacts can only be served by the onnx backend"
+            )
+        # Imported here as onnxruntime is an optional dependency
+        from utils.onnx_model import OnnxPipeline
+
+        return OnnxPredictor(OnnxPipeline.load(model_path, nthread=xgb_nthread))
+    elif model_format != "joblib":
+        raise ValueError(f"Unknown model format: {model_format}")
+
+    pipeline = joblib.load(model_path, mmap_mode=mmap_mode)
+    if xgb_nthread > 0:
+        set_xgb_nthread(pipeline, xgb_nthread)
+    return build_predictor(backend, pipeline, training_features, binary_features)
+
+
+def compute_model_version(model_path: Path) -> str:
+    """Fingerprints a model artifact (a file, or every file of a flat artifact directory) from its contents."""
+    digest = hashlib.sha256()
+    files = sorted(model_path.iterdir()) if model_path.is_dir() else [model_path]
+    for file in files:
+        digest.update(file.name.encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()[:12]
@@ -1,60 +1,318 @@
-import json
-import joblib
-from typing import AsyncIterator
+import asyncio
+import contextlib
+import os
+import secrets
+from collections.abc import AsyncIterator, Sequence
+from typing import Annotated, Any
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-import pandas as pd
-from utils import get_artifacts_dir, encode_binary_features, TRAINING_FEATURES
-from .models import CustomerData, HealthCheckResult, PredictionResult
+from fastapi import FastAPI, Header, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+import numpy as np
+import orjson
+from pydantic import TypeAdapter, ValidationError
+from utils import DECISION_THRESHOLD, get_artifacts_dir, get_available_cpu_count
+from .affinity import SUPERVISED_WORKERS_ENV, pin_worker_to_cpus
+from .batching import MicroBatcher
+from .cache import PredictionCache, load_cache_backend
+from .executor import ExecutorSaturatedError, InferenceExecutor, InferenceTimeoutError
+from .metrics import (
+    PROBABILITY_BUCKETS,
+    Histogram,
+    PrometheusWriter,
+    RequestMetricsMiddleware,
+    get_process_rss_bytes,
+    request_metrics,
+    stage_latency,
+)
+from .model_store import (
+    ModelBundle,
+    artifacts_signature,
+    load_model_bundle,
+    warm_up,
+)
+from .models import (
+    BatchingStats,
+    CacheStats,
+    BatchPredictionResult,
+    CustomerData,
+    HealthCheckResult,
+    PredictionResult,
+    ReloadResult,
+)
+from .settings import AppSettings, get_worker_count, load_settings
+from .setup_logging import LazyJson
 import logging
 
 
 logger = logging.getLogger("app")
+# Request and response payloads, which can be sampled separately through LOG_SAMPLE_RATES
+payload_logger = logging.getLogger("app.payload")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Validators built once at import, which validate request bodies straight from the raw JSON bytes
+customer_adapter = TypeAdapter(CustomerData)
+customer_batch_adapter = TypeAdapter(list[CustomerData])
+
+
+def openapi_request_body(adapter: TypeAdapter[Any]) -> dict[str, Any]:
+    """
+    OpenAPI request body of an endpoint that validates its raw body with adapter instead of a body parameter.
+
+    The schema's $defs are inlined, as their references would otherwise resolve against the OpenAPI document.
+    """
+    schema = adapter.json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node: Any) -> Any:
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {k: inline(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [inline(v) for v in node]
+        return node
+
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": inline(schema)}},
+        }
+    }
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    pipeline_path = get_artifacts_dir() / "best_ml_pipeline.joblib"
+    settings = load_settings()
+    app.state.settings = settings
+
+    supervised_workers = int(os.environ.get(SUPERVISED_WORKERS_ENV, "0"))
+    if settings.CPU_AFFINITY and supervised_workers > 1:
+        pin_worker_to_cpus(supervised_workers)
+    if settings.XGB_NTHREAD == 0:
+        # Resolved by `serve` for the workers it starts, otherwise (e.g. plain `uvicorn --workers`) by each worker
+        settings.XGB_NTHREAD = max(
+            1,
+            get_available_cpu_count()
+            // (supervised_workers or get_worker_count(settings)),
+        )
 
-    if not pipeline_path.exists():
-        logger.critical(
-            f"FATAL: Model pipeline file not found at {pipeline_path}. Server cannot start."
+    # Thread pools don't hold the model, so a single one is shared by every model version
+    app.state.executor = None
+    if settings.INFERENCE_EXECUTOR == "thread":
+        app.state.executor = InferenceExecutor(
+            "thread",
+            max_workers=settings.INFERENCE_WORKERS,
+            max_pending=settings.INFERENCE_MAX_PENDING,
+            timeout_s=settings.INFERENCE_TIMEOUT_S,
         )
-        raise SystemExit(f"Missing critical file: {pipeline_path}")
 
     try:
-        app.state.ml_pipeline = joblib.load(pipeline_path)
+        app.state.model = load_model_bundle(
+            get_artifacts_dir(), settings, app.state.executor
+        )
         logger.info("Model loaded successfully. Server ready to start.")
+    except FileNotFoundError as e:
+        logger.critical(f"FATAL: {e}. Server cannot start.")
+        raise SystemExit(f"Missing critical file: {e}")
     except Exception as e:
-        logger.critical(
-            f"FATAL: Failed to load model pipeline from {pipeline_path}.", exc_info=True
-        )
+        logger.critical("FATAL: Failed to load model pipeline.", exc_info=True)
         raise SystemExit(f"Failed to load model pipeline: {e}")
 
-    training_features_path = get_artifacts_dir() / "training_features.json"
-    try:
-        with open(training_features_path, "r") as f:
-            app.state.training_features = json.load(f)
-    except Exception:
-        logger.warning(
-            f"WARN: Failed to load training features from {training_features_path}. Using default training features."
+    app.state.prediction_probability = Histogram(PROBABILITY_BUCKETS)
+
+    logger.info(
+        f"Model version {app.state.model.version} using {app.state.model.predictor_name} for inference."
+    )
+    if settings.INFERENCE_EXECUTOR != "none":
+        logger.info(
+            f"Running inference in a {settings.INFERENCE_EXECUTOR} pool of {settings.INFERENCE_WORKERS} workers."
+        )
+
+    app.state.prediction_cache = None
+    if settings.PREDICTION_CACHE:
+        app.state.prediction_cache = PredictionCache(
+            max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+            ttl_s=settings.PREDICTION_CACHE_TTL_S,
+            shared_backend=load_cache_backend(settings.PREDICTION_CACHE_SHARED_BACKEND)
+            if settings.PREDICTION_CACHE_SHARED_BACKEND
+            else None,
+        )
+        logger.info(
+            f"Prediction cache enabled (max entries {settings.PREDICTION_CACHE_MAX_ENTRIES}, "
+            f"TTL {settings.PREDICTION_CACHE_TTL_S}s)."
         )
-        app.state.training_features = TRAINING_FEATURES
 
-    binary_features_path = get_artifacts_dir() / "binary_features.json"
+    app.state.micro_batcher = None
+    if settings.MICRO_BATCHING:
+        app.state.micro_batcher = MicroBatcher(
+            predict_with_current_model,
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+            max_queue_size=settings.MICRO_BATCH_MAX_QUEUE,
+        )
+        app.state.micro_batcher.start()
+        logger.info(
+            f"Micro-batching enabled (max batch size {settings.MICRO_BATCH_MAX_SIZE}, "
+            f"max wait {settings.MICRO_BATCH_MAX_WAIT_MS}ms)."
+        )
+
+    # The worker is live as soon as the model is loaded, and ready once it is warmed up in the background
+    app.state.ready = False
+    app.state.warmup_failed = False
+    app.state.warmup_time_s = 0.0
+    warmup = asyncio.create_task(warm_up_startup_model(settings))
+
+    app.state.reload_lock = asyncio.Lock()
+    watcher = None
+    if settings.MODEL_WATCH_INTERVAL_S > 0:
+        watcher = asyncio.create_task(
+            watch_model_artifacts(settings.MODEL_WATCH_INTERVAL_S)
+        )
+        logger.info(
+            f"Watching {get_artifacts_dir()} for new model artifacts every {settings.MODEL_WATCH_INTERVAL_S}s."
+        )
+
+    yield
+
+    app.state.ready = False
+    warmup.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warmup
+
+    if watcher is not None:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
+
+    if app.state.micro_batcher is not None:
+        await app.state.micro_batcher.stop()
+        app.state.micro_batcher = None
+
+    if app.state.model.executor is not None:
+        app.state.model.executor.shutdown()
+    if app.state.executor is not None:
+        app.state.executor.shutdown()
+        app.state.executor = None
+
+    app.state.model = None
+
+
+async def warm_up_startup_model(settings: AppSettings) -> None:
+    """Warms up the model loaded at startup, then marks the worker ready. A failed warm-up marks it not live."""
     try:
-        with open(binary_features_path, "r") as f:
-            app.state.binary_features = json.load(f)
+        app.state.warmup_time_s = await warm_up(
+            app.state.model,
+            settings.WARMUP_ROUNDS,
+            settings.WARMUP_BATCH_SIZE,
+            settings.WARMUP_TIMEOUT_S,
+        )
     except Exception:
-        logger.warning(
-            f"WARN: Failed to load binary features from {binary_features_path}. Using default binary features."
+        logger.critical("FATAL: Model warm-up failed.", exc_info=True)
+        app.state.warmup_failed = True
+        return
+
+    app.state.ready = True
+    logger.info(
+        f"Model warmed up in {app.state.warmup_time_s:.3f}s ({settings.WARMUP_ROUNDS} rounds of 1 and "
+        f"{settings.WARMUP_BATCH_SIZE} customers). Server ready."
+    )
+
+
+async def predict_with_model(
+    model: ModelBundle, records: Sequence[CustomerData]
+) -> np.ndarray:
+    """Scores records in the model's inference executor, or inline on the event loop when there is none."""
+    if model.executor is not None:
+        return await model.executor.predict_proba(model.predictor, records)
+    return np.asarray(model.local_predictor().predict_proba(records))
+
+
+async def predict_with_current_model(
+    records: Sequence[CustomerData],
+) -> list[tuple[float, str]]:
+    """Scores a micro-batch with the model current at flush time, tagging each probability with its version."""
+    model: ModelBundle = app.state.model
+    probs = await predict_with_model(model, records)
+    return [(p, model.version) for p in probs.tolist()]
+
+
+class ReloadInProgressError(Exception):
+    """Raised when a model reload is requested while another one is running."""
+
+
+async def reload_model() -> tuple[str, str]:
+    """
+    Loads and warms the current artifacts off the event loop, then swaps them in.
+
+    Returns the previous and the new model version. Requests already in flight finish on the previous model.
+    """
+    lock: asyncio.Lock = app.state.reload_lock
+    if lock.locked():
+        raise ReloadInProgressError("A model reload is already in progress")
+
+    async with lock:
+        old_model: ModelBundle = app.state.model
+        new_model = await asyncio.to_thread(
+            load_model_bundle,
+            get_artifacts_dir(),
+            app.state.settings,
+            app.state.executor,
+        )
+        settings = app.state.settings
+        warmup_time_s = await warm_up(
+            new_model,
+            settings.WARMUP_ROUNDS,
+            settings.WARMUP_BATCH_SIZE,
+            settings.WARMUP_TIMEOUT_S,
         )
-        app.state.binary_features = ["default", "housing", "loan"]
 
-    yield
+        # A single reference assignment, so every request sees either the old or the new bundle as a whole
+        app.state.model = new_model
+        app.state.warmup_time_s = warmup_time_s
+        logger.info(
+            f"Model reloaded: version {old_model.version} -> {new_model.version} "
+            f"(warmed up in {warmup_time_s:.3f}s)."
+        )
+
+        if (
+            old_model.executor is not None
+            and old_model.executor is not app.state.executor
+        ):
+            # Let predictions already queued on the old process pool finish before it goes away
+            await asyncio.to_thread(old_model.executor.shutdown, False)
+
+        return old_model.version, new_model.version
+
 
-    if app.state.ml_pipeline is not None:
-        app.state.ml_pipeline = None
+async def watch_model_artifacts(interval_s: float) -> None:
+    """Reloads the model once a change to the artifacts has settled for one polling interval."""
+    settings = app.state.settings
+    signature = artifacts_signature(get_artifacts_dir(), settings.MODEL_FORMAT)
+    pending = None
+
+    while True:
+        await asyncio.sleep(interval_s)
+        current = await asyncio.to_thread(
+            artifacts_signature, get_artifacts_dir(), settings.MODEL_FORMAT
+        )
+        if current == signature:
+            pending = None
+            continue
+        if current != pending:
+            # Still being written (e.g. by the trainer), wait for it to settle
+            pending = current
+            continue
+
+        try:
+            await reload_model()
+            signature = current
+        except ReloadInProgressError:
+            pass
+        except Exception:
+            logger.exception("ERROR: Model reload failed. Keeping the current model.")
+            signature = current
+        pending = None
 
 
 app = FastAPI(
@@ -64,6 +322,27 @@ app = FastAPI(
     contact={"email": "handsomeyang@gmail.com"},
     lifespan=lifespan,
 )
+app.add_middleware(RequestMetricsMiddleware)
+
+
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(
+    request: Request, exc: ExecutorSaturatedError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(app.state.settings.INFERENCE_RETRY_AFTER_S)},
+    )
+
+
+@app.exception_handler(InferenceTimeoutError)
+async def inference_timeout_handler(
+    request: Request, exc: InferenceTimeoutError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)}
+    )
 
 
 @app.get("/", response_model=HealthCheckResult)
@@ -71,26 +350,335 @@ def health_check() -> HealthCheckResult:
     return HealthCheckResult(status="OK")
 
 
-@app.post("/predict")
-async def predict_subscription(data: CustomerData) -> PredictionResult:
-    data_dict = data.model_dump()
+@app.get("/livez", response_model=HealthCheckResult)
+def liveness_check() -> HealthCheckResult:
+    """Reports whether the worker is alive, which it stops being if its model failed to warm up."""
+    if app.state.warmup_failed:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model warm-up failed",
+        )
+    return HealthCheckResult(status="OK")
+
+
+@app.get("/readyz", response_model=HealthCheckResult)
+def readiness_check() -> HealthCheckResult:
+    """Reports whether the worker should receive traffic: once its model is warmed up, until it shuts down."""
+    if not app.state.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model is not warmed up",
+        )
+    return HealthCheckResult(status="OK")
 
-    logger.info(f"Prediction initiated for new request: {data.model_dump_json()}")
 
+def parse_customer(body: bytes) -> CustomerData:
+    """Validates a single customer from the raw request body, reporting errors like FastAPI's body validation."""
     try:
-        # Use training_features persisted together with the trained pipeline to construct a data frame with the same
-        # column order as the training data
-        input_df = pd.DataFrame([data_dict], columns=app.state.training_features)
-        encode_binary_features(input_df, app.state.binary_features)
-        subscription_prob = app.state.ml_pipeline.predict_proba(input_df)[0][1]
+        return customer_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ]
+        ) from e
+
+
+@app.post("/predict", openapi_extra=openapi_request_body(customer_adapter))
+async def predict_subscription(request: Request) -> PredictionResult:
+    # Validated from the raw bytes in one pass, instead of FastAPI's json.loads followed by validating the dict
+    body = await request.body()
+    with stage_latency.time("validate"):
+        data = parse_customer(body)
+    payload_logger.info("Prediction initiated for new request: %s", LazyJson(data))
+
+    try:
+        model: ModelBundle = app.state.model
+        model_version = model.version
+
+        cache: PredictionCache | None = app.state.prediction_cache
+        # Hashed once, for both the lookup and the store (which may be under a newer model version)
+        request_digest = cache.request_digest(data) if cache else ""
+        cached_prob = (
+            await cache.get(cache.key(request_digest, model_version)) if cache else None
+        )
+
+        if cached_prob is not None:
+            subscription_prob = cached_prob
+        elif app.state.micro_batcher is not None:
+            subscription_prob, model_version = await app.state.micro_batcher.submit(
+                data
+            )
+        else:
+            subscription_prob = (await predict_with_model(model, [data]))[0]
+
+        if cache is not None and cached_prob is None:
+            await cache.set(
+                cache.key(request_digest, model_version), float(subscription_prob)
+            )
+        app.state.prediction_probability.observe(float(subscription_prob))
 
         result = PredictionResult(
-            status="Success", prediction="yes" if subscription_prob > 0.5 else "no"
+            status="Success",
+            prediction="yes" if subscription_prob > DECISION_THRESHOLD else "no",
+            model_version=model_version,
         )
 
-        logger.info(f"Prediction completed successfully: {result.model_dump_json()}")
+        payload_logger.info("Prediction completed successfully: %s", LazyJson(result))
 
         return result
-    except Exception as e:
+    except Exception:
         logger.exception("ERROR: Prediction failed due to error")
-        raise e
+        raise
+
+
+def check_batch_size(body: bytes, content_type: str, max_size: int) -> None:
+    """
+    Rejects a batch of more than max_size customers before it is validated, since validation is the cost the limit
+    bounds.
+
+    Every customer object opens with a brace, so a body with at most max_size of them is accepted without parsing.
+    Larger ones are only split into lines (NDJSON) or parsed without validation (JSON array) to count the customers.
+    """
+    if body.count(b"{") <= max_size:
+        return
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        size = sum(1 for line in body.splitlines() if line.strip())
+    else:
+        try:
+            records = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Reported by the validation
+            return
+        if not isinstance(records, list):
+            return
+        size = len(records)
+    if size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Batch of {size} exceeds the maximum of {max_size} customers.",
+        )
+
+
+def parse_customer_batch(body: bytes, content_type: str) -> list[CustomerData]:
+    """
+    Validates a batch sent either as a JSON array or as NDJSON (one customer object per line), reporting errors like
+    parse_customer with the index of the customer in the array, or of its line in the NDJSON body.
+    """
+    if not content_type.startswith(NDJSON_MEDIA_TYPE):
+        try:
+            return customer_batch_adapter.validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [
+                    {**error, "loc": ("body", *error["loc"])}
+                    for error in e.errors(include_url=False)
+                ]
+            ) from e
+
+    records: list[CustomerData] = []
+    errors: list[dict[str, Any]] = []
+    for index, line in enumerate(body.splitlines()):
+        if not line.strip():
+            continue
+        try:
+            records.append(customer_adapter.validate_json(line))
+        except ValidationError as e:
+            errors.extend(
+                {**error, "loc": ("body", index, *error["loc"])}
+                for error in e.errors(include_url=False)
+            )
+    if errors:
+        raise RequestValidationError(errors)
+    return records
+
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionResult,
+    openapi_extra=openapi_request_body(customer_batch_adapter),
+)
+async def predict_subscription_batch(request: Request) -> Response:
+    settings = app.state.settings
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    with stage_latency.time("validate"):
+        check_batch_size(body, content_type, settings.MAX_BATCH_SIZE)
+        records = parse_customer_batch(body, content_type)
+
+    logger.info(f"Batch prediction initiated for {len(records)} customers")
+
+    try:
+        model: ModelBundle = app.state.model
+        chunk_size = settings.BATCH_CHUNK_SIZE
+        chunks = [
+            await predict_with_model(model, records[start : start + chunk_size])
+            for start in range(0, len(records), chunk_size)
+        ]
+        all_probs = np.concatenate(chunks) if chunks else np.empty(0)
+        app.state.prediction_probability.observe_many(all_probs)
+        probs = all_probs.tolist()
+
+        # Serialized with orjson from plain dicts, rather than building and dumping a model per prediction
+        content = orjson.dumps(
+            {
+                "status": "Success",
+                "predictions": [
+                    {
+                        "probability": p,
+                        "prediction": "yes" if p > DECISION_THRESHOLD else "no",
+                    }
+                    for p in probs
+                ],
+                "model_version": model.version,
+            }
+        )
+
+        logger.info(
+            f"Batch prediction completed successfully for {len(records)} customers"
+        )
+
+        return Response(content, media_type="application/json")
+    except Exception:
+        logger.exception("ERROR: Batch prediction failed due to error")
+        raise
+
+
+@app.get("/batching/stats", response_model=BatchingStats)
+def micro_batching_stats() -> BatchingStats:
+    if app.state.micro_batcher is None:
+        return BatchingStats(enabled=False)
+    return BatchingStats(enabled=True, **app.state.micro_batcher.stats())
+
+
+@app.get("/cache/stats", response_model=CacheStats)
+def prediction_cache_stats() -> CacheStats:
+    if app.state.prediction_cache is None:
+        return CacheStats(enabled=False)
+    return CacheStats(enabled=True, **app.state.prediction_cache.stats())
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Metrics of the worker process serving the scrape, in the Prometheus text format."""
+    model: ModelBundle = app.state.model
+    writer = PrometheusWriter()
+
+    writer.counter(
+        "api_requests_total",
+        "HTTP requests handled, by method, route and status code.",
+        [
+            ({"method": method, "route": route, "status": code}, count)
+            for (method, route, code), count in sorted(request_metrics.counts.items())
+        ],
+    )
+    writer.histogram(
+        "api_request_duration_seconds",
+        "HTTP request latency by route.",
+        [({"route": route}, h) for route, h in sorted(request_metrics.latency.items())],
+    )
+    writer.histogram(
+        "api_stage_duration_seconds",
+        "Latency of the request validation and inference stages.",
+        [({"stage": stage}, h) for stage, h in stage_latency.merged().items()],
+    )
+    writer.histogram(
+        "api_prediction_probability",
+        "Distribution of the predicted subscription probabilities.",
+        [({}, app.state.prediction_probability)],
+    )
+    writer.gauge(
+        "api_model_info",
+        "Version of the model being served.",
+        [({"version": model.version, "predictor": model.predictor_name}, 1)],
+    )
+    writer.gauge(
+        "api_model_load_seconds",
+        "Time spent loading the model being served.",
+        [({}, model.load_time_s)],
+    )
+    writer.gauge(
+        "api_model_warmup_seconds",
+        "Time spent warming up the model being served.",
+        [({}, app.state.warmup_time_s)],
+    )
+    writer.gauge(
+        "api_ready",
+        "Whether the worker reports ready on /readyz.",
+        [({}, int(app.state.ready))],
+    )
+    writer.gauge(
+        "api_process_resident_memory_bytes",
+        "Resident memory of the worker process.",
+        [({}, get_process_rss_bytes())],
+    )
+
+    if app.state.micro_batcher is not None:
+        writer.histogram(
+            "api_micro_batch_size",
+            "Records per micro-batch.",
+            [({}, app.state.micro_batcher.batch_size)],
+        )
+        writer.histogram(
+            "api_micro_batch_queue_depth",
+            "Micro-batch queue depth seen by incoming records.",
+            [({}, app.state.micro_batcher.queue_depth)],
+        )
+
+    if app.state.prediction_cache is not None:
+        cache_stats = app.state.prediction_cache.stats()
+        writer.gauge(
+            "api_prediction_cache_entries",
+            "Entries in the local prediction cache.",
+            [({}, cache_stats["size"])],
+        )
+        writer.counter(
+            "api_prediction_cache_events_total",
+            "Prediction cache lookups and removals, by event.",
+            [
+                ({"event": event}, cache_stats[event])
+                for event in (
+                    "hits",
+                    "shared_hits",
+                    "misses",
+                    "evictions",
+                    "expirations",
+                )
+            ],
+        )
+
+    return PlainTextResponse(writer.render(), media_type=PrometheusWriter.content_type)
+
+
+@app.post("/admin/reload", response_model=ReloadResult)
+async def reload_model_artifacts(
+    x_admin_token: Annotated[str, Header()] = "",
+) -> ReloadResult:
+    admin_token = app.state.settings.ADMIN_TOKEN.get_secret_value()
+    if not admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled. Set APP_ADMIN_TOKEN to enable them.",
+        )
+    if not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token."
+        )
+
+    try:
+        previous_version, model_version = await reload_model()
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        logger.exception("ERROR: Model reload failed. Keeping the current model.")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Model reload failed: {e}",
+        )
+
+    return ReloadResult(
+        status="Reloaded",
+        previous_version=previous_version,
+        model_version=model_version,
+    )
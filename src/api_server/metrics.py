@@ -0,0 +1,269 @@
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator, MutableMapping, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+
+# Latency buckets in seconds, from a single compiled row up to large sklearn batches
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+PROBABILITY_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+class Histogram:
+    """
+    Cumulative bucket histogram in the Prometheus style (each bucket counts observations <= its upper bound).
+
+    Instances are owned by a single worker process and only updated from its event loop, so no locking is needed.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_many(self, values: np.ndarray) -> None:
+        self._counts = (
+            np.asarray(self._counts)
+            + np.bincount(
+                np.searchsorted(self.buckets, values, side="left"),
+                minlength=len(self._counts),
+            )
+        ).tolist()
+        self.sum += float(np.sum(values))
+        self.count += len(values)
+
+    def merge(self, other: "Histogram") -> None:
+        self._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative_counts(self) -> list[tuple[float, int]]:
+        """Returns (upper bound, cumulative count) pairs, ending with the +Inf bucket."""
+        result = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "buckets": {str(bound): count for bound, count in self.cumulative_counts()},
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class StageTimer:
+    """
+    Latency histograms per named stage, e.g. the steps of an inference.
+
+    Stages can be timed from executor threads as well as from the event loop. Each thread updates its own
+    histograms, which are only merged when they are read, so timing a stage never takes a lock.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self._local = threading.local()
+        self._per_thread: list[dict[str, Histogram]] = []
+
+    def _histograms(self) -> dict[str, Histogram]:
+        histograms: dict[str, Histogram] | None = getattr(
+            self._local, "histograms", None
+        )
+        if histograms is None:
+            histograms = self._local.histograms = {}
+            self._per_thread.append(histograms)
+        return histograms
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histograms = self._histograms()
+        histogram = histograms.get(stage)
+        if histogram is None:
+            histogram = histograms[stage] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def merged(self) -> dict[str, Histogram]:
+        result: dict[str, Histogram] = {}
+        for histograms in list(self._per_thread):
+            for stage, histogram in list(histograms.items()):
+                result.setdefault(stage, Histogram(self.buckets)).merge(histogram)
+        return dict(sorted(result.items()))
+
+
+# Inference stages of this process (validation, DataFrame construction, encoding, transform, predict)
+stage_latency = StageTimer()
+
+
+class RequestMetrics:
+    """Request counts and latencies per route, updated from the event loop only."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[str, Histogram] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        histogram = self.latency.get(route)
+        if histogram is None:
+            histogram = self.latency[route] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+
+request_metrics = RequestMetrics()
+
+ASGIApp = Callable[..., Awaitable[None]]
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware timing each HTTP request, cheaper than a BaseHTTPMiddleware."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self,
+        scope: MutableMapping[str, Any],
+        receive: Callable[[], Awaitable[Any]],
+        send: Callable[[Any], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: MutableMapping[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template rather than raw path so that unknown paths don't grow the label set
+            route = scope.get("route")
+            request_metrics.observe(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status_code,
+                time.perf_counter() - start,
+            )
+
+
+def get_process_rss_bytes() -> int:
+    """Current resident set size of this process, or its peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class PrometheusWriter:
+    """Renders metrics in the Prometheus text exposition format (version 0.0.4)."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def _header(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def _samples(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        samples: list[tuple[dict[str, Any], float]],
+    ) -> None:
+        self._header(name, kind, help_text)
+        for labels, value in samples:
+            self._lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    def counter(
+        self, name: str, help_text: str, samples: list[tuple[dict[str, Any], float]]
+    ) -> None:
+        self._samples(name, "counter", help_text, samples)
+
+    def gauge(
+        self, name: str, help_text: str, samples: list[tuple[dict[str, Any], float]]
+    ) -> None:
+        self._samples(name, "gauge", help_text, samples)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        histograms: list[tuple[dict[str, Any], Histogram]],
+    ) -> None:
+        self._header(name, "histogram", help_text)
+        for labels, histogram in histograms:
+            for bound, count in histogram.cumulative_counts():
+                bucket_labels = {**labels, "le": _format_bound(bound)}
+                self._lines.append(
+                    f"{name}_bucket{_format_labels(bucket_labels)} {count}"
+                )
+            self._lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            self._lines.append(
+                f"{name}_count{_format_labels(labels)} {histogram.count}"
+            )
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
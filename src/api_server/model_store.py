@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, cast
+
+from utils import BINARY_FEATURES, TRAINING_FEATURES, read_feature_list
+from utils.compiled import FLAT_MODEL_DIR_NAME
+from utils.onnx_model import ONNX_MODEL_NAME
+
+from .executor import InferenceExecutor
+from .inference import Predictor, compute_model_version, load_predictor
+from .models import CustomerData
+from .settings import AppSettings
+
+logger = logging.getLogger("app")
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    Everything needed to serve one version of the model.
+
+    Requests take a reference to the current bundle when they start, so swapping in a new bundle never changes the
+    model used by requests already in flight.
+    """
+
+    version: str
+    # None when the predictions run in a process pool, whose workers load their own copy of the model
+    predictor: Predictor | None
+    predictor_name: str
+    training_features: list[str]
+    binary_features: list[str]
+    load_predictor_args: tuple[Any, ...]
+    # Wall time spent loading the artifact and creating its predictor (in a pool worker for process pools)
+    load_time_s: float
+    # Pool the predictions of this bundle run in. Process pools hold their own copy of the model, so every bundle
+    # gets its own; thread pools are shared between bundles.
+    executor: InferenceExecutor | None
+
+    def local_predictor(self) -> Predictor:
+        """Returns the predictor loaded in this process, for predictions that don't run in a process pool."""
+        if self.predictor is None:
+            raise RuntimeError("The model is only loaded by the process pool workers")
+        return self.predictor
+
+
+def get_model_path(artifacts_dir: Path, model_format: str) -> Path:
+    if model_format == "flat":
+        return artifacts_dir / FLAT_MODEL_DIR_NAME
+    if model_format == "onnx":
+        return artifacts_dir / ONNX_MODEL_NAME
+    return artifacts_dir / "best_ml_pipeline.joblib"
+
+
+def create_process_executor(
+    settings: AppSettings, load_predictor_args: tuple[Any, ...]
+) -> InferenceExecutor:
+    return InferenceExecutor(
+        "process",
+        max_workers=settings.INFERENCE_WORKERS,
+        max_pending=settings.INFERENCE_MAX_PENDING,
+        timeout_s=settings.INFERENCE_TIMEOUT_S,
+        process_init_args=load_predictor_args,
+    )
+
+
+def load_model_bundle(
+    artifacts_dir: Path,
+    settings: AppSettings,
+    shared_executor: InferenceExecutor | None,
+) -> ModelBundle:
+    """Loads the model artifact with its feature lists. Raises FileNotFoundError if the artifact is missing."""
+    training_features = read_feature_list(
+        artifacts_dir / "training_features.json",
+        TRAINING_FEATURES,
+        "training features",
+    )
+    binary_features = read_feature_list(
+        artifacts_dir / "binary_features.json", BINARY_FEATURES, "binary features"
+    )
+
+    model_path = get_model_path(artifacts_dir, settings.MODEL_FORMAT)
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model pipeline file not found at {model_path}")
+
+    load_predictor_args: tuple[Any, ...] = (
+        settings.MODEL_FORMAT,
+        model_path,
+        settings.INFERENCE_BACKEND,
+        training_features,
+        binary_features,
+        settings.MODEL_MMAP,
+    )
+    predictor = None
+    executor = shared_executor
+    if settings.INFERENCE_EXECUTOR == "process":
+        # Only the pool workers load the model, and they split this server worker's XGBoost threads between them
+        load_predictor_args += (
+            max(1, settings.XGB_NTHREAD // settings.INFERENCE_WORKERS),
+        )
+        executor = create_process_executor(settings, load_predictor_args)
+        try:
+            # Loads the model in a first worker, so that a broken artifact fails here rather than on the first request
+            predictor_name, load_time_s = executor.worker_predictor_info(
+                settings.WARMUP_TIMEOUT_S
+            )
+        except BaseException:
+            executor.shutdown()
+            raise
+    else:
+        load_predictor_args += (settings.XGB_NTHREAD,)
+        start = time.perf_counter()
+        predictor = load_predictor(*load_predictor_args)
+        load_time_s = time.perf_counter() - start
+        predictor_name = type(predictor).__name__
+
+    return ModelBundle(
+        version=compute_model_version(model_path),
+        predictor=predictor,
+        predictor_name=predictor_name,
+        training_features=training_features,
+        binary_features=binary_features,
+        load_predictor_args=load_predictor_args,
+        load_time_s=load_time_s,
+        executor=executor,
+    )
+
+
+def artifacts_signature(
+    artifacts_dir: Path, model_format: str
+) -> tuple[tuple[str, int, int], ...]:
+    """Cheap (name, mtime, size) signature of the served artifacts, used to detect that they were replaced."""
+    model_path = get_model_path(artifacts_dir, model_format)
+    paths = sorted(model_path.iterdir()) if model_path.is_dir() else [model_path]
+    paths += [
+        artifacts_dir / "training_features.json",
+        artifacts_dir / "binary_features.json",
+    ]
+
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def warmup_customers(n: int | None = None) -> list[CustomerData]:
+    """
+    Synthetic customers used to exercise a freshly loaded model, cycling through the category values.
+
+    Defaults to as many customers as the largest category has values, so that every value appears.
+    """
+    categorical: dict[str, list[Any]] = {
+        name: list(cast("type[Enum]", field.annotation))
+        for name, field in CustomerData.model_fields.items()
+        if isinstance(field.annotation, type) and issubclass(field.annotation, str)
+    }
+    if n is None:
+        n = max(len(values) for values in categorical.values())
+    return [
+        CustomerData.model_validate(
+            {
+                "age": 40,
+                "balance": 1000.0,
+                "day": 15,
+                "duration": 200,
+                "campaign": 2,
+                "pdays": -1,
+                "previous": 0,
+                **{
+                    name: values[i % len(values)]
+                    for name, values in categorical.items()
+                },
+            }
+        )
+        for i in range(n)
+    ]
+
+
+async def warm_up(
+    bundle: ModelBundle, rounds: int, batch_size: int, timeout_s: float
+) -> float:
+    """
+    Runs rounds of single-row and batch_size-row predictions of synthetic customers, so that lazy initialisation
+    doesn't land on the first real requests. Returns the time it took.
+
+    Predictions run where the bundle's requests would: in its executor, or off the event loop when it has none.
+    Each call may take up to timeout_s, which for process pools includes starting the workers and loading their
+    model.
+    """
+    customers = warmup_customers(batch_size)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for records in (customers[:1], customers):
+            if bundle.executor is None:
+                await asyncio.to_thread(bundle.local_predictor().predict_proba, records)
+            else:
+                # One call per worker, so that every worker of a process pool starts and loads its model
+                await asyncio.gather(
+                    *(
+                        bundle.executor.predict_proba(
+                            bundle.predictor, records, timeout_s=timeout_s
+                        )
+                        for _ in range(bundle.executor.max_workers)
+                    )
+                )
+    return time.perf_counter() - start
@@ -1,65 +1,66 @@
 from enum import Enum
+from typing import Any
 from pydantic import BaseModel
 
 
 class Job(str, Enum):
-    admin = ("admin.",)
-    unknown = ("unknown",)
-    unemployed = ("unemployed",)
-    management = ("management",)
-    housemaid = ("housemaid",)
-    entrepreneur = ("entrepreneur",)
-    student = ("student",)
-    blue_collar = ("blue-collar",)
-    self_employed = ("self-employed",)
-    retired = ("retired",)
-    technician = ("technician",)
+    admin = "admin."
+    unknown = "unknown"
+    unemployed = "unemployed"
+    management = "management"
+    housemaid = "housemaid"
+    entrepreneur = "entrepreneur"
+    student = "student"
+    blue_collar = "blue-collar"
+    self_employed = "self-employed"
+    retired = "retired"
+    technician = "technician"
     services = "services"
 
 
 class Marital(str, Enum):
-    married = ("married",)
-    divorced = ("divorced",)
+    married = "married"
+    divorced = "divorced"
     single = "single"
 
 
 class Education(str, Enum):
-    unknown = ("unknown",)
-    secondary = ("secondary",)
-    primary = ("primary",)
+    unknown = "unknown"
+    secondary = "secondary"
+    primary = "primary"
     tertiary = "tertiary"
 
 
 class Yesno(str, Enum):
-    yes = ("yes",)
+    yes = "yes"
     no = "no"
 
 
 class Contact(str, Enum):
-    unknown = ("unknown",)
-    telephone = ("telephone",)
+    unknown = "unknown"
+    telephone = "telephone"
     cellular = "cellular"
 
 
 class Month(str, Enum):
-    jan = ("jan",)
-    feb = ("feb",)
+    jan = "jan"
+    feb = "feb"
     mar = "mar"
-    apr = ("apr",)
-    may = ("may",)
-    jun = ("jun",)
-    jul = ("jul",)
-    aug = ("aug",)
-    sep = ("sep",)
-    oct = ("oct",)
-    nov = ("nov",)
+    apr = "apr"
+    may = "may"
+    jun = "jun"
+    jul = "jul"
+    aug = "aug"
+    sep = "sep"
+    oct = "oct"
+    nov = "nov"
     dec = "dec"
 
 
 class Poutcome(str, Enum):
-    unknown = ("unknown",)
-    other = ("other",)
-    failure = ("failure",)
+    unknown = "unknown"
+    other = "other"
+    failure = "failure"
     success = "success"
 
 
@@ -89,3 +90,39 @@ class HealthCheckResult(BaseModel):
 class PredictionResult(BaseModel):
     status: str
     prediction: str
+    model_version: str
+
+
+class BatchPredictionItem(BaseModel):
+    probability: float
+    prediction: str
+
+
+class BatchPredictionResult(BaseModel):
+    status: str
+    predictions: list[BatchPredictionItem]
+    model_version: str
+
+
+class BatchingStats(BaseModel):
+    enabled: bool
+    queue_size: int = 0
+    batch_size: dict[str, Any] | None = None
+    queue_depth: dict[str, Any] | None = None
+
+
+class CacheStats(BaseModel):
+    enabled: bool
+    size: int = 0
+    max_entries: int = 0
+    hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class ReloadResult(BaseModel):
+    status: str
+    previous_version: str
+    model_version: str
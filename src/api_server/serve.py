@@ -1,6 +1,15 @@
 import argparse
+import json
+import os
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from utils import get_available_cpu_count
+
+from .affinity import SUPERVISED_WORKERS_ENV
 from .setup_logging import load_logging_config, setup_logging
-from .settings import load_settings
+from .settings import get_worker_count, load_settings
 
 
 def main() -> None:
@@ -13,21 +22,63 @@ def main() -> None:
     parser.add_argument(
         "--env", choices=["dev", "staging", "prod"], help="Deployment environment."
     )
+    parser.add_argument(
+        "--loop",
+        choices=["auto", "asyncio", "uvloop"],
+        help="Event loop implementation.",
+    )
+    parser.add_argument(
+        "--http",
+        choices=["auto", "h11", "httptools"],
+        help="HTTP protocol implementation.",
+    )
+    parser.add_argument(
+        "--cpu-affinity",
+        action=argparse.BooleanOptionalAction,
+        help="Pin each worker process to its own share of the CPUs.",
+    )
+    parser.add_argument(
+        "--xgb-nthread",
+        type=int,
+        help="XGBoost threads per worker (0 splits the available CPUs between workers).",
+    )
 
     args = parser.parse_args()
 
     override_kwargs = {k.upper(): v for k, v in vars(args).items() if v is not None}
     settings = load_settings(**override_kwargs)
 
-    logging_config_dict = load_logging_config(env=settings.ENV)
+    workers = get_worker_count(settings)
+    if settings.XGB_NTHREAD == 0:
+        settings.XGB_NTHREAD = max(1, get_available_cpu_count() // workers)
+
+    # Worker processes resolve their own settings, so hand them the resolved values (including CLI overrides)
+    # through the environment, which takes precedence over the env files. Complex values are parsed as JSON.
+    # The admin token is left out so it doesn't reach child processes, workers resolve it from the environment and
+    # env files themselves.
+    for k, v in settings.model_dump(mode="json", exclude={"ADMIN_TOKEN"}).items():
+        os.environ[f"{settings.model_config.get('env_prefix', '')}{k}"] = (
+            json.dumps(v) if isinstance(v, dict | list) else str(v)
+        )
+    os.environ[SUPERVISED_WORKERS_ENV] = str(workers)
+
+    logging_config_dict = load_logging_config(
+        env=settings.ENV,
+        queue=settings.LOG_QUEUE,
+        sample_rates=settings.LOG_SAMPLE_RATES,
+    )
     setup_logging(logging_config_dict)
 
-    # if settings.ENV:
-    #     uvicorn.run("api_server.main:app", host=settings.HOST, port=settings.PORT, reload=True, log_config=logging_config_dict)
-    # else:
-    #     uvicorn.run(
-    #         "api_server.main:app", host=settings.HOST, port=settings.PORT, workers=settings.WORKERS, log_config=logging_config_dict
-    #     )
+    uvicorn.run(
+        "api_server.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        reload=settings.ENV == "dev",
+        workers=workers,
+        loop=settings.LOOP,
+        http=settings.HTTP,
+        log_config=logging_config_dict or LOGGING_CONFIG,
+    )
 
 
 if __name__ == "__main__":
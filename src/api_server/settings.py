@@ -1,7 +1,9 @@
-from typing import Any
+from typing import Any, Literal
+from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 import pathlib
+import sys
 from utils import PROJECT_ROOT
 
 
@@ -10,6 +12,60 @@ class AppSettings(BaseSettings):
     HOST: str = "127.0.0.1"
     PORT: int = 8000
     WORKERS: int = 4
+    # Event loop and HTTP parser implementations passed to uvicorn ("uvloop"/"httptools" need the server extra)
+    LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    # Pin each worker started by `serve` to its own share of the CPUs
+    CPU_AFFINITY: bool = True
+    # Threads used by XGBoost in each worker, 0 splits the available CPUs evenly between the workers: those started by
+    # `serve`, or WORKERS (which should then match `uvicorn --workers`) outside dev
+    XGB_NTHREAD: int = 0
+    # "joblib" loads the pickled sklearn pipeline, "flat" the flat_model export written by the trainer (compiled
+    # backend only), "onnx" its ONNX export (onnx backend only)
+    MODEL_FORMAT: Literal["joblib", "flat", "onnx"] = "joblib"
+    # Memory-map the NumPy arrays of the model artifact so workers share their pages
+    MODEL_MMAP: bool = True
+    # "compiled" scores requests through a fixed-layout NumPy transform of the fitted pipeline, "sklearn" runs the
+    # pickled pipeline as is, "onnx" runs the ONNX export with ONNX Runtime on CPU (needs the onnx extra)
+    INFERENCE_BACKEND: Literal["sklearn", "compiled", "onnx"] = "compiled"
+    # Rows scored per predict_proba call by /predict/batch, and the largest batch a single request may carry
+    BATCH_CHUNK_SIZE: int = 1024
+    MAX_BATCH_SIZE: int = 100_000
+    # Opt-in micro-batching of concurrent /predict calls into a single predict_proba call. Calls beyond
+    # MICRO_BATCH_MAX_QUEUE waiting for a batch are rejected with 503
+    MICRO_BATCHING: bool = False
+    MICRO_BATCH_MAX_SIZE: int = 64
+    MICRO_BATCH_MAX_WAIT_MS: float = 2.0
+    MICRO_BATCH_MAX_QUEUE: int = 1024
+    # Pool running blocking inference off the event loop ("none" runs it inline). Tasks beyond
+    # INFERENCE_MAX_PENDING are rejected with 503, and tasks slower than INFERENCE_TIMEOUT_S with 504. Only the workers
+    # of a process pool load the model, each with XGB_NTHREAD / INFERENCE_WORKERS threads
+    INFERENCE_EXECUTOR: Literal["none", "thread", "process"] = "thread"
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_MAX_PENDING: int = 64
+    INFERENCE_TIMEOUT_S: float = 5.0
+    INFERENCE_RETRY_AFTER_S: int = 1
+    # Opt-in cache of /predict results for repeated identical customers, with an optional shared backend given as
+    # a "module:factory" import path (e.g. "api_server.cache:LocalSharedBackend") to an async CacheBackend
+    PREDICTION_CACHE: bool = False
+    PREDICTION_CACHE_MAX_ENTRIES: int = 10_000
+    PREDICTION_CACHE_TTL_S: float = 300.0
+    PREDICTION_CACHE_SHARED_BACKEND: str = ""
+    # Rounds of synthetic single-row and WARMUP_BATCH_SIZE-row predictions run after loading a model, before the worker
+    # reports ready on /readyz (0 skips the warm-up). Each call may take WARMUP_TIMEOUT_S, which for process pools
+    # includes starting the workers and loading their model
+    WARMUP_ROUNDS: int = 3
+    WARMUP_BATCH_SIZE: int = 64
+    WARMUP_TIMEOUT_S: float = 60.0
+    # Poll the artifacts dir for a new model every MODEL_WATCH_INTERVAL_S seconds (0 disables the watcher)
+    MODEL_WATCH_INTERVAL_S: float = 0.0
+    # Format and write logs on a background thread instead of the request path
+    LOG_QUEUE: bool = False
+    # Fraction of records kept per logger, e.g. {"app.payload": 0.01} to log 1% of the request payloads
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+    # Token expected in the X-Admin-Token header of admin endpoints, which are disabled while it is empty. Masked
+    # when the settings are printed or dumped
+    ADMIN_TOKEN: SecretStr = SecretStr("")
 
     model_config = SettingsConfigDict(
         env_file_encoding="utf-8",
@@ -20,6 +76,11 @@ class AppSettings(BaseSettings):
 APP_SETTINGS_INSTANCE = None
 
 
+def get_worker_count(settings: AppSettings) -> int:
+    """Number of worker processes the server runs: WORKERS, or a single auto-reloading process in dev."""
+    return 1 if settings.ENV == "dev" else max(1, settings.WORKERS)
+
+
 def get_settings() -> AppSettings:
     """Retrieves the single, resolved settings instance."""
     if APP_SETTINGS_INSTANCE is None:
@@ -64,7 +125,11 @@ def load_settings(**kwargs: Any) -> AppSettings:
         or AppSettings.model_fields["ENV"].default
     )
     resolved_env_files = _determine_env_files(app_env)
-    print(f"Loading configuration files for '{app_env}': {resolved_env_files}")
+    # Diagnostics go to stderr, so that the stdout of CLIs such as `bench` stays machine-readable
+    print(
+        f"Loading configuration files for '{app_env}': {resolved_env_files}",
+        file=sys.stderr,
+    )
 
     # Copy the existing model_config (prefix, encoding, etc.)
     config_dict = AppSettings.model_config.copy()
@@ -83,7 +148,7 @@ def load_settings(**kwargs: Any) -> AppSettings:
     APP_SETTINGS_INSTANCE = RuntimeSettings(**kwargs)
 
     settings_json = APP_SETTINGS_INSTANCE.model_dump_json(indent=2)
-    print("--- Final Configuration (JSON) ---")
-    print(settings_json)
+    print("--- Final Configuration (JSON) ---", file=sys.stderr)
+    print(settings_json, file=sys.stderr)
 
     return APP_SETTINGS_INSTANCE
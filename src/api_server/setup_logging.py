@@ -1,12 +1,103 @@
 from typing import Any
 import logging.config
+import logging.handlers
+import random
+from pydantic import BaseModel
 import yaml
 from utils import get_config_dir
 
 
-def load_logging_config(env: str = "dev") -> Any:
+class SamplingFilter(logging.Filter):
+    """Lets through a random fraction of the records of a logger, e.g. to keep only some request payloads."""
+
+    def __init__(self, rate: float = 1.0) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.rate >= 1.0 or random.random() < self.rate  # nosec B311
+
+
+class LazyJson:
+    """Log argument that dumps a pydantic model to JSON only when the record is formatted."""
+
+    __slots__ = ("model",)
+
+    def __init__(self, model: BaseModel) -> None:
+        self.model = model
+
+    def __str__(self) -> str:
+        return self.model.model_dump_json()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting, and so the serialization of lazy arguments, to the listener thread.
+
+    The stock handler formats every record in the calling thread so that it can be pickled. The listener runs in
+    the same process here, so records are queued as they are.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def close(self) -> None:
+        # Drain the queue before the handlers behind it are closed
+        listener = getattr(self, "listener", None)
+        if listener is not None:
+            listener.stop()
+            self.listener = None
+        super().close()
+
+
+class StartedQueueListener(logging.handlers.QueueListener):
+    """QueueListener that starts with its handler, since dictConfig (and so uvicorn workers) won't start it."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.start()
+
+
+def use_queue_handlers(config: Any) -> None:
+    """Routes every logger through a queue, so that formatting and I/O happen on a background thread."""
+    for logger_config in config.get("loggers", {}).values():
+        handlers = logger_config.get("handlers")
+        if not handlers:
+            continue
+
+        queue_handler_name = f"queue_{'_'.join(handlers)}"
+        config["handlers"].setdefault(
+            queue_handler_name,
+            {
+                "class": f"{__name__}.DeferredQueueHandler",
+                "handlers": list(handlers),
+                "listener": f"{__name__}.StartedQueueListener",
+                "respect_handler_level": True,
+            },
+        )
+        logger_config["handlers"] = [queue_handler_name]
+
+
+def add_sampling_filters(config: Any, sample_rates: dict[str, float]) -> None:
+    """Keeps only the given fraction of the records of each logger in sample_rates."""
+    filters = config.setdefault("filters", {})
+    loggers = config.setdefault("loggers", {})
+    for logger_name, rate in sample_rates.items():
+        filter_name = f"sample_{logger_name}"
+        filters[filter_name] = {"()": f"{__name__}.SamplingFilter", "rate": rate}
+        loggers.setdefault(logger_name, {}).setdefault("filters", []).append(
+            filter_name
+        )
+
+
+def load_logging_config(
+    env: str = "dev",
+    queue: bool = False,
+    sample_rates: dict[str, float] | None = None,
+) -> Any:
     """
     Loads logging config from file and applies environment-specific changes.
+    Optionally moves handlers behind a queue and samples the records of some loggers.
     Returns the resulting dictionary.
     """
     logging_config_path = get_config_dir() / "logging.yaml"
@@ -26,6 +117,11 @@ def load_logging_config(env: str = "dev") -> Any:
                 config["loggers"][logger_name]["handlers"] = ["console_handler"]
                 config["loggers"][logger_name]["level"] = "DEBUG"
 
+    if queue:
+        use_queue_handlers(config)
+    if sample_rates:
+        add_sampling_filters(config, sample_rates)
+
     return config
 
 
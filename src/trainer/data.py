@@ -0,0 +1,103 @@
+import hashlib
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from utils import BINARY_FEATURES, CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+
+from .load_benchmark import measure_load
+
+# Compact dtypes of dataset.csv: categories for the string columns (including the target), 32-bit numerics
+DATASET_DTYPES: dict[str, str] = {
+    **{feature: "category" for feature in CATEGORICAL_FEATURES + BINARY_FEATURES},
+    **{feature: "int32" for feature in NUMERICAL_FEATURES},
+    "balance": "float32",
+    "y": "category",
+}
+
+# Bumped whenever DATASET_DTYPES or the parsing changes, so that stale cached copies are not reused
+DATASET_CACHE_VERSION = 1
+
+# Loads the dataset with the mode given as first argument, imports excluded
+_LOAD_DATASET_SETUP = """
+from pathlib import Path
+import pandas as pd
+from trainer.data import load_dataset
+"""
+_LOAD_DATASET = """
+if sys.argv[1] == "plain":
+    df = pd.read_csv(sys.argv[2], sep=";")
+else:
+    df = load_dataset(Path(sys.argv[2]), Path(sys.argv[3]) if sys.argv[3] else None)
+"""
+_REPORT_FRAME_SIZE = 'stats["frame_mb"] = df.memory_usage(deep=True).sum() / 1024**2'
+
+
+def file_digest(path: Path) -> str:
+    """Hashes a file in blocks, so that large datasets are never read into memory at once."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").hexdigest()[:16]
+
+
+def read_dataset_csv(csv_path: Path) -> pd.DataFrame:
+    """Parses dataset.csv straight into the compact dtypes, with the multithreaded pyarrow engine if available."""
+    try:
+        import pyarrow  # noqa: F401
+
+        engine = "pyarrow"
+    except ImportError:
+        engine = "c"
+    return pd.read_csv(csv_path, sep=";", dtype=DATASET_DTYPES, engine=engine)
+
+
+def load_dataset(csv_path: Path, cache_dir: Path | None = None) -> pd.DataFrame:
+    """
+    Loads dataset.csv with compact dtypes.
+
+    With a cache_dir, the parsed frame is also cached there as Parquet, keyed by the hash of the CSV, so later runs
+    on the same file skip CSV parsing. Caching needs pyarrow and is skipped without it.
+    """
+    if cache_dir is None:
+        return read_dataset_csv(csv_path)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return read_dataset_csv(csv_path)
+
+    cache_path = (
+        cache_dir
+        / f"{csv_path.stem}-v{DATASET_CACHE_VERSION}-{file_digest(csv_path)}.parquet"
+    )
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+
+    df = read_dataset_csv(csv_path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first, so that an interrupted run never leaves a truncated cache behind
+    tmp_path = cache_path.with_suffix(".tmp")
+    df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(cache_path)
+    return df
+
+
+def compare_dataset_loading(
+    csv_path: Path, cache_dir: Path
+) -> dict[str, dict[str, Any]]:
+    """
+    Measures load time, peak RSS and frame size of the plain read_csv, the compact parse and the cached copy.
+
+    Each one runs in a fresh process, the compact parse without the cache and the last one with a warm cache.
+    """
+    load_dataset(csv_path, cache_dir)
+
+    return {
+        mode: measure_load(
+            _LOAD_DATASET,
+            [mode, str(csv_path), str(cache_dir) if mode == "cached" else ""],
+            setup=_LOAD_DATASET_SETUP,
+            report=_REPORT_FRAME_SIZE,
+        )
+        for mode in ("plain", "compact", "cached")
+    }
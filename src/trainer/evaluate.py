@@ -0,0 +1,316 @@
+import functools
+import json
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from utils import BINARY_FEATURES, encode_binary_columns
+from utils.compiled import CompiledPipeline
+
+# Resamples per bootstrap task sent to the process pool
+BOOTSTRAP_CHUNK_SIZE = 50
+
+# Rows per batch when measuring batch inference latency
+LATENCY_BATCH_SIZE = 1000
+
+
+def cv_results_frame(cv_results: dict[str, Any]) -> pd.DataFrame:
+    """The search's cv_results_ as a frame: scores, fit and score times, and one column per parameter."""
+    df = pd.DataFrame(cv_results)
+    # Parameter columns are object arrays (masked where a candidate doesn't set them); the params dicts are redundant
+    return df.drop(columns=["params"]).infer_objects()
+
+
+def save_table(df: pd.DataFrame, path: Path) -> Path:
+    """Writes a frame as Parquet, or as CSV without pyarrow. Returns the path written."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        path = path.with_suffix(".csv")
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    return path
+
+
+def threshold_metrics(y_true: np.ndarray, y_score: np.ndarray) -> pd.DataFrame:
+    """
+    ROC and precision-recall curves of binary labels, from a single sort of the scores.
+
+    Returns one row per distinct score threshold (descending), with the true and false positives predicted at or
+    above it and the resulting tpr, fpr, precision and recall.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_score = np.asarray(y_score, dtype=np.float64)
+
+    order = np.argsort(y_score, kind="mergesort")[::-1]
+    y_score = y_score[order]
+    y_true = y_true[order]
+
+    # Last index of each run of equal scores, so that tied samples switch to positive at the same threshold
+    distinct = np.flatnonzero(np.diff(y_score))
+    threshold_idx = np.r_[distinct, y_true.size - 1]
+    tps = np.cumsum(y_true)[threshold_idx]
+    fps = threshold_idx + 1 - tps
+
+    return pd.DataFrame(
+        {
+            "threshold": y_score[threshold_idx],
+            "tp": tps,
+            "fp": fps,
+            "tpr": tps / tps[-1],
+            "fpr": fps / fps[-1],
+            "precision": tps / (tps + fps),
+            "recall": tps / tps[-1],
+        }
+    )
+
+
+def curve_summary(curves: pd.DataFrame) -> dict[str, float]:
+    """ROC AUC and average precision of the curves returned by threshold_metrics."""
+    fpr = np.r_[0.0, curves["fpr"].to_numpy()]
+    tpr = np.r_[0.0, curves["tpr"].to_numpy()]
+    recall = np.r_[0.0, curves["recall"].to_numpy()]
+    return {
+        "roc_auc": float(np.trapezoid(tpr, fpr)),
+        "average_precision": float(
+            np.sum(np.diff(recall) * curves["precision"].to_numpy())
+        ),
+    }
+
+
+def calibration_bins(
+    y_true: np.ndarray, y_score: np.ndarray, n_bins: int = 10
+) -> pd.DataFrame:
+    """Mean predicted probability and observed positive rate of equal-width probability bins (empty bins omitted)."""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_score = np.asarray(y_score, dtype=np.float64)
+
+    bins = np.minimum((y_score * n_bins).astype(np.intp), n_bins - 1)
+    count = np.bincount(bins, minlength=n_bins)
+    predicted = np.bincount(bins, weights=y_score, minlength=n_bins)
+    observed = np.bincount(bins, weights=y_true, minlength=n_bins)
+
+    non_empty = count > 0
+    return pd.DataFrame(
+        {
+            "bin_start": np.arange(n_bins)[non_empty] / n_bins,
+            "count": count[non_empty],
+            "mean_predicted": predicted[non_empty] / count[non_empty],
+            "fraction_positive": observed[non_empty] / count[non_empty],
+        }
+    )
+
+
+def bootstrap_auc_chunk(
+    y_true: np.ndarray, y_score: np.ndarray, n_resamples: int, seed: Any
+) -> np.ndarray:
+    """
+    ROC AUCs of n_resamples bootstrap resamples, computed together.
+
+    Each resample is a row of sample multiplicities, so the AUC (Mann-Whitney statistic, ties counting half) of
+    every resample comes from the same single sort of the scores.
+    """
+    rng = np.random.default_rng(seed)
+    n = y_true.size
+    weights = rng.multinomial(n, np.full(n, 1 / n), size=n_resamples).astype(np.float64)
+
+    order = np.argsort(y_score, kind="mergesort")
+    sorted_score = y_score[order]
+    positive = np.asarray(y_true, dtype=bool)[order]
+    weights = weights[:, order]
+
+    # Sum the weights of the positives and of the negatives of each group of tied scores
+    group_starts = np.r_[0, np.flatnonzero(np.diff(sorted_score)) + 1]
+    pos = np.add.reduceat(np.where(positive, weights, 0.0), group_starts, axis=1)
+    neg = np.add.reduceat(np.where(positive, 0.0, weights), group_starts, axis=1)
+
+    neg_below = np.cumsum(neg, axis=1) - neg
+    concordant = np.sum(pos * (neg_below + 0.5 * neg), axis=1)
+    # A resample without positives or negatives has no AUC
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.asarray(concordant / (pos.sum(axis=1) * neg.sum(axis=1)))
+
+
+def bootstrap_auc_interval(
+    y_true: np.ndarray,
+    y_score: np.ndarray,
+    n_resamples: int = 1000,
+    confidence: float = 0.95,
+    jobs: int = 1,
+    seed: int = 42,
+) -> tuple[float, float]:
+    """Percentile bootstrap confidence interval of the ROC AUC, with the resamples split across jobs processes."""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_score = np.asarray(y_score, dtype=np.float64)
+
+    chunk_sizes = [
+        min(BOOTSTRAP_CHUNK_SIZE, n_resamples - start)
+        for start in range(0, n_resamples, BOOTSTRAP_CHUNK_SIZE)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if jobs > 1:
+        with ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            chunks = list(
+                pool.map(
+                    bootstrap_auc_chunk,
+                    [y_true] * len(chunk_sizes),
+                    [y_score] * len(chunk_sizes),
+                    chunk_sizes,
+                    seeds,
+                )
+            )
+    else:
+        chunks = [
+            bootstrap_auc_chunk(y_true, y_score, size, s)
+            for size, s in zip(chunk_sizes, seeds)
+        ]
+
+    aucs = np.concatenate(chunks)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(aucs, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def latency_percentiles_ms(
+    predict: Callable[[Any], Any], inputs: list[Any]
+) -> dict[str, float]:
+    """Calls predict on each input in turn and returns the p50 and p99 latency in milliseconds."""
+    latencies = []
+    for x in inputs:
+        start = time.perf_counter()
+        predict(x)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {"p50": float(p50), "p99": float(p99)}
+
+
+def predict_raw(pipeline: Pipeline, df: pd.DataFrame) -> Any:
+    """Scores raw (not binary encoded) rows with the sklearn pipeline, as the sklearn backend does."""
+    return pipeline.predict_proba(encode_binary_columns(df, BINARY_FEATURES))
+
+
+def predict_record(scorer: Any, record: Any) -> Any:
+    """Scores a single record with a scorer of record lists, e.g. a CompiledPipeline."""
+    return scorer.predict_proba([record])
+
+
+def measure_inference_latency(
+    pipeline: Pipeline,
+    requests: pd.DataFrame,
+    batch_size: int = LATENCY_BATCH_SIZE,
+    repeats: int = 20,
+    onnx_path: Path | None = None,
+) -> dict[str, dict[str, dict[str, float]]]:
+    """
+    Measures the single-row and batch_size-row latency of scoring (raw, not binary encoded) requests through the
+    sklearn pipeline as served by the sklearn backend, through its compiled form if it compiles, and through its
+    ONNX export at onnx_path if given.
+    """
+    rows = [requests.iloc[[i]] for i in range(min(len(requests), 200))]
+    batch = requests.sample(n=batch_size, replace=True, random_state=0)
+
+    predict_sklearn = functools.partial(predict_raw, pipeline)
+    latencies = {
+        "sklearn": {
+            "single": latency_percentiles_ms(predict_sklearn, rows),
+            "batch": latency_percentiles_ms(predict_sklearn, [batch] * repeats),
+        }
+    }
+
+    records = list(requests.itertuples(index=False))[: len(rows)]
+    batch_records = list(batch.itertuples(index=False))
+    scorers: dict[str, Any] = {}
+    try:
+        scorers["compiled"] = CompiledPipeline.from_pipeline(pipeline, BINARY_FEATURES)
+    except (TypeError, ValueError):
+        pass
+    if onnx_path is not None:
+        # Imported here as onnxruntime is an optional dependency
+        from utils.onnx_model import OnnxPipeline
+
+        scorers["onnx"] = OnnxPipeline.load(onnx_path)
+
+    for backend, scorer in scorers.items():
+        latencies[backend] = {
+            "single": latency_percentiles_ms(
+                functools.partial(predict_record, scorer), records
+            ),
+            "batch": latency_percentiles_ms(
+                scorer.predict_proba, [batch_records] * repeats
+            ),
+        }
+    return latencies
+
+
+def evaluate_best_model(
+    cv_results: dict[str, Any],
+    candidate: int,
+    pipeline: Pipeline,
+    y_test: np.ndarray,
+    y_pred_proba: np.ndarray,
+    latency_requests: pd.DataFrame,
+    artifacts_dir: Path,
+    bootstrap_resamples: int = 1000,
+    jobs: int = 1,
+    max_latency_ms: float = 10.0,
+) -> dict[str, Any]:
+    """
+    Evaluates the chosen model after the search and returns the report, which is also saved as evaluation.json.
+
+    candidate is the index in cv_results of the chosen model, e.g. the search's best_index_, which isn't always the
+    best ranked candidate (successive halving picks the best of its last iteration). pipeline and y_pred_proba are
+    that model and its holdout scores.
+
+    Writes the search's cv_results_, the holdout ROC/PR curves and the holdout calibration bins as tables to the
+    artifacts dir. The report holds the CV timing (overall and of the chosen candidate), the holdout ROC AUC with its
+    bootstrap 95% confidence interval, the average precision, the calibration bins and the inference latency,
+    flagged if the p99 single-row latency on the backend the server would use exceeds max_latency_ms.
+    """
+    cv_results_df = cv_results_frame(cv_results)
+    save_table(cv_results_df, artifacts_dir / "cv_results.parquet")
+    chosen = cv_results_df.loc[candidate]
+
+    curves = threshold_metrics(y_test, y_pred_proba)
+    calibration = calibration_bins(y_test, y_pred_proba)
+    save_table(curves, artifacts_dir / "holdout_curves.parquet")
+    save_table(calibration, artifacts_dir / "holdout_calibration.parquet")
+
+    auc_low, auc_high = bootstrap_auc_interval(
+        y_test, y_pred_proba, n_resamples=bootstrap_resamples, jobs=jobs
+    )
+
+    latency = measure_inference_latency(pipeline, latency_requests)
+    # The server uses the compiled backend unless the pipeline can't be compiled
+    serving_backend = "compiled" if "compiled" in latency else "sklearn"
+
+    report = {
+        "candidates": len(cv_results_df),
+        "candidate": candidate,
+        "cv_timing_s": {
+            "mean_fit": float(cv_results_df["mean_fit_time"].mean()),
+            "max_fit": float(cv_results_df["mean_fit_time"].max()),
+            "chosen_fit": float(chosen["mean_fit_time"]),
+            "mean_score": float(cv_results_df["mean_score_time"].mean()),
+        },
+        **curve_summary(curves),
+        "roc_auc_ci95": [auc_low, auc_high],
+        "calibration": calibration.to_dict(orient="records"),
+        "latency_ms": latency,
+        "latency_batch_size": LATENCY_BATCH_SIZE,
+        "serving_backend": serving_backend,
+        "latency_flagged": latency[serving_backend]["single"]["p99"] > max_latency_ms,
+    }
+    with open(artifacts_dir / "evaluation.json", "w") as f:
+        json.dump(report, f, indent=2, default=float)
+    return report
@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from utils import encode_binary_columns
+from utils.compiled import FLAT_MODEL_DIR_NAME, CompiledPipeline
+
+from .evaluate import LATENCY_BATCH_SIZE, measure_inference_latency
+from .load_benchmark import measure_load
+
+# Loads one artifact, imports included as on worker boot
+_LOAD_ARTIFACT = """
+if sys.argv[1] == "joblib":
+    import joblib
+    joblib.load(sys.argv[2], mmap_mode="r")
+else:
+    from pathlib import Path
+    from utils.compiled import CompiledPipeline
+    CompiledPipeline.load(Path(sys.argv[2]), mmap_mode="r")
+"""
+
+
+def export_flat_model(
+    pipeline: Pipeline, binary_features: list[str], artifacts_dir: Path
+) -> Path:
+    """Writes the mmap-friendly flat export of the pipeline next to the joblib artifact."""
+    flat_model_dir = artifacts_dir / FLAT_MODEL_DIR_NAME
+    CompiledPipeline.from_pipeline(pipeline, binary_features).save(flat_model_dir)
+    return flat_model_dir
+
+
+def export_onnx_model(
+    pipeline: Pipeline, binary_features: list[str], artifacts_dir: Path
+) -> Path:
+    """
+    Writes the pipeline, preprocessing included, as a single ONNX graph next to the joblib artifact.
+
+    Raises ImportError without the onnx extra, and TypeError or ValueError if the pipeline cannot be exported.
+    """
+    # Imported here as skl2onnx and onnxruntime are optional dependencies
+    from utils.onnx_model import ONNX_MODEL_NAME, OnnxPipeline
+
+    onnx_path = artifacts_dir / ONNX_MODEL_NAME
+    OnnxPipeline.from_pipeline(pipeline, binary_features).save(onnx_path)
+    return onnx_path
+
+
+def compare_onnx_model(
+    pipeline: Pipeline,
+    onnx_path: Path,
+    binary_features: list[str],
+    requests: pd.DataFrame,
+) -> dict[str, Any]:
+    """
+    Checks the ONNX export scores (raw, not binary encoded) requests like the sklearn pipeline, and compares the
+    single-row latency and batch throughput of the sklearn, compiled and ONNX backends.
+    """
+    from utils.onnx_model import OnnxPipeline
+
+    expected = pipeline.predict_proba(encode_binary_columns(requests, binary_features))
+    actual = OnnxPipeline.load(onnx_path).predict_proba(
+        list(requests.itertuples(index=False))
+    )
+    latency = measure_inference_latency(pipeline, requests, onnx_path=onnx_path)
+    return {
+        "max_abs_diff": float(np.max(np.abs(actual - expected[:, 1]))),
+        "backends": {
+            backend: {
+                "single_p50_ms": stats["single"]["p50"],
+                "single_p99_ms": stats["single"]["p99"],
+                "batch_rows_per_s": LATENCY_BATCH_SIZE / stats["batch"]["p50"] * 1000,
+            }
+            for backend, stats in latency.items()
+        },
+    }
+
+
+def compare_artifact_loading(
+    joblib_path: Path, flat_model_dir: Path
+) -> dict[str, dict[str, Any]]:
+    """Measures the startup time and peak RSS of loading each artifact format in a fresh process."""
+    return {
+        model_format: measure_load(_LOAD_ARTIFACT, [model_format, str(path)])
+        for model_format, path in (("joblib", joblib_path), ("flat", flat_model_dir))
+    }
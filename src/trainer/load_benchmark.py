@@ -0,0 +1,49 @@
+import json
+import subprocess  # nosec B404
+import sys
+from collections.abc import Sequence
+from typing import Any
+
+# Runs setup, times load and reports the wall time and the peak RSS of the process, plus whatever report adds to stats
+_SCRIPT_HEAD = """
+import json, resource, sys, time
+def peak_rss_mb():
+    # VmHWM belongs to this process image, while ru_maxrss can carry over the parent's peak across fork/exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+"""
+
+
+def measure_load(
+    load: str, args: Sequence[str] = (), setup: str = "", report: str = ""
+) -> dict[str, Any]:
+    """
+    Runs the load snippet in a fresh interpreter and returns its wall time (load_s) and the peak RSS of that process
+    (max_rss_mb).
+
+    The snippets are unindented Python run at module level, with args as sys.argv[1:]. setup runs before the timer
+    starts (e.g. imports that shouldn't be counted), and report after the peak RSS is read, to add entries to the
+    stats dict (e.g. the size of what was loaded).
+    """
+    script = f"""{_SCRIPT_HEAD}
+{setup}
+start = time.perf_counter()
+{load}
+stats = {{"load_s": time.perf_counter() - start, "max_rss_mb": peak_rss_mb()}}
+{report}
+print(json.dumps(stats))
+"""
+    completed = subprocess.run(  # nosec B603
+        [sys.executable, "-c", script, *args],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    stats: dict[str, Any] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return stats
@@ -0,0 +1,126 @@
+import functools
+import pickle  # nosec B403
+import time
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from utils import (
+    BINARY_FEATURES,
+    CATEGORICAL_FEATURES,
+    NUMERICAL_FEATURES,
+    TRAINING_FEATURES,
+)
+from utils.compiled import CompiledPipeline
+
+from .evaluate import latency_percentiles_ms, predict_raw, predict_record
+
+CATEGORICAL_ENCODINGS = ("one-hot", "native")
+
+
+def make_preprocessor(categorical_encoding: str) -> ColumnTransformer:
+    """
+    Creates the data processor: Z-score scaling for numerical features, binary features passed through and
+    categorical features either one-hot encoded, or ordinal encoded to the category codes XGBoost splits on natively.
+    """
+    if categorical_encoding == "one-hot":
+        categorical_encoder: OneHotEncoder | OrdinalEncoder = OneHotEncoder(
+            handle_unknown="ignore", sparse_output=False
+        )
+    elif categorical_encoding == "native":
+        # Unknown categories become missing values, which XGBoost sends down the learned default branch
+        categorical_encoder = OrdinalEncoder(
+            handle_unknown="use_encoded_value",
+            unknown_value=np.nan,
+            encoded_missing_value=np.nan,
+        )
+    else:
+        raise ValueError(f"Unknown categorical encoding: {categorical_encoding}")
+
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUMERICAL_FEATURES),
+            ("cat", categorical_encoder, CATEGORICAL_FEATURES),
+        ],
+        remainder="passthrough",
+    )
+
+
+def xgb_categorical_params(categorical_encoding: str) -> dict[str, Any]:
+    """XGBClassifier parameters marking the ordinal encoded columns of make_preprocessor as categorical."""
+    if categorical_encoding != "native":
+        return {}
+
+    remainder = [
+        f
+        for f in TRAINING_FEATURES
+        if f not in NUMERICAL_FEATURES and f not in CATEGORICAL_FEATURES
+    ]
+    return {
+        "enable_categorical": True,
+        "feature_types": ["q"] * len(NUMERICAL_FEATURES)
+        + ["c"] * len(CATEGORICAL_FEATURES)
+        + ["q"] * len(remainder),
+    }
+
+
+def compare_categorical_encodings(
+    params: dict[str, Any],
+    xgb_params: dict[str, Any],
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_test: pd.DataFrame,
+    y_test: pd.Series,
+    requests: pd.DataFrame,
+) -> dict[str, dict[str, float]]:
+    """
+    Fits the pipeline with the given (search) params for each categorical encoding, and measures its fit time,
+    holdout ROC AUC, pickled pipeline and booster sizes, and the median latency of scoring one of the (raw, not
+    binary encoded) requests through the sklearn pipeline and through its compiled form.
+    """
+    single_requests = [requests.iloc[[i]] for i in range(len(requests))]
+    records = list(requests.itertuples(index=False))
+
+    results = {}
+    for encoding in CATEGORICAL_ENCODINGS:
+        pipeline = Pipeline(
+            steps=[
+                ("preprocessor", make_preprocessor(encoding)),
+                (
+                    "classifier",
+                    XGBClassifier(**xgb_params, **xgb_categorical_params(encoding)),
+                ),
+            ]
+        ).set_params(**params)
+
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_s = time.perf_counter() - start
+
+        compiled = CompiledPipeline.from_pipeline(pipeline, BINARY_FEATURES)
+        results[encoding] = {
+            "fit_s": fit_s,
+            "holdout_roc_auc": float(
+                roc_auc_score(y_test, pipeline.predict_proba(X_test)[:, 1])
+            ),
+            "n_features_out": compiled.n_features_out,
+            "pipeline_mb": len(pickle.dumps(pipeline)) / 1024**2,
+            "booster_mb": len(
+                pipeline.named_steps["classifier"].get_booster().save_raw("ubj")
+            )
+            / 1024**2,
+            "sklearn_latency_ms": latency_percentiles_ms(
+                functools.partial(predict_raw, pipeline),
+                single_requests,
+            )["p50"],
+            "compiled_latency_ms": latency_percentiles_ms(
+                functools.partial(predict_record, compiled), records
+            )["p50"],
+        }
+    return results
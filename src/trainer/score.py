@@ -0,0 +1,262 @@
+import argparse
+import multiprocessing
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import joblib
+import pandas as pd
+from colorama import Fore, Style, init
+from sklearn.pipeline import Pipeline
+
+from utils import (
+    BINARY_FEATURES,
+    DECISION_THRESHOLD,
+    TRAINING_FEATURES,
+    encode_binary_columns,
+    get_artifacts_dir,
+    get_available_cpu_count,
+    read_feature_list,
+)
+
+from .data import DATASET_DTYPES
+
+init()
+
+# Dtypes of the dataset columns in CSV inputs, fixed for every chunk rather than inferred chunk by chunk, and able
+# to hold missing values (nullable integers, strings rather than categories so chunks share the same type)
+CSV_DTYPES: dict[str, str] = {
+    column: "Int64"
+    if dtype.startswith("int")
+    else "float64"
+    if dtype.startswith("float")
+    else "str"
+    for column, dtype in DATASET_DTYPES.items()
+}
+
+# Pipeline and feature lists of a scoring worker process, loaded once by _init_worker
+_pipeline: Pipeline | None = None
+_training_features: list[str] = TRAINING_FEATURES
+_binary_features: list[str] = BINARY_FEATURES
+
+
+def _init_worker(
+    model_path: Path,
+    training_features: list[str],
+    binary_features: list[str],
+    xgb_nthread: int | None = None,
+) -> None:
+    global _pipeline, _training_features, _binary_features
+    _pipeline = joblib.load(model_path, mmap_mode="r")
+    if xgb_nthread is not None:
+        _pipeline.named_steps["classifier"].set_params(n_jobs=xgb_nthread)
+    _training_features = training_features
+    _binary_features = binary_features
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Returns the chunk with the predicted probability and label appended, using the worker's pipeline."""
+    if _pipeline is None:
+        raise RuntimeError("Scoring worker is not initialised")
+
+    # Unexpected values are scored as missing rather than failing the whole file
+    features = encode_binary_columns(
+        chunk[_training_features], _binary_features, unknown="missing"
+    )
+    probability = _pipeline.predict_proba(features)[:, 1]
+
+    return chunk.assign(
+        probability=probability,
+        prediction=["yes" if p > DECISION_THRESHOLD else "no" for p in probability],
+    )
+
+
+def iter_chunks(input_path: Path, chunk_size: int, sep: str) -> Iterator[pd.DataFrame]:
+    """Streams a CSV file in chunks of chunk_size rows, or a Parquet file one row group at a time."""
+    if input_path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(input_path)
+        for i in range(parquet_file.num_row_groups):
+            yield parquet_file.read_row_group(i).to_pandas()
+    else:
+        yield from pd.read_csv(
+            input_path, sep=sep, dtype=CSV_DTYPES, chunksize=chunk_size
+        )
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file, so that only one chunk is held in memory at a time."""
+
+    def __init__(self, output_path: Path, sep: str) -> None:
+        self.output_path = output_path
+        self.sep = sep
+        self.rows = 0
+        self._parquet_writer: Any = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.output_path.suffix == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                # Columns with no values yet are typed as null, while later chunks may fill them with text
+                schema = pa.schema(
+                    [
+                        field.with_type(pa.string())
+                        if pa.types.is_null(field.type)
+                        else field
+                        for field in table.schema
+                    ],
+                    metadata=table.schema.metadata,
+                )
+                self._parquet_writer = pq.ParquetWriter(self.output_path, schema)
+            # The schema is set by the first chunk, so later chunks whose other columns were inferred differently
+            # (e.g. integers turned to floats by a missing value) are cast to it rather than failing mid-file
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            chunk.to_csv(
+                self.output_path,
+                sep=self.sep,
+                index=False,
+                mode="w" if self.rows == 0 else "a",
+                header=self.rows == 0,
+            )
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(
+    input_path: Path,
+    output_path: Path,
+    model_path: Path,
+    training_features: list[str],
+    binary_features: list[str],
+    chunk_size: int = 100_000,
+    jobs: int = 1,
+    sep: str = ";",
+) -> int:
+    """
+    Scores every row of input_path with the pipeline at model_path and writes them to output_path.
+
+    Chunks are scored by a pool of jobs processes. At most two chunks per process are in flight and results are
+    written in input order as soon as they are ready, so memory stays bounded however large the input is.
+    Returns the number of rows scored.
+    """
+    init_args = (model_path, training_features, binary_features)
+    writer = ChunkWriter(output_path, sep)
+
+    pool: Executor | None = None
+    if jobs > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            # Parallelism comes from the worker processes, so each one scores on a single thread
+            initargs=(*init_args, 1),
+        )
+    else:
+        _init_worker(*init_args)
+
+    try:
+        pending: deque[Future[pd.DataFrame]] = deque()
+        for chunk in iter_chunks(input_path, chunk_size, sep):
+            if pool is None:
+                writer.write(score_chunk(chunk))
+                continue
+
+            pending.append(pool.submit(score_chunk, chunk))
+            if len(pending) >= 2 * jobs:
+                writer.write(pending.popleft().result())
+
+        while pending:
+            writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return writer.rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Score a CSV or Parquet file of customers with the trained model pipeline."
+    )
+    parser.add_argument(
+        "input", type=Path, help="Customers to score (.csv, or .parquet)."
+    )
+    parser.add_argument(
+        "output",
+        type=Path,
+        help="Where to write the customers with their probability and prediction (.csv, or .parquet).",
+    )
+    parser.add_argument(
+        "--model",
+        type=Path,
+        help="Model pipeline to score with, next to its feature lists. Defaults to the trained pipeline in the "
+        "artifacts dir.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Rows per CSV chunk. Parquet files are read one row group at a time.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=get_available_cpu_count(),
+        help="Number of scoring processes.",
+    )
+    parser.add_argument(
+        "--sep", default=";", help="Field separator of the CSV input and output."
+    )
+
+    args = parser.parse_args()
+
+    model_path = args.model or get_artifacts_dir() / "best_ml_pipeline.joblib"
+    # The feature lists are saved by the trainer alongside the pipeline
+    training_features = read_feature_list(
+        model_path.parent / "training_features.json",
+        TRAINING_FEATURES,
+        "training features",
+    )
+    binary_features = read_feature_list(
+        model_path.parent / "binary_features.json", BINARY_FEATURES, "binary features"
+    )
+
+    print(
+        Fore.CYAN
+        + f"Scoring {args.input} with {model_path} on {args.jobs} processes"
+        + Style.RESET_ALL
+    )
+    start = time.perf_counter()
+    rows = score_file(
+        args.input,
+        args.output,
+        model_path,
+        training_features,
+        binary_features,
+        chunk_size=args.chunk_size,
+        jobs=max(1, args.jobs),
+        sep=args.sep,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        Fore.YELLOW
+        + f"Scored {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s) to {args.output}"
+        + Style.RESET_ALL
+    )
+
+
+if __name__ == "__main__":
+    main()
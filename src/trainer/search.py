@@ -0,0 +1,236 @@
+import math
+import time
+from typing import Any
+
+import joblib
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    BaseCrossValidator,
+    HalvingRandomSearchCV,
+    RandomizedSearchCV,
+    train_test_split,
+)
+from sklearn.pipeline import Pipeline
+from xgboost import XGBClassifier
+
+from utils import get_available_cpu_count
+
+from .trials import CheckpointedRandomizedSearchCV, TrialStore
+
+SEARCH_STRATEGIES = ("random", "halving")
+
+type SearchCV = (
+    RandomizedSearchCV | HalvingRandomSearchCV | CheckpointedRandomizedSearchCV
+)
+
+# Upper bound of the n_estimators searched, which is also the largest budget when halving on n_estimators
+MAX_N_ESTIMATORS = 1000
+
+
+class EarlyStoppingXGBClassifier(XGBClassifier):
+    """
+    XGBClassifier that holds out a stratified validation_fraction of its training data for early stopping.
+
+    This lets early stopping work inside sklearn searches and pipelines, which can't pass a per-fit eval_set.
+    """
+
+    def __init__(self, *, validation_fraction: float = 0.1, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.validation_fraction = validation_fraction
+
+    def get_xgb_params(self) -> dict[str, Any]:
+        params = super().get_xgb_params()
+        params.pop("validation_fraction", None)
+        return params
+
+    def fit(self, X: Any, y: Any, **fit_params: Any) -> "EarlyStoppingXGBClassifier":
+        if self.early_stopping_rounds and "eval_set" not in fit_params:
+            X, X_val, y, y_val = train_test_split(
+                X,
+                y,
+                test_size=self.validation_fraction,
+                stratify=y,
+                random_state=self.random_state,
+            )
+            fit_params = {**fit_params, "eval_set": [(X_val, y_val)], "verbose": False}
+        super().fit(X, y, **fit_params)
+        return self
+
+    def to_xgb_classifier(self) -> XGBClassifier:
+        """Converts the fitted model to a plain XGBClassifier (keeping its best iteration) for the saved artifact."""
+        classifier = XGBClassifier()
+        classifier.load_model(self.get_booster().save_raw("ubj"))
+        classifier.set_params(n_jobs=self.n_jobs)
+        return classifier
+
+
+def split_parallelism(
+    cpu_count: int,
+    parallel_fits: int,
+    outer_jobs: int | None = None,
+    xgb_threads: int | None = None,
+) -> tuple[int, int]:
+    """
+    Splits cpu_count between search worker processes (outer_jobs) and XGBoost threads per fit (xgb_threads).
+
+    Unset values are derived so that outer_jobs * xgb_threads doesn't exceed cpu_count. By default independent fits
+    are preferred to threads, which scale worse on small datasets, but processes beyond the parallel_fits the
+    search can run at once would idle, so their cores go to XGBoost threads instead.
+    """
+    if outer_jobs is None and xgb_threads is None:
+        outer_jobs = max(1, min(cpu_count, parallel_fits))
+    if outer_jobs is None:
+        outer_jobs = max(1, cpu_count // max(1, xgb_threads or 1))
+    if xgb_threads is None:
+        xgb_threads = max(1, cpu_count // outer_jobs)
+    return outer_jobs, xgb_threads
+
+
+def build_search_pipeline(
+    preprocessor: Any, classifier: XGBClassifier, cache_dir: str | None = None
+) -> Pipeline:
+    """
+    Chains the preprocessor and the classifier searched over.
+
+    The preprocessing of a fold doesn't depend on the XGBoost parameters being searched, so with a cache_dir a joblib
+    Memory caches each fold's fitted preprocessor and transformed matrix on disk (shared by the search worker
+    processes), and only the classifier is fitted for the other candidates.
+    """
+    return Pipeline(
+        steps=[("preprocessor", preprocessor), ("classifier", classifier)],
+        memory=joblib.Memory(cache_dir, verbose=0) if cache_dir else None,
+    )
+
+
+def checkpoint_size(n_jobs: int, n_splits: int) -> int:
+    """
+    Smallest number of candidates whose (candidate, fold) fits are a multiple of n_jobs.
+
+    Each checkpointed batch waits for all of its fits, so a batch that leaves some workers without a fit in its last
+    round idles them, e.g. a batch of 5 fits on 4 workers keeps them busy only 60% of the time.
+    """
+    return n_jobs // math.gcd(n_jobs, n_splits)
+
+
+def make_search(
+    strategy: str,
+    pipeline: Pipeline,
+    param_distributions: dict[str, Any],
+    n_candidates: int,
+    cv: BaseCrossValidator,
+    halving_resource: str = "n_samples",
+    random_state: int = 42,
+    n_jobs: int = -1,
+    trial_store: TrialStore | None = None,
+    search_key: str = "",
+    resume: bool = False,
+) -> SearchCV:
+    """
+    Creates the hyperparameter search of a strategy, both sampling n_candidates candidates.
+
+    "halving" runs successive halving: every candidate is scored on a small budget of samples (or boosting rounds,
+    with halving_resource="n_estimators"), and only the best third of them move on to a three times larger budget.
+
+    With a trial_store, the random search records each batch of candidates under search_key as it finishes, and can
+    resume from the candidates already recorded. Batches are sized with checkpoint_size to keep every worker busy.
+    """
+    if strategy == "random" and trial_store is not None:
+        return CheckpointedRandomizedSearchCV(
+            estimator=pipeline,
+            param_distributions=param_distributions,
+            n_iter=n_candidates,
+            scoring="roc_auc",
+            cv=cv,
+            verbose=1,
+            random_state=random_state,
+            n_jobs=n_jobs,
+            trial_store=trial_store,
+            search_key=search_key,
+            resume=resume,
+            checkpoint_size=checkpoint_size(
+                n_jobs if n_jobs > 0 else get_available_cpu_count(), cv.get_n_splits()
+            ),
+        )
+    if strategy == "random":
+        return RandomizedSearchCV(
+            estimator=pipeline,
+            param_distributions=param_distributions,
+            n_iter=n_candidates,
+            scoring="roc_auc",
+            cv=cv,
+            verbose=1,
+            random_state=random_state,
+            n_jobs=n_jobs,
+        )
+    if strategy != "halving":
+        raise ValueError(f"Unknown search strategy: {strategy}")
+
+    # With sample counts as the budget, the smallest one is chosen so that the last round uses the whole fold
+    halving_kwargs: dict[str, Any] = {"min_resources": "exhaust"}
+    if halving_resource == "n_estimators":
+        # The number of boosting rounds becomes the budget, so it is no longer searched
+        param_distributions = {
+            k: v
+            for k, v in param_distributions.items()
+            if k != "classifier__n_estimators"
+        }
+        halving_kwargs = {
+            "resource": "classifier__n_estimators",
+            "min_resources": MAX_N_ESTIMATORS // 27,
+            "max_resources": MAX_N_ESTIMATORS,
+        }
+    elif halving_resource != "n_samples":
+        raise ValueError(f"Unknown halving resource: {halving_resource}")
+
+    return HalvingRandomSearchCV(
+        estimator=pipeline,
+        param_distributions=param_distributions,
+        n_candidates=n_candidates,
+        factor=3,
+        scoring="roc_auc",
+        cv=cv,
+        verbose=1,
+        random_state=random_state,
+        n_jobs=n_jobs,
+        **halving_kwargs,
+    )
+
+
+def run_search(search: SearchCV, X: Any, y: Any) -> float:
+    """Fits the search and returns its wall-clock time in seconds."""
+    start = time.perf_counter()
+    search.fit(X, y)
+    return time.perf_counter() - start
+
+
+def count_fits(search: SearchCV) -> int:
+    """Number of (candidate, fold) fits the search ran, excluding the final refit."""
+    return int(len(search.cv_results_["params"]) * search.n_splits_)
+
+
+def mean_fit_time(search: SearchCV) -> float:
+    """Mean wall-clock time in seconds of one (candidate, fold) fit."""
+    return float(search.cv_results_["mean_fit_time"].mean())
+
+
+def best_n_estimators(search: SearchCV) -> int:
+    """Boosting rounds actually used by the best model, i.e. its best iteration when early stopping kicked in."""
+    classifier = search.best_estimator_.named_steps["classifier"]
+    best_iteration = getattr(classifier, "best_iteration", None)
+    if best_iteration is None:
+        return int(classifier.n_estimators)
+    return int(best_iteration) + 1
+
+
+def serving_pipeline(pipeline: Pipeline) -> Pipeline:
+    """
+    Prepares a fitted search pipeline to be saved: without a reference to the preprocessing cache, with a plain
+    XGBClassifier (so that loading the artifact doesn't need the trainer package) and XGBoost's default thread count
+    (the server sets its own).
+    """
+    pipeline.set_params(memory=None)
+    classifier = pipeline.named_steps["classifier"]
+    if isinstance(classifier, EarlyStoppingXGBClassifier):
+        pipeline.set_params(classifier=classifier.to_xgb_classifier())
+    pipeline.set_params(classifier__n_jobs=None)
+    return pipeline
@@ -0,0 +1,118 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+
+from .evaluate import measure_inference_latency
+from .search import serving_pipeline
+
+
+def booster_stats(pipeline: Pipeline) -> dict[str, float]:
+    """Size of the pipeline's serialized (UBJSON) booster, and the number of trees used for prediction."""
+    classifier = pipeline.named_steps["classifier"]
+    booster = classifier.get_booster()
+    try:
+        trees = classifier.best_iteration + 1
+    except AttributeError:
+        trees = booster.num_boosted_rounds()
+    return {
+        "booster_mb": len(booster.save_raw("ubj")) / 1024**2,
+        "trees": int(trees),
+    }
+
+
+def serving_cost(pipeline: Pipeline, requests: pd.DataFrame) -> dict[str, Any]:
+    """
+    Serving cost of a fitted pipeline: booster size, trees and the single-row latency on the backend the server
+    would use (compiled, unless the pipeline can't be compiled).
+    """
+    latency = measure_inference_latency(pipeline, requests, batch_size=100, repeats=5)
+    backend = "compiled" if "compiled" in latency else "sklearn"
+    return {
+        "backend": backend,
+        "latency_p50_ms": latency[backend]["single"]["p50"],
+        "latency_p99_ms": latency[backend]["single"]["p99"],
+        **booster_stats(pipeline),
+    }
+
+
+def pareto_front(
+    finalists: pd.DataFrame,
+    maximize: str = "cv_roc_auc",
+    minimize: tuple[str, ...] = ("latency_p99_ms", "booster_mb"),
+) -> np.ndarray:
+    """Marks the finalists that no other finalist beats on the score without being worse on every cost."""
+    score = finalists[maximize].to_numpy()
+    costs = finalists[list(minimize)].to_numpy()
+
+    # dominated[i, j]: finalist j is at least as good as i everywhere and strictly better somewhere
+    at_least_as_good = (score[None, :] >= score[:, None]) & (
+        costs[None, :, :] <= costs[:, None, :]
+    ).all(axis=2)
+    strictly_better = (score[None, :] > score[:, None]) | (
+        costs[None, :, :] < costs[:, None, :]
+    ).any(axis=2)
+    return np.asarray(~(at_least_as_good & strictly_better).any(axis=1))
+
+
+def select_within_budget(
+    finalists: pd.DataFrame,
+    max_latency_ms: float | None = None,
+    max_booster_mb: float | None = None,
+) -> tuple[int, bool]:
+    """
+    Picks the finalist with the best CV ROC AUC whose p99 latency and booster size are within budget.
+
+    Returns its position and whether it met the budget; if none does, the finalist with the lowest latency is
+    picked instead.
+    """
+    within = np.ones(len(finalists), dtype=bool)
+    if max_latency_ms is not None:
+        within &= finalists["latency_p99_ms"].to_numpy() <= max_latency_ms
+    if max_booster_mb is not None:
+        within &= finalists["booster_mb"].to_numpy() <= max_booster_mb
+
+    if not within.any():
+        return int(np.argmin(finalists["latency_p99_ms"].to_numpy())), False
+    scores = np.where(within, finalists["cv_roc_auc"].to_numpy(), -np.inf)
+    return int(np.argmax(scores)), True
+
+
+def fit_finalists(
+    search: Any,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    requests: pd.DataFrame,
+    n_finalists: int,
+) -> tuple[pd.DataFrame, list[Pipeline]]:
+    """
+    Refits the n_finalists best candidates of a search and measures their serving cost.
+
+    For successive halving searches, only the candidates of the last round (scored on the full budget) are
+    considered. Returns a frame of their CV ROC AUC, costs and params (best first) and the fitted pipelines.
+    """
+    results = pd.DataFrame(search.cv_results_)
+    if "iter" in results:
+        results = results[results["iter"] == results["iter"].max()]
+    top = results.nlargest(n_finalists, "mean_test_score")
+
+    rows = []
+    pipelines = []
+    for candidate, row in top.iterrows():
+        pipeline = clone(search.estimator).set_params(memory=None, **row["params"])
+        # Measured as it would be saved, e.g. with XGBoost's default thread count
+        pipeline = serving_pipeline(pipeline.fit(X_train, y_train))
+
+        rows.append(
+            {
+                "candidate": candidate,
+                "cv_roc_auc": row["mean_test_score"],
+                **serving_cost(pipeline, requests),
+                "params": row["params"],
+            }
+        )
+        pipelines.append(pipeline)
+
+    return pd.DataFrame(rows), pipelines
@@ -1,14 +1,11 @@
 import json
 import argparse
-import pandas as pd
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.model_selection import (
-    train_test_split,
-    StratifiedKFold,
-    RandomizedSearchCV,
-)
-from sklearn.pipeline import Pipeline
+import shutil
+import tempfile
+import time
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.metrics import roc_auc_score
 from xgboost import XGBClassifier
 from scipy.stats import uniform, randint
@@ -16,12 +13,44 @@ import joblib
 from utils import (
     get_data_dir,
     get_artifacts_dir,
-    encode_binary_features,
-    NUMERICAL_FEATURES,
-    CATEGORICAL_FEATURES,
+    get_available_cpu_count,
+    encode_binary_columns,
     BINARY_FEATURES,
 )
 from colorama import init, Fore, Style
+from .data import compare_dataset_loading, file_digest, load_dataset
+from .export import (
+    compare_artifact_loading,
+    compare_onnx_model,
+    export_flat_model,
+    export_onnx_model,
+)
+from .evaluate import evaluate_best_model
+from .preprocessing import (
+    CATEGORICAL_ENCODINGS,
+    compare_categorical_encodings,
+    make_preprocessor,
+    xgb_categorical_params,
+)
+from .search import (
+    SEARCH_STRATEGIES,
+    EarlyStoppingXGBClassifier,
+    best_n_estimators,
+    build_search_pipeline,
+    count_fits,
+    make_search,
+    mean_fit_time,
+    run_search,
+    serving_pipeline,
+    split_parallelism,
+)
+from .selection import (
+    fit_finalists,
+    pareto_front,
+    select_within_budget,
+    serving_cost,
+)
+from .trials import TRIAL_STORE_NAME, TrialStore, make_key
 
 
 init()
@@ -38,40 +67,170 @@ def main() -> None:
         help="Number of iterations of hyperparameter tuning.",
     )
     parser.add_argument("--cv-fold", type=int, default=5, help="Number of CV folds.")
+    parser.add_argument(
+        "--data-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Cache the parsed dataset as Parquet (keyed by the CSV hash) to skip CSV parsing on later runs.",
+    )
+    parser.add_argument(
+        "--cache-preprocessing",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Fit and transform each CV fold's preprocessing once and reuse it for every search candidate.",
+    )
+    parser.add_argument(
+        "--search-strategy",
+        choices=SEARCH_STRATEGIES,
+        default="random",
+        help="Randomized search, or successive halving that only gives the full budget to the best candidates.",
+    )
+    parser.add_argument(
+        "--halving-resource",
+        choices=["n_samples", "n_estimators"],
+        default="n_samples",
+        help="Budget grown between the successive halving rounds.",
+    )
+    parser.add_argument(
+        "--early-stopping-rounds",
+        type=int,
+        default=0,
+        help="Stop boosting once the AUC on an inner validation split hasn't improved for this many rounds (0 disables).",
+    )
+    parser.add_argument(
+        "--validation-fraction",
+        type=float,
+        default=0.1,
+        help="Fraction of each training fold held out for early stopping.",
+    )
+    parser.add_argument(
+        "--checkpoint-trials",
+        action="store_true",
+        help="Record the random search candidates in the trial store as they finish, so that the search can be resumed.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the random search candidates already recorded in the trial store by an identical earlier run "
+        "(implies --checkpoint-trials).",
+    )
+    parser.add_argument(
+        "--outer-jobs",
+        type=int,
+        help="Search worker processes. Defaults to an automatic split of the available cores with --xgb-threads.",
+    )
+    parser.add_argument(
+        "--xgb-threads",
+        type=int,
+        help="XGBoost threads per fit. Defaults to the available cores divided by --outer-jobs.",
+    )
+    parser.add_argument(
+        "--tree-method",
+        choices=["hist", "approx", "exact"],
+        default="hist",
+        help="XGBoost tree construction algorithm.",
+    )
+    parser.add_argument(
+        "--max-bin",
+        type=int,
+        default=256,
+        help="Maximum number of histogram bins per feature (hist and approx tree methods).",
+    )
+    parser.add_argument(
+        "--categorical-encoding",
+        choices=CATEGORICAL_ENCODINGS,
+        default="one-hot",
+        help="One-hot encode categorical features, or let XGBoost split on their category codes natively.",
+    )
+    parser.add_argument(
+        "--compare-categorical-encodings",
+        action="store_true",
+        help="Refit the best parameters with each categorical encoding and compare model size, fit time and latency.",
+    )
+    parser.add_argument(
+        "--compare-search-strategies",
+        action="store_true",
+        help="Also run the plain randomized search and compare its wall-clock time and best AUC with the chosen one.",
+    )
+    parser.add_argument(
+        "--select-finalists",
+        type=int,
+        default=0,
+        help="Refit the best N candidates, measure their serving cost and select within the budgets below "
+        "(0 selects the best CV ROC AUC only).",
+    )
+    parser.add_argument(
+        "--latency-budget-ms",
+        type=float,
+        help="Maximum p99 single-row latency of a finalist on the serving path.",
+    )
+    parser.add_argument(
+        "--size-budget-mb",
+        type=float,
+        help="Maximum serialized booster size of a finalist.",
+    )
+    parser.add_argument(
+        "--bootstrap-resamples",
+        type=int,
+        default=1000,
+        help="Bootstrap resamples of the holdout set for the ROC AUC confidence interval.",
+    )
+    parser.add_argument(
+        "--max-latency-ms",
+        type=float,
+        default=10.0,
+        help="Flag the model if its p99 single-row latency (on the serving path) exceeds this.",
+    )
+    parser.add_argument(
+        "--compare-data-loading",
+        action="store_true",
+        help="Report load time, peak memory and frame size of plain, compact and cached dataset loading.",
+    )
 
     args = parser.parse_args()
+    if args.resume and args.search_strategy != "random":
+        parser.error("--resume is only supported by the random search strategy")
+    if args.categorical_encoding == "native" and args.tree_method == "exact":
+        parser.error("native categorical encoding needs the hist or approx tree method")
 
     print(Fore.CYAN + "========== Creating data pipeline ==========" + Style.RESET_ALL)
 
     print("Loading dataset.csv")
-    df = pd.read_csv(get_data_dir() / "dataset.csv", sep=";")
+    dataset_path = get_data_dir() / "dataset.csv"
+    dataset_cache_dir = get_data_dir() / "cache"
+    load_start = time.perf_counter()
+    df = load_dataset(dataset_path, dataset_cache_dir if args.data_cache else None)
+    print(
+        f"Loaded {len(df)} rows in {time.perf_counter() - load_start:.3f}s "
+        f"({df.memory_usage(deep=True).sum() / 1024**2:.1f} MB in memory)"
+    )
+
+    if args.compare_data_loading:
+        print("Comparing dataset loading (fresh process per mode)")
+        for mode, stats in compare_dataset_loading(
+            dataset_path, dataset_cache_dir
+        ).items():
+            print(
+                Fore.YELLOW
+                + f"  {mode}: load {stats['load_s']:.3f}s, peak RSS {stats['max_rss_mb']:.1f} MB, "
+                f"frame {stats['frame_mb']:.1f} MB" + Style.RESET_ALL
+            )
 
     with open(get_artifacts_dir() / "binary_features.json", "w") as f:
         json.dump(BINARY_FEATURES, f)
 
+    # Raw rows, as received by the API, to measure per-request latency with
+    latency_requests = df.drop(columns=["y"]).sample(
+        n=min(200, len(df)), random_state=42
+    )
+
     print("Encoding binary features")
-    encode_binary_features(df, BINARY_FEATURES + ["y"])
-
-    print("Creating data processor (numerical features + categorical features)")
-    # Define data processor:
-    # Z-score scaling for numerical features
-    # One-Hot Encoding for categorical features
-    # Pass binary encoding through for binary features
-    preprocessor = ColumnTransformer(
-        transformers=[
-            (
-                "num",
-                StandardScaler(),
-                NUMERICAL_FEATURES,
-            ),
-            (
-                "cat",
-                OneHotEncoder(handle_unknown="ignore", sparse_output=False),
-                CATEGORICAL_FEATURES,
-            ),
-        ],
-        remainder="passthrough",
+    df = encode_binary_columns(df, BINARY_FEATURES + ["y"])
+
+    print(
+        f"Creating data processor (numerical features + {args.categorical_encoding} categorical features)"
     )
+    preprocessor = make_preprocessor(args.categorical_encoding)
 
     # The problem is essentially an unbalanced binary classification problem
     # Use class weighting to put more weights on the negative samples
@@ -84,18 +243,63 @@ def main() -> None:
 
     print(Fore.CYAN + "========== Creating model pipeline ==========" + Style.RESET_ALL)
 
+    # Every search worker process runs its own XGBoost threads, so the two are split explicitly to avoid starting
+    # cores * cores competing threads
+    cpu_count = get_available_cpu_count()
+    outer_jobs, xgb_threads = split_parallelism(
+        cpu_count,
+        args.hyper_tune_iter * args.cv_fold,
+        outer_jobs=args.outer_jobs,
+        xgb_threads=args.xgb_threads,
+    )
+    print(
+        f"Parallelism: {outer_jobs} search processes x {xgb_threads} XGBoost threads "
+        f"on {cpu_count} available cores"
+    )
+    xgb_params = {
+        "objective": "binary:logistic",
+        "random_state": 42,
+        "n_jobs": xgb_threads,
+        "tree_method": args.tree_method,
+        "max_bin": args.max_bin,
+    }
+    print(f"Tree method: {args.tree_method}, max bins: {args.max_bin}")
+
     print("Creating model")
     xgb_model = XGBClassifier(
-        objective="binary:logistic", eval_metric="logloss", random_state=42
+        eval_metric="logloss",
+        **xgb_params,
+        **xgb_categorical_params(args.categorical_encoding),
     )
+    if args.early_stopping_rounds > 0:
+        print(
+            f"Early stopping after {args.early_stopping_rounds} rounds without improvement "
+            f"on {args.validation_fraction:.0%} of each training fold"
+        )
+        # Stopping is decided on the validation AUC, the metric the search ranks candidates by
+        classifier: XGBClassifier = EarlyStoppingXGBClassifier(
+            eval_metric="auc",
+            **xgb_params,
+            **xgb_categorical_params(args.categorical_encoding),
+            early_stopping_rounds=args.early_stopping_rounds,
+            validation_fraction=args.validation_fraction,
+        )
+    else:
+        classifier = xgb_model
 
     print(
         Fore.CYAN
         + "========== Creating final pipeline (data + model) =========="
         + Style.RESET_ALL
     )
-    cv_pipeline = Pipeline(
-        steps=[("preprocessor", preprocessor), ("classifier", xgb_model)]
+    # Each fold's preprocessing is cached across the search candidates, in a directory deleted after the search
+    preprocessing_cache_dir = (
+        tempfile.mkdtemp(prefix="preprocessing-cache-")
+        if args.cache_preprocessing
+        else None
+    )
+    cv_pipeline = build_search_pipeline(
+        preprocessor, classifier, preprocessing_cache_dir
     )
 
     print(
@@ -133,25 +337,129 @@ def main() -> None:
     k_folds = args.cv_fold
     cv_strategy = StratifiedKFold(n_splits=k_folds, shuffle=True, random_state=42)
 
-    print("Creating randomized search")
-    n_iter = args.hyper_tune_iter
-    random_search = RandomizedSearchCV(
-        estimator=cv_pipeline,
-        param_distributions=param_distributions,
-        n_iter=n_iter,
-        scoring="roc_auc",
-        cv=cv_strategy,
-        verbose=1,
-        random_state=42,
-        n_jobs=-1,
+    search_name = args.search_strategy
+    if args.search_strategy == "halving":
+        search_name += f" ({args.halving_resource})"
+    if args.early_stopping_rounds > 0:
+        search_name += " + early stopping"
+    searches = {search_name: (args.search_strategy, cv_pipeline)}
+    if args.compare_search_strategies and search_name != "random":
+        # The current randomized search, without early stopping, as the baseline
+        searches = {
+            "random": ("random", clone(cv_pipeline).set_params(classifier=xgb_model)),
+            **searches,
+        }
+
+    # With checkpointing, trials of the random search are recorded as they finish. They are only resumed by runs on
+    # the same data with the same folds and model options, which the search key fingerprints
+    trial_store_path = get_artifacts_dir() / TRIAL_STORE_NAME
+    trial_store = (
+        TrialStore(trial_store_path) if args.checkpoint_trials or args.resume else None
+    )
+    search_key = make_key(
+        {
+            "dataset": file_digest(dataset_path),
+            "cv_fold": args.cv_fold,
+            "categorical_encoding": args.categorical_encoding,
+            "early_stopping_rounds": args.early_stopping_rounds,
+            "validation_fraction": args.validation_fraction,
+            "tree_method": args.tree_method,
+            "max_bin": args.max_bin,
+        }
+    )
+    if trial_store is not None and args.search_strategy == "random":
+        print(f"Recording trials of search {search_key} in {trial_store_path}")
+
+    search_results = {}
+    try:
+        for name, (strategy, pipeline) in searches.items():
+            print(f"Running {name} search")
+            search = make_search(
+                strategy,
+                pipeline,
+                param_distributions,
+                args.hyper_tune_iter,
+                cv_strategy,
+                halving_resource=args.halving_resource,
+                n_jobs=outer_jobs,
+                # Only the chosen search is recorded, not the comparison baseline
+                trial_store=trial_store if name == search_name else None,
+                search_key=search_key,
+                resume=args.resume,
+            )
+            elapsed = run_search(search, X_train, y_train)
+            search_results[name] = (search, elapsed)
+            # Every search starts from a cold preprocessing cache, so that wall-clock times are comparable
+            if pipeline.memory is not None:
+                pipeline.memory.clear(warn=False)
+    finally:
+        if trial_store is not None:
+            trial_store.close()
+        if preprocessing_cache_dir:
+            shutil.rmtree(preprocessing_cache_dir, ignore_errors=True)
+
+    if args.compare_search_strategies:
+        print(Fore.YELLOW + "Search strategy comparison:" + Style.RESET_ALL)
+        for name, (search, elapsed) in search_results.items():
+            holdout_auc = roc_auc_score(
+                y_test, search.best_estimator_.predict_proba(X_test)[:, 1]
+            )
+            print(
+                Fore.YELLOW
+                + f"  {name}: {elapsed:.1f}s wall-clock, {count_fits(search)} fits "
+                f"({mean_fit_time(search):.2f}s each), "
+                f"best CV ROC AUC {search.best_score_:.4f}, holdout ROC AUC {holdout_auc:.4f}, "
+                f"{best_n_estimators(search)} trees" + Style.RESET_ALL
+            )
+
+    best_search, search_elapsed = search_results[search_name]
+    print(
+        f"{search_name} search took {search_elapsed:.1f}s for {count_fits(best_search)} fits, "
+        f"{mean_fit_time(best_search):.2f}s per fit on average"
     )
 
-    print("Running randomized search")
-    random_search.fit(X_train, y_train)
+    best_roc_auc_score = best_search.best_score_
+    best_params = best_search.best_params_
+    # The saved artifact is the full pipeline, without a reference to the deleted cache
+    best_pipeline = serving_pipeline(best_search.best_estimator_)
 
-    best_roc_auc_score = random_search.best_score_
-    best_params = random_search.best_params_
-    best_pipeline = random_search.best_estimator_
+    finalists = None
+    # Index in cv_results_ of the saved candidate, the search's best unless a finalist is selected
+    best_candidate = int(best_search.best_index_)
+    if args.select_finalists > 0:
+        print(
+            f"Refitting the {args.select_finalists} best candidates to measure their serving cost"
+        )
+        finalists, finalist_pipelines = fit_finalists(
+            best_search, X_train, y_train, latency_requests, args.select_finalists
+        )
+        finalists["pareto"] = pareto_front(finalists)
+        selected, within_budget = select_within_budget(
+            finalists, args.latency_budget_ms, args.size_budget_mb
+        )
+        finalists["selected"] = np.arange(len(finalists)) == selected
+
+        print(Fore.YELLOW + "Finalists (* Pareto front, > selected):" + Style.RESET_ALL)
+        for finalist in finalists.itertuples(index=False):
+            print(
+                Fore.YELLOW
+                + f"  {'>' if finalist.selected else ' '}{'*' if finalist.pareto else ' '} "
+                f"candidate {finalist.candidate}: CV ROC AUC {finalist.cv_roc_auc:.4f}, "
+                f"p99 {finalist.latency_p99_ms:.3f} ms ({finalist.backend}), "
+                f"booster {finalist.booster_mb:.2f} MB, {finalist.trees} trees"
+                + Style.RESET_ALL
+            )
+        if not within_budget:
+            print(
+                Fore.RED
+                + "WARN: No finalist is within the latency/size budget, selecting the fastest one"
+                + Style.RESET_ALL
+            )
+
+        best_pipeline = finalist_pipelines[selected]
+        best_candidate = int(finalists.loc[selected, "candidate"])
+        best_roc_auc_score = finalists.loc[selected, "cv_roc_auc"]
+        best_params = finalists.loc[selected, "params"]
 
     print(Fore.YELLOW + f"Best ROC AUC score: {best_roc_auc_score}" + Style.RESET_ALL)
     print(Fore.YELLOW + "Best performing parameters:" + Style.RESET_ALL)
@@ -166,8 +474,147 @@ def main() -> None:
         + Style.RESET_ALL
     )
 
+    print(Fore.CYAN + "========== Evaluating best model ==========" + Style.RESET_ALL)
+    report = evaluate_best_model(
+        best_search.cv_results_,
+        best_candidate,
+        best_pipeline,
+        y_test.to_numpy(),
+        y_pred_proba,
+        latency_requests,
+        get_artifacts_dir(),
+        bootstrap_resamples=args.bootstrap_resamples,
+        jobs=cpu_count,
+        max_latency_ms=args.max_latency_ms,
+    )
+    timing = report["cv_timing_s"]
+    print(
+        f"Saved cv_results_ of {report['candidates']} candidates. Per fold: fit {timing['mean_fit']:.3f}s on average "
+        f"(max {timing['max_fit']:.3f}s, candidate {report['candidate']} {timing['chosen_fit']:.3f}s), "
+        f"score {timing['mean_score']:.3f}s on average"
+    )
+    low, high = report["roc_auc_ci95"]
+    print(
+        Fore.YELLOW
+        + f"Holdout ROC AUC {report['roc_auc']:.4f} (95% CI {low:.4f}-{high:.4f}, "
+        f"{args.bootstrap_resamples} bootstrap resamples), average precision {report['average_precision']:.4f}"
+        + Style.RESET_ALL
+    )
+    print(Fore.YELLOW + "Calibration (mean predicted vs observed):" + Style.RESET_ALL)
+    for calibration_bin in report["calibration"]:
+        print(
+            Fore.YELLOW
+            + f"  from {calibration_bin['bin_start']:.1f}: {calibration_bin['count']} rows, "
+            f"{calibration_bin['mean_predicted']:.3f} vs {calibration_bin['fraction_positive']:.3f}"
+            + Style.RESET_ALL
+        )
+    print(Fore.YELLOW + "Inference latency:" + Style.RESET_ALL)
+    for backend, stats in report["latency_ms"].items():
+        print(
+            Fore.YELLOW
+            + f"  {backend}: single row p50 {stats['single']['p50']:.3f} ms / p99 {stats['single']['p99']:.3f} ms, "
+            f"batch of {report['latency_batch_size']} p50 {stats['batch']['p50']:.3f} ms / "
+            f"p99 {stats['batch']['p99']:.3f} ms" + Style.RESET_ALL
+        )
+    if report["latency_flagged"]:
+        print(
+            Fore.RED
+            + f"WARN: p99 single-row latency on the {report['serving_backend']} backend exceeds "
+            f"{args.max_latency_ms} ms" + Style.RESET_ALL
+        )
+
+    if args.compare_categorical_encodings:
+        print("Comparing categorical encodings (best parameters refit with each)")
+        for encoding, stats in compare_categorical_encodings(
+            # Early stopped models are refit with the number of trees they actually used
+            {**best_params, "classifier__n_estimators": best_n_estimators(best_search)},
+            xgb_params,
+            X_train,
+            y_train,
+            X_test,
+            y_test,
+            latency_requests,
+        ).items():
+            print(
+                Fore.YELLOW
+                + f"  {encoding}: fit {stats['fit_s']:.2f}s, holdout ROC AUC {stats['holdout_roc_auc']:.4f}, "
+                f"{stats['n_features_out']} model inputs, pipeline {stats['pipeline_mb']:.2f} MB, "
+                f"booster {stats['booster_mb']:.2f} MB, per-request latency {stats['sklearn_latency_ms']:.2f} ms "
+                f"(sklearn) / {stats['compiled_latency_ms']:.3f} ms (compiled)"
+                + Style.RESET_ALL
+            )
+
     print("Saving pipeline (data + best performing model)")
-    joblib.dump(best_pipeline, get_artifacts_dir() / "best_ml_pipeline.joblib")
+    pipeline_path = get_artifacts_dir() / "best_ml_pipeline.joblib"
+    joblib.dump(best_pipeline, pipeline_path)
+
+    print("Saving serving cost of the pipeline")
+    with open(get_artifacts_dir() / "serving_cost.json", "w") as f:
+        json.dump(
+            {
+                **serving_cost(best_pipeline, latency_requests),
+                "pipeline_mb": pipeline_path.stat().st_size / 1024**2,
+                "latency_budget_ms": args.latency_budget_ms,
+                "size_budget_mb": args.size_budget_mb,
+                "finalists": None
+                if finalists is None
+                else finalists.to_dict(orient="records"),
+            },
+            f,
+            indent=2,
+            default=str,
+        )
+
+    print(
+        "Exporting flat model (UBJSON booster + memory-mappable preprocessing arrays)"
+    )
+    try:
+        flat_model_dir = export_flat_model(
+            best_pipeline, BINARY_FEATURES, get_artifacts_dir()
+        )
+    except (TypeError, ValueError) as e:
+        print(Fore.RED + f"Skipping flat model export: {e}" + Style.RESET_ALL)
+    else:
+        print("Comparing artifact loading (fresh process per format)")
+        for model_format, stats in compare_artifact_loading(
+            pipeline_path, flat_model_dir
+        ).items():
+            print(
+                Fore.YELLOW
+                + f"  {model_format}: load {stats['load_s']:.3f}s, peak RSS {stats['max_rss_mb']:.1f} MB"
+                + Style.RESET_ALL
+            )
+
+    print("Exporting ONNX model (preprocessing + booster as a single graph)")
+    try:
+        onnx_path = export_onnx_model(
+            best_pipeline, BINARY_FEATURES, get_artifacts_dir()
+        )
+    except ImportError:
+        print(
+            Fore.RED
+            + "Skipping ONNX export: install the onnx extra (onnxruntime, skl2onnx, onnxmltools)"
+            + Style.RESET_ALL
+        )
+    except (TypeError, ValueError) as e:
+        print(Fore.RED + f"Skipping ONNX export: {e}" + Style.RESET_ALL)
+    else:
+        print("Comparing the ONNX model with the joblib pipeline")
+        comparison = compare_onnx_model(
+            best_pipeline, onnx_path, BINARY_FEATURES, latency_requests
+        )
+        print(
+            Fore.YELLOW
+            + f"  max probability difference {comparison['max_abs_diff']:.2e}"
+            + Style.RESET_ALL
+        )
+        for backend, stats in comparison["backends"].items():
+            print(
+                Fore.YELLOW
+                + f"  {backend}: single row p50 {stats['single_p50_ms']:.3f} ms / p99 {stats['single_p99_ms']:.3f} ms, "
+                f"batch throughput {stats['batch_rows_per_s']:,.0f} rows/s"
+                + Style.RESET_ALL
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import GridSearchCV, ParameterSampler, check_cv
+
+from utils import get_artifacts_dir
+
+# Trial history of the hyperparameter searches, under the artifacts dir
+TRIAL_STORE_NAME = "trials.sqlite"
+
+# Fit and score times of each candidate in cv_results_
+_TIME_KEYS = ("mean_fit_time", "std_fit_time", "mean_score_time", "std_score_time")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    search_key TEXT NOT NULL,
+    trial_key TEXT NOT NULL,
+    candidate INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    results TEXT NOT NULL,
+    mean_score REAL,
+    std_score REAL,
+    mean_fit_time_s REAL NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (search_key, trial_key)
+)
+"""
+
+
+def _to_builtin(value: Any) -> Any:
+    # Sampled parameters are numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def make_key(values: dict[str, Any]) -> str:
+    """Fingerprints JSON-serializable values (e.g. sampled parameters, or a search configuration)."""
+    payload = json.dumps(values, sort_keys=True, default=_to_builtin)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+class TrialStore:
+    """
+    SQLite history of hyperparameter search trials: the parameters, per-fold scores and fit time of each candidate.
+
+    Trials are grouped by a search key that fingerprints everything besides the parameters that affects their
+    scores (dataset, folds, model options), so that only comparable trials are resumed. The params and results
+    columns hold JSON and can be queried with SQLite's json_extract.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def completed(self, search_key: str) -> dict[str, dict[str, float]]:
+        """Returns the results of each completed trial of a search, keyed by trial key."""
+        rows = self._connection.execute(
+            "SELECT trial_key, results FROM trials WHERE search_key = ?", (search_key,)
+        )
+        return {trial_key: json.loads(results) for trial_key, results in rows}
+
+    def record(
+        self,
+        search_key: str,
+        candidate: int,
+        params: dict[str, Any],
+        results: dict[str, float],
+    ) -> None:
+        """
+        Saves a finished trial, replacing an earlier run of the same parameters. results holds the trial's entries of
+        cv_results_: per-split test scores, their mean and std, and the mean and std fit and score times.
+        """
+        mean_score, std_score = results["mean_test_score"], results["std_test_score"]
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    search_key,
+                    make_key(params),
+                    candidate,
+                    json.dumps(params, sort_keys=True, default=_to_builtin),
+                    json.dumps(results),
+                    None if np.isnan(mean_score) else mean_score,
+                    None if np.isnan(std_score) else std_score,
+                    results["mean_fit_time"],
+                    datetime.now(UTC).isoformat(),
+                ),
+            )
+
+    def latest_search_key(self) -> str | None:
+        row = self._connection.execute(
+            "SELECT search_key FROM trials ORDER BY finished_at DESC LIMIT 1"
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def trials(self, search_key: str) -> pd.DataFrame:
+        """Returns the trials of a search, one row per candidate with a column per parameter."""
+        df = pd.read_sql_query(
+            "SELECT candidate, params, mean_score, std_score, mean_fit_time_s FROM trials "
+            "WHERE search_key = ? ORDER BY candidate",
+            self._connection,
+            params=(search_key,),
+        )
+        params = pd.DataFrame([json.loads(p) for p in df.pop("params")])
+        return pd.concat([df, params], axis=1)
+
+
+def _n_splits(trial: dict[str, float]) -> int:
+    return sum(key.startswith("split") for key in trial)
+
+
+def _format_results(
+    candidates: list[dict[str, Any]], trials: list[dict[str, float]]
+) -> dict[str, Any]:
+    """Builds the cv_results_ of a single-scorer search from the results of each candidate."""
+    cv_results: dict[str, Any] = {
+        key: np.array([trial[key] for trial in trials]) for key in _TIME_KEYS
+    }
+    for name in sorted({name for params in candidates for name in params}):
+        cv_results[f"param_{name}"] = np.ma.MaskedArray(
+            [params.get(name) for params in candidates],
+            mask=[name not in params for params in candidates],
+            dtype=object,
+        )
+    cv_results["params"] = candidates
+    for key in trials[0]:
+        if key not in _TIME_KEYS:
+            cv_results[key] = np.array([trial[key] for trial in trials])
+    # Failed candidates (NaN scores) rank last, as in sklearn's searches
+    means = cv_results["mean_test_score"]
+    means = np.where(np.isnan(means), -np.inf, means)
+    cv_results["rank_test_score"] = rankdata(-means, method="min").astype(np.int32)
+    return cv_results
+
+
+def summarize_parameter(trials: pd.DataFrame, param: str, bins: int) -> pd.DataFrame:
+    """
+    Groups trials by ranges (quantiles) of a numeric parameter, or by the values of any other, to show which parameter
+    regions are expensive (fit time) versus productive (score).
+    """
+    values = trials[param]
+    if pd.api.types.is_numeric_dtype(values) and values.nunique() > bins:
+        values = pd.qcut(values, q=bins, duplicates="drop")
+    return (
+        trials.groupby(values, observed=True)
+        .agg(
+            trials=("candidate", "size"),
+            mean_score=("mean_score", "mean"),
+            best_score=("mean_score", "max"),
+            mean_fit_time_s=("mean_fit_time_s", "mean"),
+        )
+        .rename_axis(param)
+    )
+
+
+class CheckpointedRandomizedSearchCV:
+    """
+    Randomized search that records every candidate in a TrialStore as soon as its batch of checkpoint_size
+    candidates finishes.
+
+    The seeded candidates of ParameterSampler are evaluated batch by batch, each batch by a GridSearchCV over exactly
+    those candidates, so cv must split the data the same way on every call (e.g. a seeded splitter). With resume,
+    candidates already completed in the store are not fitted again; their stored results are merged into cv_results_,
+    so the best candidate is chosen and refitted among all of them. Once fitted, it exposes the cv_results_, best_*
+    and n_splits_ attributes of a RandomizedSearchCV with a single scorer.
+    """
+
+    def __init__(
+        self,
+        estimator: Any,
+        param_distributions: dict[str, Any],
+        *,
+        n_iter: int = 10,
+        scoring: Any = None,
+        n_jobs: int | None = None,
+        cv: Any = None,
+        verbose: int = 0,
+        random_state: Any = None,
+        error_score: Any = np.nan,
+        trial_store: TrialStore | None = None,
+        search_key: str = "",
+        resume: bool = False,
+        checkpoint_size: int = 1,
+    ) -> None:
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_iter = n_iter
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.cv = cv
+        self.verbose = verbose
+        self.random_state = random_state
+        self.error_score = error_score
+        self.trial_store = trial_store
+        self.search_key = search_key
+        self.resume = resume
+        self.checkpoint_size = checkpoint_size
+
+    def fit(self, X: Any, y: Any) -> "CheckpointedRandomizedSearchCV":
+        candidates = list(
+            ParameterSampler(
+                self.param_distributions, self.n_iter, random_state=self.random_state
+            )
+        )
+        self.n_splits_ = check_cv(
+            self.cv, y, classifier=is_classifier(self.estimator)
+        ).get_n_splits(X, y)
+        completed = (
+            self.trial_store.completed(self.search_key)
+            if self.trial_store is not None and self.resume
+            else {}
+        )
+
+        results: list[dict[str, float] | None] = []
+        pending = []
+        for candidate, params in enumerate(candidates):
+            trial = completed.get(make_key(params))
+            if trial is not None and _n_splits(trial) == self.n_splits_:
+                results.append(trial)
+            else:
+                results.append(None)
+                pending.append(candidate)
+        if self.verbose > 0 and len(pending) < len(candidates):
+            print(
+                f"Resuming search: {len(candidates) - len(pending)} of {len(candidates)} candidates already completed"
+            )
+
+        for start in range(0, len(pending), self.checkpoint_size):
+            batch = pending[start : start + self.checkpoint_size]
+            for candidate, trial in zip(
+                batch, self._evaluate(X, y, [candidates[c] for c in batch])
+            ):
+                results[candidate] = trial
+                if self.trial_store is not None:
+                    self.trial_store.record(
+                        self.search_key, candidate, candidates[candidate], trial
+                    )
+
+        self.cv_results_ = _format_results(
+            candidates, [trial for trial in results if trial is not None]
+        )
+        self.best_index_ = int(self.cv_results_["rank_test_score"].argmin())
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = float(self.cv_results_["mean_test_score"][self.best_index_])
+
+        start_time = time.perf_counter()
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+        self.refit_time_ = time.perf_counter() - start_time
+        return self
+
+    def _evaluate(
+        self, X: Any, y: Any, candidates: list[dict[str, Any]]
+    ) -> list[dict[str, float]]:
+        # A grid of one point per candidate evaluates exactly these candidates, in order
+        search = GridSearchCV(
+            self.estimator,
+            [
+                {name: [value] for name, value in params.items()}
+                for params in candidates
+            ],
+            scoring=self.scoring,
+            n_jobs=self.n_jobs,
+            refit=False,
+            cv=self.cv,
+            verbose=self.verbose,
+            error_score=self.error_score,
+        )
+        search.fit(X, y)
+        keys = [
+            *_TIME_KEYS,
+            *(f"split{i}_test_score" for i in range(self.n_splits_)),
+            "mean_test_score",
+            "std_test_score",
+        ]
+        return [
+            {key: float(search.cv_results_[key][i]) for key in keys}
+            for i in range(len(candidates))
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Summarize the trial history of the hyperparameter searches by parameter region."
+    )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        help="Trial store to read. Defaults to the one in the artifacts dir.",
+    )
+    parser.add_argument(
+        "--search-key", help="Search to summarize. Defaults to the latest one."
+    )
+    parser.add_argument(
+        "--param",
+        action="append",
+        help="Parameter to summarize (repeatable). Defaults to all of them.",
+    )
+    parser.add_argument(
+        "--bins", type=int, default=4, help="Quantile ranges per numeric parameter."
+    )
+
+    args = parser.parse_args()
+
+    store = TrialStore(args.store or get_artifacts_dir() / TRIAL_STORE_NAME)
+    try:
+        search_key = args.search_key or store.latest_search_key()
+        if search_key is None:
+            print("No trials recorded yet")
+            return
+        trials = store.trials(search_key)
+    finally:
+        store.close()
+
+    print(f"Search {search_key}: {len(trials)} trials")
+    print(
+        trials.nlargest(5, "mean_score")
+        .drop(columns=["std_score"])
+        .to_string(index=False)
+    )
+    params = args.param or [
+        c
+        for c in trials.columns
+        if c not in ("candidate", "mean_score", "std_score", "mean_fit_time_s")
+    ]
+    for param in params:
+        print()
+        print(summarize_parameter(trials, param, args.bins).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+import json
+import logging
+import os
 from pathlib import Path
+from typing import Any, Literal
 
+import numpy as np
 import pandas as pd
 
 NUMERICAL_FEATURES = [
@@ -43,6 +48,13 @@ TRAINING_FEATURES = [
 ]
 
 
+# Probability above which a customer is predicted to subscribe, by the API server and the offline scorer alike
+DECISION_THRESHOLD = 0.5
+
+# The API server's logger, which has handlers configured
+logger = logging.getLogger("app")
+
+
 def get_project_root() -> Path:
     current_dir = Path(__file__).resolve().parent
 
@@ -83,9 +95,118 @@ def get_config_dir() -> Path:
     raise RuntimeError("Config dir not found.")
 
 
+def read_feature_list(path: Path, default: list[str], description: str) -> list[str]:
+    """Reads a feature list saved by the trainer, falling back to default when it can't be read."""
+    try:
+        with open(path, "r") as f:
+            features: list[str] = json.load(f)
+            return features
+    # OSError for a missing or unreadable file, ValueError for invalid JSON (JSONDecodeError) or encoding
+    except (OSError, ValueError):
+        logger.warning(
+            f"WARN: Failed to load {description} from {path}. Using default {description}."
+        )
+        return default
+
+
+def get_available_cpu_count() -> int:
+    """
+    Number of CPUs this process may actually use: the CPU affinity mask, further capped by a cgroup v2 CPU quota
+    when running in a container.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpu_count = len(os.sched_getaffinity(0))
+    else:
+        cpu_count = os.cpu_count() or 1
+
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpu_count = min(cpu_count, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+
+    return cpu_count
+
+
 def encode_binary_features(df: pd.DataFrame, binary_features: list[str]) -> None:
     try:
         for bf in binary_features:
             df[bf] = df[bf].map({"yes": 1, "no": 0})
     except KeyError as e:
         print(f"An unexpected key error occurred during binary encoding: {e}")
+
+
+# What to do with binary feature values other than "yes"/"no": raise a ValueError, encode them as missing, or treat
+# them as "no"
+UnknownBinaryPolicy = Literal["raise", "missing", "no"]
+
+
+def _encode_binary_masks(
+    is_yes: np.ndarray,
+    is_unknown: np.ndarray,
+    values: Any,
+    unknown: UnknownBinaryPolicy,
+    feature: str = "",
+) -> np.ndarray:
+    if unknown == "missing":
+        encoded = is_yes.astype(np.float32)
+        encoded[is_unknown] = np.nan
+        return encoded
+    if unknown == "raise" and is_unknown.any():
+        of_feature = f" of binary feature '{feature}'" if feature else ""
+        raise ValueError(
+            f"Unexpected values{of_feature}: {sorted(set(map(str, values[is_unknown])))}"
+        )
+    return is_yes.astype(np.int8)
+
+
+def encode_binary_array(
+    values: np.ndarray, unknown: UnknownBinaryPolicy = "raise"
+) -> np.ndarray:
+    """
+    Encodes an array of "yes"/"no" values (any shape, e.g. one row or a rows x features block) as 1/0.
+
+    Returns int8, except with the "missing" policy, where unknown values become NaN in a float32 array.
+    """
+    is_yes = values == "yes"
+    is_unknown = ~(is_yes | (values == "no"))
+    return _encode_binary_masks(is_yes, is_unknown, values, unknown)
+
+
+def _binary_masks(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the "yes" and the unknown value masks of a column, vectorized by its own dtype."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Classify the few categories once and index with the codes; code -1 (missing) picks the appended entry
+        categories = series.cat.categories.to_numpy(dtype=object)
+        codes = series.cat.codes.to_numpy()
+        is_yes = np.append(categories == "yes", False)
+        is_known = np.append((categories == "yes") | (categories == "no"), False)
+        return is_yes[codes], ~is_known[codes]
+
+    is_yes = series.eq("yes").to_numpy(dtype=bool, na_value=False)
+    is_no = series.eq("no").to_numpy(dtype=bool, na_value=False)
+    return is_yes, ~(is_yes | is_no)
+
+
+def encode_binary_columns(
+    df: pd.DataFrame,
+    binary_features: list[str],
+    unknown: UnknownBinaryPolicy = "raise",
+) -> pd.DataFrame:
+    """
+    Returns a copy of df with the "yes"/"no" binary features encoded as int8 1/0.
+
+    Each column is compared with the vectorized operations of its own dtype (Arrow strings, object or categorical
+    codes). With the "missing" policy the columns are float32 with NaN for unknown values rather than nullable Int8,
+    since sklearn's ColumnTransformer rejects pandas.NA. Raises KeyError if a binary feature is not a column of df.
+    """
+    missing_columns = [bf for bf in binary_features if bf not in df.columns]
+    if missing_columns:
+        raise KeyError(f"Binary features not found: {missing_columns}")
+
+    result = df.copy()
+    for bf in binary_features:
+        is_yes, is_unknown = _binary_masks(df[bf])
+        result[bf] = _encode_binary_masks(is_yes, is_unknown, df[bf], unknown, bf)
+    return result
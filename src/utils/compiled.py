@@ -0,0 +1,312 @@
+import json
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal
+
+import numpy as np
+from xgboost import Booster
+
+from utils import encode_binary_array
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+# Version of the flat artifact layout written by CompiledPipeline.save. Version 2 added ordinal encoded features;
+# older artifacts are still loaded
+FLAT_FORMAT_VERSION = 2
+
+# Directory under the artifacts dir holding the flat export of the best pipeline
+FLAT_MODEL_DIR_NAME = "flat_model"
+
+
+def raw_value(value: Any) -> Any:
+    """Unwraps the str enums of request models, whose hash is the member name rather than the value, before lookups."""
+    return getattr(value, "value", value)
+
+
+class CompiledPipeline:
+    """
+    Fixed-layout numeric transform compiled from a fitted (ColumnTransformer + XGBClassifier) pipeline.
+
+    Skips the DataFrame construction, binary feature mapping and sklearn validation done per request by the
+    original pipeline, and fills the model input matrix straight from the request attributes instead. It can be
+    saved to a flat directory (XGBoost UBJSON booster, .npy arrays and a JSON manifest) that is loaded without
+    unpickling, with the arrays memory-mapped so that worker processes share their pages.
+    """
+
+    def __init__(
+        self,
+        booster: Booster,
+        n_features_out: int,
+        scaled_features: list[str],
+        scaled_columns: np.ndarray,
+        means: np.ndarray,
+        scales: np.ndarray,
+        one_hot: list[tuple[str, int, np.ndarray]],
+        passthrough: list[tuple[str, int, bool]],
+        iteration_range: tuple[int, int] = (0, 0),
+        ordinal: list[tuple[str, int, np.ndarray]] | None = None,
+    ) -> None:
+        self._booster = booster
+        self.n_features_out = n_features_out
+        self._scaled_features = scaled_features
+        self._scaled_columns = np.asarray(scaled_columns, dtype=np.intp)
+        self._means = means
+        self._scales = scales
+        # (feature, first output column, categories) for each one-hot encoded feature
+        self._one_hot_categories = one_hot
+        self._one_hot = [
+            (feature, {c: offset + i for i, c in enumerate(categories.tolist())})
+            for feature, offset, categories in one_hot
+        ]
+        self._passthrough = passthrough
+        self._iteration_range = iteration_range
+        # (feature, output column, categories) for each ordinal encoded feature, split on natively by XGBoost
+        self._ordinal_categories = ordinal or []
+        self._ordinal = [
+            (feature, column, {c: i for i, c in enumerate(categories.tolist())})
+            for feature, column, categories in self._ordinal_categories
+        ]
+
+    @classmethod
+    def from_pipeline(
+        cls, pipeline: "Pipeline", binary_features: list[str]
+    ) -> "CompiledPipeline":
+        """Compiles a fitted pipeline. Raises TypeError or ValueError if it uses steps that cannot be compiled."""
+        # Imported here so that loading a flat artifact doesn't pay for importing sklearn's estimators
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import (
+            FunctionTransformer,
+            OneHotEncoder,
+            OrdinalEncoder,
+            StandardScaler,
+        )
+        from xgboost import XGBClassifier
+
+        preprocessor = pipeline.named_steps["preprocessor"]
+        classifier = pipeline.named_steps["classifier"]
+
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise TypeError(
+                f"Unsupported preprocessor type: {type(preprocessor).__name__}"
+            )
+        if not isinstance(classifier, XGBClassifier):
+            raise TypeError(f"Unsupported classifier type: {type(classifier).__name__}")
+        if classifier.n_classes_ != 2:
+            raise ValueError("Only binary classifiers can be compiled")
+
+        input_features = list(preprocessor.feature_names_in_)
+        binary = set(binary_features)
+
+        scaled_features: list[str] = []
+        scaled_columns: list[int] = []
+        means: list[float] = []
+        scales: list[float] = []
+        one_hot: list[tuple[str, int, np.ndarray]] = []
+        ordinal: list[tuple[str, int, np.ndarray]] = []
+        passthrough: list[tuple[str, int, bool]] = []
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop":
+                continue
+
+            features = [input_features[c] if isinstance(c, int) else c for c in columns]
+            out_slice = preprocessor.output_indices_[name]
+
+            # Fitted ColumnTransformers store "passthrough" as an identity FunctionTransformer
+            if transformer == "passthrough" or (
+                isinstance(transformer, FunctionTransformer)
+                and transformer.func is None
+            ):
+                for i, feature in enumerate(features):
+                    passthrough.append(
+                        (feature, out_slice.start + i, feature in binary)
+                    )
+            elif isinstance(transformer, StandardScaler):
+                n = len(features)
+                mean = transformer.mean_ if transformer.with_mean else np.zeros(n)
+                scale = transformer.scale_ if transformer.with_std else np.ones(n)
+                scaled_features.extend(features)
+                scaled_columns.extend(range(out_slice.start, out_slice.stop))
+                means.extend(mean)
+                scales.extend(scale)
+            elif isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None:
+                    raise ValueError("OneHotEncoder with drop is not supported")
+                if transformer.handle_unknown != "ignore":
+                    raise ValueError(
+                        "OneHotEncoder must use handle_unknown='ignore' to be compiled"
+                    )
+                offset = out_slice.start
+                for feature, categories in zip(features, transformer.categories_):
+                    one_hot.append((feature, offset, np.asarray(categories.tolist())))
+                    offset += len(categories)
+            elif isinstance(transformer, OrdinalEncoder):
+                if transformer.handle_unknown != "use_encoded_value" or not np.isnan(
+                    transformer.unknown_value
+                ):
+                    raise ValueError(
+                        "OrdinalEncoder must encode unknown categories as NaN to be compiled"
+                    )
+                for i, (feature, categories) in enumerate(
+                    zip(features, transformer.categories_)
+                ):
+                    ordinal.append(
+                        (feature, out_slice.start + i, np.asarray(categories.tolist()))
+                    )
+            else:
+                raise ValueError(
+                    f"Unsupported transformer '{name}': {type(transformer).__name__}"
+                )
+
+        try:
+            iteration_range = (0, classifier.best_iteration + 1)
+        except AttributeError:
+            iteration_range = (0, 0)
+
+        return cls(
+            booster=classifier.get_booster(),
+            n_features_out=max(s.stop for s in preprocessor.output_indices_.values()),
+            scaled_features=scaled_features,
+            scaled_columns=np.asarray(scaled_columns, dtype=np.intp),
+            means=np.asarray(means, dtype=np.float64),
+            scales=np.asarray(scales, dtype=np.float64),
+            one_hot=one_hot,
+            passthrough=passthrough,
+            iteration_range=iteration_range,
+            ordinal=ordinal,
+        )
+
+    def save(self, path: Path) -> None:
+        """Writes the flat artifact: booster.ubj, the scaler and category tables as .npy files and manifest.json."""
+        path.mkdir(parents=True, exist_ok=True)
+
+        self._booster.save_model(path / "booster.ubj")
+        np.save(path / "scaled_columns.npy", self._scaled_columns)
+        np.save(path / "means.npy", self._means)
+        np.save(path / "scales.npy", self._scales)
+
+        one_hot = []
+        for i, (feature, offset, categories) in enumerate(self._one_hot_categories):
+            categories_file = f"categories_{i}.npy"
+            # Fixed-width (non-object) arrays so that they can be memory-mapped without pickling
+            np.save(path / categories_file, np.asarray(categories.tolist()))
+            one_hot.append(
+                {"feature": feature, "offset": offset, "categories": categories_file}
+            )
+
+        ordinal = []
+        for i, (feature, column, categories) in enumerate(self._ordinal_categories):
+            categories_file = f"ordinal_categories_{i}.npy"
+            np.save(path / categories_file, np.asarray(categories.tolist()))
+            ordinal.append(
+                {"feature": feature, "column": column, "categories": categories_file}
+            )
+
+        manifest = {
+            "format_version": FLAT_FORMAT_VERSION,
+            "n_features_out": self.n_features_out,
+            "scaled_features": self._scaled_features,
+            "one_hot": one_hot,
+            "ordinal": ordinal,
+            "passthrough": self._passthrough,
+            "iteration_range": self._iteration_range,
+        }
+        with open(path / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(
+        cls, path: Path, mmap_mode: Literal["r"] | None = "r", nthread: int = 0
+    ) -> "CompiledPipeline":
+        """Loads a flat artifact written by save, memory-mapping its arrays by default."""
+        with open(path / "manifest.json", "r") as f:
+            manifest = json.load(f)
+
+        if not 1 <= manifest["format_version"] <= FLAT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported flat artifact version: {manifest['format_version']}"
+            )
+
+        booster = Booster(model_file=path / "booster.ubj")
+        if nthread > 0:
+            booster.set_param({"nthread": nthread})
+
+        return cls(
+            booster=booster,
+            n_features_out=manifest["n_features_out"],
+            scaled_features=manifest["scaled_features"],
+            scaled_columns=np.load(path / "scaled_columns.npy", mmap_mode=mmap_mode),
+            means=np.load(path / "means.npy", mmap_mode=mmap_mode),
+            scales=np.load(path / "scales.npy", mmap_mode=mmap_mode),
+            one_hot=[
+                (
+                    entry["feature"],
+                    entry["offset"],
+                    np.load(path / entry["categories"], mmap_mode=mmap_mode),
+                )
+                for entry in manifest["one_hot"]
+            ],
+            passthrough=[tuple(p) for p in manifest["passthrough"]],
+            iteration_range=tuple(manifest["iteration_range"]),
+            ordinal=[
+                (
+                    entry["feature"],
+                    entry["column"],
+                    np.load(path / entry["categories"], mmap_mode=mmap_mode),
+                )
+                for entry in manifest.get("ordinal", [])
+            ],
+        )
+
+    def transform(self, records: Sequence[Any]) -> np.ndarray:
+        """Builds the model input matrix column by column for records exposing the training features as attributes."""
+        n = len(records)
+        out = np.zeros((n, self.n_features_out), dtype=np.float64)
+        rows = np.arange(n)
+
+        for feature, scaled_column in zip(self._scaled_features, self._scaled_columns):
+            out[:, scaled_column] = [getattr(r, feature) for r in records]
+        out[:, self._scaled_columns] -= self._means
+        out[:, self._scaled_columns] /= self._scales
+
+        for feature, lookup in self._one_hot:
+            # Unknown categories are encoded as all zeros, matching handle_unknown="ignore"
+            index = np.fromiter(
+                (lookup.get(raw_value(getattr(r, feature)), -1) for r in records),
+                dtype=np.intp,
+                count=n,
+            )
+            known = index >= 0
+            out[rows[known], index[known]] = 1.0
+
+        for feature, column, codes in self._ordinal:
+            # Unknown categories are encoded as missing, matching unknown_value=np.nan
+            out[:, column] = [
+                codes.get(raw_value(getattr(r, feature)), np.nan) for r in records
+            ]
+
+        for feature, column, is_binary in self._passthrough:
+            values = [raw_value(getattr(r, feature)) for r in records]
+            out[:, column] = (
+                encode_binary_array(np.asarray(values, dtype=object), unknown="missing")
+                if is_binary
+                else values
+            )
+
+        return out
+
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        """Returns the positive class probability for each record."""
+        return self.predict_matrix(self.transform(records))
+
+    def predict_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        """Returns the positive class probability for each row of a matrix built by transform."""
+        return np.asarray(
+            self._booster.inplace_predict(
+                matrix,
+                iteration_range=self._iteration_range,
+                validate_features=False,
+            ),
+            dtype=np.float64,
+        ).reshape(-1)
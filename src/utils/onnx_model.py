@@ -0,0 +1,192 @@
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from utils import encode_binary_array
+from utils.compiled import CompiledPipeline, raw_value
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+# File under the artifacts dir holding the ONNX export of the best pipeline
+ONNX_MODEL_NAME = "best_ml_pipeline.onnx"
+
+# ONNX Runtime 1.17+ runs both opsets; the ML opset 3 TreeEnsembleClassifier is the one onnxmltools emits
+ONNX_TARGET_OPSET = {"": 17, "ai.onnx.ml": 3}
+
+
+def _convert_standard_scaler(scope: Any, operator: Any, container: Any) -> None:
+    # skl2onnx rounds the mean and scale to float32 before scaling, which moves values sitting on a split threshold
+    # to the other branch. Scale in float64 like sklearn, then cast to float32 like XGBoost does.
+    from onnx import TensorProto
+    from skl2onnx.algebra.onnx_ops import OnnxCast, OnnxDiv, OnnxSub
+
+    scaler = operator.raw_operator
+    n = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n)
+    opv = container.target_opset
+
+    scaled = OnnxDiv(
+        OnnxSub(
+            OnnxCast(operator.inputs[0], to=TensorProto.DOUBLE, op_version=opv),
+            np.asarray(mean, dtype=np.float64),
+            op_version=opv,
+        ),
+        np.asarray(scale, dtype=np.float64),
+        op_version=opv,
+    )
+    OnnxCast(
+        scaled,
+        to=TensorProto.FLOAT,
+        op_version=opv,
+        output_names=operator.outputs[:1],
+    ).add_to(scope, container)
+
+
+def _calculate_standard_scaler_shape(operator: Any) -> None:
+    from skl2onnx.common.data_types import FloatTensorType
+
+    operator.outputs[0].type = FloatTensorType(
+        [operator.inputs[0].get_first_dimension(), operator.raw_operator.n_features_in_]
+    )
+
+
+def _calculate_xgb_classifier_shapes(operator: Any) -> None:
+    from skl2onnx.common.data_types import FloatTensorType
+    from skl2onnx.common.shape_calculator import (
+        calculate_linear_classifier_output_shapes,
+    )
+
+    calculate_linear_classifier_output_shapes(operator)
+    # The probabilities follow the (float64) numeric inputs otherwise, while TreeEnsembleClassifier outputs float32
+    operator.outputs[1].type = FloatTensorType(operator.outputs[1].type.shape)
+
+
+class OnnxPipeline:
+    """
+    Fitted (ColumnTransformer + XGBClassifier) pipeline exported to a single ONNX graph and run with ONNX Runtime.
+
+    The graph takes one [n, 1] input per training feature: float64 for numerical features, strings for categorical
+    features and float32 for binary features, encoded as 1/0 with unknown values missing. Requires the onnx extra
+    (onnxruntime; skl2onnx and onnxmltools to export).
+    """
+
+    def __init__(self, model: bytes, nthread: int = 0) -> None:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if nthread > 0:
+            options.intra_op_num_threads = nthread
+            options.inter_op_num_threads = 1
+        self._model = model
+        self._session = onnxruntime.InferenceSession(
+            model, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = [(i.name, i.type) for i in self._session.get_inputs()]
+
+    @classmethod
+    def from_pipeline(
+        cls, pipeline: "Pipeline", binary_features: list[str]
+    ) -> "OnnxPipeline":
+        """Exports a fitted pipeline. Raises TypeError or ValueError if it uses steps that cannot be exported."""
+        from onnxmltools.convert.xgboost.operator_converters.XGBoost import (
+            convert_xgboost,
+        )
+        from skl2onnx import convert_sklearn, update_registered_converter
+        from skl2onnx.common.data_types import (
+            DoubleTensorType,
+            FloatTensorType,
+            StringTensorType,
+        )
+        from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+        from xgboost import XGBClassifier
+
+        # Exports the layouts the compiled transform supports, except native categorical features
+        CompiledPipeline.from_pipeline(pipeline, binary_features)
+        preprocessor = pipeline.named_steps["preprocessor"]
+        input_features = list(preprocessor.feature_names_in_)
+        binary = set(binary_features)
+
+        categorical: set[str] = set()
+        for _, transformer, columns in preprocessor.transformers_:
+            features = [input_features[c] if isinstance(c, int) else c for c in columns]
+            if isinstance(transformer, OrdinalEncoder):
+                raise TypeError(
+                    "Native categorical features cannot be exported to ONNX"
+                )
+            elif isinstance(transformer, OneHotEncoder):
+                categorical.update(features)
+            elif (
+                not isinstance(transformer, StandardScaler)
+                and transformer != "drop"
+                and not binary.issuperset(features)
+            ):
+                raise ValueError(
+                    "Only binary passthrough features can be exported to ONNX"
+                )
+
+        update_registered_converter(
+            XGBClassifier,
+            "XGBoostXGBClassifier",
+            _calculate_xgb_classifier_shapes,
+            convert_xgboost,
+            options={"nocl": [True, False], "zipmap": [True, False, "columns"]},
+        )
+
+        initial_types = [
+            (
+                feature,
+                StringTensorType([None, 1])
+                if feature in categorical
+                else FloatTensorType([None, 1])
+                if feature in binary
+                else DoubleTensorType([None, 1]),
+            )
+            for feature in input_features
+        ]
+        model = convert_sklearn(
+            pipeline,
+            initial_types=initial_types,
+            options={id(pipeline.named_steps["classifier"]): {"zipmap": False}},
+            target_opset=ONNX_TARGET_OPSET,
+            custom_conversion_functions={StandardScaler: _convert_standard_scaler},
+            custom_shape_calculators={StandardScaler: _calculate_standard_scaler_shape},
+        )
+        return cls(model.SerializeToString())
+
+    def save(self, path: Path) -> None:
+        """Writes the serialized ONNX model."""
+        path.write_bytes(self._model)
+
+    @classmethod
+    def load(cls, path: Path, nthread: int = 0) -> "OnnxPipeline":
+        """Loads an ONNX model written by save."""
+        return cls(path.read_bytes(), nthread=nthread)
+
+    def inputs(self, records: Sequence[Any]) -> dict[str, np.ndarray]:
+        """Builds the graph inputs for records exposing the training features as attributes."""
+        inputs = {}
+        for name, input_type in self._inputs:
+            values = [raw_value(getattr(r, name)) for r in records]
+            if input_type == "tensor(string)":
+                column = np.asarray(values, dtype=object)
+            elif input_type == "tensor(float)":
+                column = encode_binary_array(
+                    np.asarray(values, dtype=object), unknown="missing"
+                )
+            else:
+                column = np.asarray(values, dtype=np.float64)
+            inputs[name] = column.reshape(-1, 1)
+        return inputs
+
+    def predict_proba(self, records: Sequence[Any]) -> np.ndarray:
+        """Returns the positive class probability for each record."""
+        return self.predict_inputs(self.inputs(records))
+
+    def predict_inputs(self, inputs: dict[str, np.ndarray]) -> np.ndarray:
+        """Returns the positive class probability for each row of inputs built by inputs."""
+        probabilities = self._session.run(["probabilities"], inputs)[0]
+        return np.asarray(probabilities[:, 1], dtype=np.float64)
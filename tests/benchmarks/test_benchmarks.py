@@ -0,0 +1,109 @@
+"""
+Benchmarks of the training and inference hot paths, on the synthetic model and data from conftest.
+
+They are disabled (run once, untimed) in the regular test run. To time them and save the results for comparison
+between commits, run:
+
+    pytest tests/benchmarks --benchmark-enable --benchmark-autosave --no-cov
+    pytest tests/benchmarks --benchmark-enable --benchmark-compare --no-cov
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from api_server.inference import build_predictor
+from api_server.main import customer_adapter
+from api_server.models import CustomerData
+from utils import (
+    BINARY_FEATURES,
+    TRAINING_FEATURES,
+    encode_binary_columns,
+    encode_binary_features,
+)
+
+
+@pytest.fixture(scope="module")
+def features(synthetic_dataset):
+    """Fixture to provide the synthetic features, as sent to the API."""
+    return synthetic_dataset.drop(columns=["y"])
+
+
+@pytest.fixture(scope="module")
+def million_rows(features):
+    """Fixture to provide a 1M-row frame built by repeating the synthetic features."""
+    return pd.concat([features] * (1_000_000 // len(features)), ignore_index=True)
+
+
+def sample_rows(features, n):
+    return features.sample(n=n, replace=True, random_state=0).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("n_rows", [1, 1_000_000])
+def test_encode_binary_features(benchmark, features, million_rows, n_rows):
+    """Benchmark the binary feature encoding of a single row and of 1M rows."""
+    df = million_rows if n_rows == 1_000_000 else features.head(n_rows)
+
+    # The encoding works in place, so each round gets a fresh copy (made outside of the timing)
+    benchmark.pedantic(
+        encode_binary_features,
+        setup=lambda: ((df.copy(), BINARY_FEATURES), {}),
+        rounds=5 if n_rows == 1_000_000 else 100,
+    )
+
+
+@pytest.mark.parametrize("n_rows", [1, 1_000_000])
+def test_encode_binary_columns(benchmark, features, million_rows, n_rows):
+    """Benchmark the vectorized binary feature encoding of a single row and of 1M rows."""
+    df = million_rows if n_rows == 1_000_000 else features.head(n_rows)
+
+    encoded = benchmark(encode_binary_columns, df, BINARY_FEATURES)
+    assert encoded[BINARY_FEATURES[0]].dtype == "int8"
+
+
+@pytest.mark.parametrize("batch_size", [1, 64, 4096])
+def test_pipeline_predict_proba(benchmark, synthetic_pipeline, features, batch_size):
+    """Benchmark the sklearn pipeline's predict_proba on an encoded batch."""
+    batch = encode_binary_columns(sample_rows(features, batch_size), BINARY_FEATURES)
+
+    probs = benchmark(synthetic_pipeline.predict_proba, batch)
+    assert probs.shape == (batch_size, 2)
+
+
+@pytest.mark.parametrize("backend", ["sklearn", "compiled"])
+@pytest.mark.parametrize("batch_size", [1, 64, 4096])
+def test_predictor_predict_proba(
+    benchmark, synthetic_pipeline, features, backend, batch_size
+):
+    """Benchmark the serving predictors on validated request models."""
+    predictor = build_predictor(
+        backend, synthetic_pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    )
+    records = [
+        CustomerData.model_validate(r)
+        for r in sample_rows(features, batch_size).to_dict(orient="records")
+    ]
+
+    probs = benchmark(predictor.predict_proba, records)
+    assert probs.shape == (batch_size,)
+
+
+@pytest.mark.parametrize("source", ["dict", "bytes"])
+def test_customer_data_validation(benchmark, features, source):
+    """Benchmark the validation of a single request payload, parsed to a dict first or straight from the raw bytes."""
+    body = features.head(1).to_json(orient="records")[1:-1].encode()
+
+    if source == "dict":
+        customer = benchmark(lambda: CustomerData.model_validate(json.loads(body)))
+    else:
+        customer = benchmark(customer_adapter.validate_json, body)
+    assert customer.job == features["job"].iloc[0]
+
+
+def test_predict_endpoint(benchmark, client, features):
+    """Benchmark /predict end to end through the TestClient."""
+    payload = json.loads(features.head(1).to_json(orient="records"))[0]
+
+    response = benchmark(client.post, "/predict", json=payload)
+    assert response.status_code == 200
@@ -0,0 +1,126 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from api_server.main import app
+from api_server.models import (
+    Contact,
+    Education,
+    Job,
+    Marital,
+    Month,
+    Poutcome,
+    Yesno,
+)
+from utils import (
+    BINARY_FEATURES,
+    CATEGORICAL_FEATURES,
+    NUMERICAL_FEATURES,
+    TRAINING_FEATURES,
+    encode_binary_features,
+)
+
+CATEGORIES = {
+    "job": [e.value for e in Job],
+    "marital": [e.value for e in Marital],
+    "education": [e.value for e in Education],
+    "contact": [e.value for e in Contact],
+    "month": [e.value for e in Month],
+    "poutcome": [e.value for e in Poutcome],
+}
+
+
+def make_synthetic_dataset(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Generates a frame shaped like dataset.csv (features + "y") without needing the real data."""
+    rng = np.random.default_rng(seed)
+    data = {
+        "age": rng.integers(18, 95, n_rows),
+        "job": rng.choice(CATEGORIES["job"], n_rows),
+        "marital": rng.choice(CATEGORIES["marital"], n_rows),
+        "education": rng.choice(CATEGORIES["education"], n_rows),
+        "default": rng.choice([e.value for e in Yesno], n_rows),
+        "balance": rng.normal(1500, 3000, n_rows).round(),
+        "housing": rng.choice([e.value for e in Yesno], n_rows),
+        "loan": rng.choice([e.value for e in Yesno], n_rows),
+        "contact": rng.choice(CATEGORIES["contact"], n_rows),
+        "day": rng.integers(1, 32, n_rows),
+        "month": rng.choice(CATEGORIES["month"], n_rows),
+        "duration": rng.integers(0, 3000, n_rows),
+        "campaign": rng.integers(1, 20, n_rows),
+        "pdays": rng.integers(-1, 400, n_rows),
+        "previous": rng.integers(0, 10, n_rows),
+        "poutcome": rng.choice(CATEGORIES["poutcome"], n_rows),
+    }
+    df = pd.DataFrame(data, columns=TRAINING_FEATURES)
+    logit = (df["duration"] - 400) / 300 + (df["poutcome"] == "success") * 2
+    df["y"] = np.where(rng.random(n_rows) < 1 / (1 + np.exp(-logit)), "yes", "no")
+    return df
+
+
+def fit_synthetic_pipeline(df: pd.DataFrame) -> Pipeline:
+    """Fits a small pipeline with the same structure as the one produced by the trainer."""
+    df = df.copy()
+    encode_binary_features(df, BINARY_FEATURES + ["y"])
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUMERICAL_FEATURES),
+            (
+                "cat",
+                OneHotEncoder(handle_unknown="ignore", sparse_output=False),
+                CATEGORICAL_FEATURES,
+            ),
+        ],
+        remainder="passthrough",
+    )
+    pipeline = Pipeline(
+        steps=[
+            ("preprocessor", preprocessor),
+            (
+                "classifier",
+                XGBClassifier(n_estimators=20, max_depth=3, random_state=42),
+            ),
+        ]
+    )
+    pipeline.fit(df.drop(columns=["y"]), df["y"])
+    return pipeline
+
+
+@pytest.fixture(scope="session")
+def synthetic_dataset():
+    """Fixture to provide a synthetic dataset shaped like dataset.csv."""
+    return make_synthetic_dataset(500)
+
+
+@pytest.fixture(scope="session")
+def synthetic_pipeline(synthetic_dataset):
+    """Fixture to provide a pipeline fitted on the synthetic dataset."""
+    return fit_synthetic_pipeline(synthetic_dataset)
+
+
+@pytest.fixture
+def artifacts_dir(tmp_path, synthetic_pipeline, monkeypatch):
+    """Fixture to provide an artifacts dir holding the synthetic pipeline, as written by the trainer."""
+    joblib.dump(synthetic_pipeline, tmp_path / "best_ml_pipeline.joblib")
+    with open(tmp_path / "training_features.json", "w") as f:
+        json.dump(TRAINING_FEATURES, f)
+    with open(tmp_path / "binary_features.json", "w") as f:
+        json.dump(BINARY_FEATURES, f)
+
+    monkeypatch.setattr("api_server.main.get_artifacts_dir", lambda: tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client(artifacts_dir, monkeypatch):
+    """Fixture to provide a test client for the API server with freshly resolved settings."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    with TestClient(app) as test_client:
+        yield test_client
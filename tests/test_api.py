@@ -0,0 +1,424 @@
+import asyncio
+import copy
+import json
+import threading
+import time
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from api_server.affinity import SUPERVISED_WORKERS_ENV
+from api_server.main import app
+from api_server.models import Job
+from api_server.settings import load_settings
+from trainer.export import export_flat_model, export_onnx_model
+from utils import BINARY_FEATURES
+
+
+@pytest.fixture
+def customer_rows(synthetic_dataset):
+    """Fixture to provide JSON-ready customer payloads from the synthetic dataset."""
+    return json.loads(
+        synthetic_dataset.drop(columns=["y"]).head(10).to_json(orient="records")
+    )
+
+
+def test_health_check(client):
+    """Test the health check endpoint."""
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json() == {"status": "OK"}
+
+
+def test_predict(client, customer_rows):
+    """Test a single prediction."""
+    response = client.post("/predict", json=customer_rows[0])
+    assert response.status_code == 200
+    assert response.json()["status"] == "Success"
+    assert response.json()["prediction"] in ("yes", "no")
+
+
+def test_predict_batch_matches_single_predictions(client, customer_rows):
+    """Test batch predictions are returned in input order and agree with /predict."""
+    response = client.post("/predict/batch", json=customer_rows)
+    assert response.status_code == 200
+
+    predictions = response.json()["predictions"]
+    assert len(predictions) == len(customer_rows)
+    for row, item in zip(customer_rows, predictions):
+        single = client.post("/predict", json=row).json()
+        assert item["prediction"] == single["prediction"]
+        assert 0.0 <= item["probability"] <= 1.0
+
+
+def test_predict_batch_ndjson(client, customer_rows):
+    """Test batches sent as NDJSON are scored like JSON arrays."""
+    body = "\n".join(json.dumps(r) for r in customer_rows)
+    response = client.post(
+        "/predict/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    expected = client.post("/predict/batch", json=customer_rows).json()
+
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_predict_batch_chunking(client, customer_rows, monkeypatch):
+    """Test results are unchanged when the batch is split into several chunks."""
+    expected = client.post("/predict/batch", json=customer_rows).json()
+    monkeypatch.setattr(client.app.state.settings, "BATCH_CHUNK_SIZE", 3)
+
+    assert client.post("/predict/batch", json=customer_rows).json() == expected
+
+
+def test_predict_batch_too_large(client, customer_rows, monkeypatch):
+    """Test batches above MAX_BATCH_SIZE are rejected before their customers are validated."""
+    monkeypatch.setattr(client.app.state.settings, "MAX_BATCH_SIZE", 5)
+    response = client.post("/predict/batch", json=customer_rows)
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Batch of 10 ")
+
+    customer_rows[1]["job"] = "astronaut"
+    response = client.post(
+        "/predict/batch",
+        content="\n".join(json.dumps(row) for row in customer_rows),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 413
+
+    # Within the limit, even with more braces than customers
+    response = client.post("/predict/batch", json=customer_rows[:5])
+    assert response.status_code == 422
+    monkeypatch.setattr(client.app.state.settings, "MAX_BATCH_SIZE", 6)
+    response = client.post("/predict/batch", json=customer_rows[:5] + [[{}] * 5])
+    assert response.status_code == 422
+
+
+def test_predict_batch_invalid_payload(client, customer_rows):
+    """Test invalid customers are reported as validation errors."""
+    customer_rows[1]["job"] = "astronaut"
+    response = client.post("/predict/batch", json=customer_rows)
+    assert response.status_code == 422
+
+
+def wait_until_ready(client, timeout_s=10.0):
+    deadline = time.monotonic() + timeout_s
+    while client.get("/readyz").status_code != 200:
+        assert time.monotonic() < deadline, "worker did not become ready"
+        time.sleep(0.01)
+
+
+def test_ready_after_warm_up(client):
+    """Test the worker is live right away and ready once its model is warmed up, as reported in the metrics."""
+    assert client.get("/livez").status_code == 200
+    wait_until_ready(client)
+
+    body = client.get("/metrics").text
+    assert "api_ready 1" in body
+    warmup_s = next(
+        line
+        for line in body.splitlines()
+        if line.startswith("api_model_warmup_seconds ")
+    )
+    assert float(warmup_s.split()[1]) > 0
+
+
+def test_not_ready_during_warm_up(artifacts_dir, monkeypatch):
+    """Test /readyz reports 503 until the warm-up finishes, while /livez reports OK."""
+    released = threading.Event()
+
+    async def blocked_warm_up(*args):
+        await asyncio.to_thread(released.wait)
+        return 0.5
+
+    monkeypatch.setattr("api_server.main.warm_up", blocked_warm_up)
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    with TestClient(app) as client:
+        assert client.get("/readyz").status_code == 503
+        assert client.get("/livez").status_code == 200
+        released.set()
+        wait_until_ready(client)
+
+
+def test_failed_warm_up_is_not_live(artifacts_dir, monkeypatch):
+    """Test a worker whose model fails to warm up reports neither ready nor live."""
+
+    async def failing_warm_up(*args):
+        raise RuntimeError("warm-up failed")
+
+    monkeypatch.setattr("api_server.main.warm_up", failing_warm_up)
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10.0
+        while client.get("/livez").status_code != 503:
+            assert time.monotonic() < deadline, "worker still reports live"
+            time.sleep(0.01)
+        assert client.get("/readyz").status_code == 503
+
+
+def test_predict_invalid_payload(client, customer_rows):
+    """Test customers validated from the raw body report errors in the body, like FastAPI's own validation."""
+    customer_rows[0]["job"] = "astronaut"
+    response = client.post("/predict", json=customer_rows[0])
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "job"]
+
+    # Batch errors are located by the index of the customer, or of its NDJSON line
+    response = client.post("/predict/batch", json=customer_rows[:2])
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 0, "job"]
+
+    body = "\n".join(json.dumps(row) for row in customer_rows[1::-1])
+    response = client.post(
+        "/predict/batch",
+        content=f"\n{body}\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 2, "job"]
+
+
+def test_openapi_documents_raw_request_bodies(client):
+    """Test the endpoints validating their raw body still document its schema, with the enums inlined."""
+    paths = client.get("/openapi.json").json()["paths"]
+    single = paths["/predict"]["post"]["requestBody"]["content"]["application/json"]
+    batch = paths["/predict/batch"]["post"]["requestBody"]["content"][
+        "application/json"
+    ]
+
+    assert single["schema"]["properties"]["job"]["enum"] == [e.value for e in Job]
+    assert batch["schema"]["items"] == single["schema"]
+
+
+def test_predict_with_micro_batching(artifacts_dir, customer_rows, monkeypatch):
+    """Test /predict gives the same answers when requests are micro-batched."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_MICRO_BATCHING", "true")
+    with TestClient(app) as client:
+        expected = client.post("/predict/batch", json=customer_rows).json()
+        for row, item in zip(customer_rows, expected["predictions"]):
+            assert (
+                client.post("/predict", json=row).json()["prediction"]
+                == item["prediction"]
+            )
+
+        stats = client.get("/batching/stats").json()
+        assert stats["enabled"]
+        assert stats["batch_size"]["count"] == len(customer_rows)
+
+
+@pytest.mark.parametrize("executor", ["none", "process"])
+def test_predict_with_inference_executor(
+    artifacts_dir, customer_rows, monkeypatch, executor
+):
+    """Test predictions are unchanged whether inference runs inline or in a process pool."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_INFERENCE_EXECUTOR", executor)
+    with TestClient(app) as client:
+        # Only route traffic once the pool workers are warmed up, as a load balancer would
+        wait_until_ready(client)
+        response = client.post("/predict/batch", json=customer_rows)
+
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_INFERENCE_EXECUTOR", "thread")
+    with TestClient(app) as client:
+        expected = client.post("/predict/batch", json=customer_rows)
+
+    assert response.status_code == 200
+    assert response.json() == expected.json()
+
+
+def test_process_executor_loads_model_in_workers(artifacts_dir, monkeypatch):
+    """Test only the process pool workers load the model, splitting the worker's XGBoost threads between them."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_INFERENCE_EXECUTOR", "process")
+    monkeypatch.setenv("APP_INFERENCE_WORKERS", "2")
+    monkeypatch.setenv("APP_XGB_NTHREAD", "4")
+    with TestClient(app) as client:
+        model = client.app.state.model
+        assert model.predictor is None
+        assert model.predictor_name == "CompiledPredictor"
+        assert model.load_time_s > 0
+        assert model.load_predictor_args[-1] == 2
+        wait_until_ready(client)
+        assert 'predictor="CompiledPredictor"' in client.get("/metrics").text
+
+
+@pytest.mark.parametrize(
+    ("supervised_workers", "expected_nthread"), [(None, 4), ("4", 2)]
+)
+def test_xgb_nthread_split_between_workers(
+    artifacts_dir, monkeypatch, supervised_workers, expected_nthread
+):
+    """Test workers not started by serve split the CPUs between the configured workers, others between serve's."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setattr("api_server.main.get_available_cpu_count", lambda: 8)
+    monkeypatch.setenv("APP_ENV", "prod")
+    monkeypatch.setenv("APP_WORKERS", "2")
+    monkeypatch.setenv("APP_CPU_AFFINITY", "false")
+    if supervised_workers is not None:
+        monkeypatch.setenv(SUPERVISED_WORKERS_ENV, supervised_workers)
+    with TestClient(app) as client:
+        assert client.app.state.settings.XGB_NTHREAD == expected_nthread
+
+
+def test_predict_saturated_executor_returns_503(client, customer_rows, monkeypatch):
+    """Test a saturated executor sheds load with 503 and Retry-After."""
+    monkeypatch.setattr(
+        client.app.state.executor._slots, "acquire", lambda blocking: False
+    )
+    response = client.post("/predict", json=customer_rows[0])
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_predict_from_flat_model(artifacts_dir, customer_rows, monkeypatch):
+    """Test serving the flat export gives the same predictions as the joblib artifact."""
+    pipeline = joblib.load(artifacts_dir / "best_ml_pipeline.joblib")
+    export_flat_model(pipeline, BINARY_FEATURES, artifacts_dir)
+
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    with TestClient(app) as client:
+        expected = client.post("/predict/batch", json=customer_rows).json()
+
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_MODEL_FORMAT", "flat")
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", json=customer_rows)
+
+    assert response.status_code == 200
+    assert response.json()["predictions"] == expected["predictions"]
+
+
+def test_predict_from_onnx_model(artifacts_dir, customer_rows, monkeypatch):
+    """Test serving the ONNX export with the onnx backend gives the joblib artifact's predictions."""
+    pytest.importorskip("skl2onnx")
+    pipeline = joblib.load(artifacts_dir / "best_ml_pipeline.joblib")
+    export_onnx_model(pipeline, BINARY_FEATURES, artifacts_dir)
+
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    with TestClient(app) as client:
+        expected = client.post("/predict/batch", json=customer_rows).json()
+
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_MODEL_FORMAT", "onnx")
+    monkeypatch.setenv("APP_INFERENCE_BACKEND", "onnx")
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", json=customer_rows)
+
+    assert response.status_code == 200
+    assert [p["prediction"] for p in response.json()["predictions"]] == [
+        p["prediction"] for p in expected["predictions"]
+    ]
+    np.testing.assert_allclose(
+        [p["probability"] for p in response.json()["predictions"]],
+        [p["probability"] for p in expected["predictions"]],
+        atol=1e-6,
+    )
+
+
+def test_predict_with_prediction_cache(artifacts_dir, customer_rows, monkeypatch):
+    """Test repeated identical customers are served from the cache."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_PREDICTION_CACHE", "true")
+    with TestClient(app) as client:
+        first = client.post("/predict", json=customer_rows[0]).json()
+        second = client.post("/predict", json=customer_rows[0]).json()
+        stats = client.get("/cache/stats").json()
+
+    assert first == second
+    assert stats["enabled"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_admin_reload_requires_token(client):
+    """Test the reload endpoint is disabled without a configured admin token."""
+    response = client.post("/admin/reload")
+    assert response.status_code == 403
+
+
+def test_admin_token_is_not_printed(monkeypatch, capsys):
+    """Test the admin token is masked in the configuration printed on startup, and stdout is left alone."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_ADMIN_TOKEN", "secret")
+    settings = load_settings()
+
+    assert settings.ADMIN_TOKEN.get_secret_value() == "secret"
+    # The configuration is printed to stderr, keeping stdout for the output of CLIs
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Final Configuration" in captured.err
+    assert "secret" not in captured.err
+
+
+def test_admin_reload_swaps_model(
+    artifacts_dir, synthetic_pipeline, customer_rows, monkeypatch
+):
+    """Test a reload serves the new artifact without restarting, and reports its version."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_ADMIN_TOKEN", "secret")
+    with TestClient(app) as client:
+        before = client.post("/predict", json=customer_rows[0]).json()
+        assert (
+            client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code
+            == 401
+        )
+
+        # Same model under a different pipeline setting, so the artifact gets a new version
+        joblib.dump(
+            copy.deepcopy(synthetic_pipeline).set_params(verbose=True),
+            artifacts_dir / "best_ml_pipeline.joblib",
+        )
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+        after = client.post("/predict", json=customer_rows[0]).json()
+
+    assert response.status_code == 200
+    assert response.json()["previous_version"] == before["model_version"]
+    assert response.json()["model_version"] == after["model_version"]
+    assert after["model_version"] != before["model_version"]
+
+
+def test_model_watcher_reloads_changed_artifact(
+    artifacts_dir, synthetic_pipeline, customer_rows, monkeypatch
+):
+    """Test the artifact watcher picks up a replaced model once it has settled."""
+    monkeypatch.setattr("api_server.settings.APP_SETTINGS_INSTANCE", None)
+    monkeypatch.setenv("APP_MODEL_WATCH_INTERVAL_S", "0.05")
+    with TestClient(app) as client:
+        before = client.post("/predict", json=customer_rows[0]).json()
+        joblib.dump(
+            copy.deepcopy(synthetic_pipeline).set_params(verbose=True),
+            artifacts_dir / "best_ml_pipeline.joblib",
+        )
+
+        deadline = time.monotonic() + 10
+        after = before
+        while after["model_version"] == before["model_version"]:
+            assert time.monotonic() < deadline, "model was not reloaded"
+            time.sleep(0.05)
+            after = client.post("/predict", json=customer_rows[0]).json()
+
+    assert after["prediction"] == before["prediction"]
+
+
+def test_metrics(client, customer_rows):
+    """Test the metrics endpoint exposes request counts, stage latencies and predictions."""
+    client.post("/predict", json=customer_rows[0])
+    client.post("/predict/batch", json=customer_rows)
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'api_requests_total{method="POST",route="/predict",status="200"}' in body
+    for stage in ("validate", "transform", "predict"):
+        assert f'api_stage_duration_seconds_count{{stage="{stage}"}}' in body
+    assert "api_prediction_probability_count 11" in body
+    assert "api_model_load_seconds" in body
+    assert "api_process_resident_memory_bytes" in body
@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from api_server.batching import MicroBatcher
+from api_server.executor import ExecutorSaturatedError
+
+
+def run_batcher(records, predict, **kwargs):
+    """Submits records concurrently to a running batcher and returns the results and the batcher."""
+
+    async def scenario():
+        batcher = MicroBatcher(predict, **kwargs)
+        batcher.start()
+        try:
+            results = await asyncio.gather(
+                *(batcher.submit(r) for r in records), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+        return results, batcher
+
+    return asyncio.run(scenario())
+
+
+def test_micro_batcher_returns_results_in_caller_order():
+    """Test each caller gets the probability of its own record."""
+    calls = []
+
+    async def predict(records):
+        calls.append(len(records))
+        return np.asarray(records, dtype=float) / 100
+
+    results, batcher = run_batcher(
+        list(range(10)), predict, max_batch_size=4, max_wait_ms=50
+    )
+
+    assert results == [r / 100 for r in range(10)]
+    assert calls == [4, 4, 2]
+    assert batcher.batch_size.count == 3
+    assert batcher.queue_depth.count == 10
+
+
+def test_micro_batcher_flushes_after_max_wait():
+    """Test a partial batch is flushed once max_wait_ms has passed."""
+
+    async def predict(records):
+        return np.zeros(len(records))
+
+    results, batcher = run_batcher([1], predict, max_batch_size=64, max_wait_ms=1)
+
+    assert results == [0.0]
+    assert batcher.batch_size.sum == 1
+
+
+def test_micro_batcher_propagates_errors():
+    """Test a failing batch raises in every waiting caller."""
+
+    async def predict(records):
+        raise ValueError("boom")
+
+    results, _ = run_batcher([1, 2], predict, max_batch_size=2, max_wait_ms=10)
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_micro_batcher_fails_on_missing_results():
+    """Test every caller of a batch fails, instead of waiting forever, when predict returns too few results."""
+
+    async def predict(records):
+        return np.zeros(len(records) - 1)
+
+    results, _ = run_batcher([1, 2, 3], predict, max_batch_size=3, max_wait_ms=50)
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_micro_batcher_rejects_beyond_max_queue_size():
+    """Test records beyond max_queue_size are rejected instead of queued."""
+
+    async def predict(records):
+        return np.zeros(len(records))
+
+    results, _ = run_batcher(
+        list(range(5)), predict, max_batch_size=2, max_wait_ms=10, max_queue_size=3
+    )
+
+    assert results[:3] == [0.0, 0.0, 0.0]
+    assert all(isinstance(r, ExecutorSaturatedError) for r in results[3:])
+
+
+def test_micro_batcher_requires_start():
+    """Test submitting to a batcher that is not running fails."""
+
+    async def predict(records):
+        return np.zeros(len(records))
+
+    with pytest.raises(RuntimeError, match="not running"):
+        asyncio.run(MicroBatcher(predict, 4, 1).submit(1))
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from api_server.bench import build_payloads, run_benchmark, summarize
+
+
+@pytest.fixture
+def payload_rows(synthetic_dataset):
+    """Fixture to provide JSON-ready customer rows from the synthetic dataset."""
+    return json.loads(
+        synthetic_dataset.drop(columns=["y"]).head(20).to_json(orient="records")
+    )
+
+
+def test_build_payloads_batches_rows(payload_rows):
+    """Test rows are serialized one per request, or in batches for the batch endpoint."""
+    assert len(build_payloads(payload_rows, 1)) == 20
+    batches = build_payloads(payload_rows, 8)
+    assert [len(json.loads(b)) for b in batches] == [8, 8, 4]
+
+
+@pytest.mark.parametrize("rps", [None, 200.0])
+def test_run_benchmark_against_app(client, payload_rows, rps):
+    """Test a short closed and open loop run against the app reports successful requests."""
+    results, elapsed_s = asyncio.run(
+        run_benchmark(
+            "http://test",
+            "/predict",
+            build_payloads(payload_rows, 1),
+            concurrency=4,
+            duration_s=0.2,
+            rps=rps,
+            transport=httpx.ASGITransport(app=client.app),
+        )
+    )
+    report = summarize(results, elapsed_s, 1, {"concurrency": 4})
+
+    assert report["requests"] > 0
+    assert report["error_rate"] == 0.0
+    assert report["status_codes"] == {"200": report["requests"]}
+    assert set(report["latency_ms"]) == {"mean", "p50", "p90", "p99", "p99.9", "max"}
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99.9"]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from api_server.cache import LocalSharedBackend, PredictionCache, load_cache_backend
+from api_server.models import CustomerData
+
+
+@pytest.fixture
+def customer(synthetic_dataset):
+    """Fixture to provide a validated customer."""
+    return CustomerData.model_validate(
+        synthetic_dataset.drop(columns=["y"]).iloc[0].to_dict()
+    )
+
+
+def test_prediction_cache_hit_and_miss(customer):
+    """Test a stored prediction is served for an identical customer."""
+    cache = PredictionCache(max_entries=10, ttl_s=60)
+    key = cache.key(cache.request_digest(customer), "v1")
+
+    assert asyncio.run(cache.get(key)) is None
+    asyncio.run(cache.set(key, 0.7))
+    copy_key = cache.key(cache.request_digest(customer.model_copy()), "v1")
+    assert asyncio.run(cache.get(copy_key)) == 0.7
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_prediction_cache_evicts_least_recently_used():
+    """Test the cache stays within max_entries by evicting the oldest entry."""
+    cache = PredictionCache(max_entries=2, ttl_s=60)
+
+    async def scenario():
+        await cache.set("a", 0.1)
+        await cache.set("b", 0.2)
+        await cache.get("a")
+        await cache.set("c", 0.3)
+        return await cache.get("b"), await cache.get("a")
+
+    assert asyncio.run(scenario()) == (None, 0.1)
+    assert cache.evictions == 1
+
+
+def test_prediction_cache_expires_entries():
+    """Test entries older than the TTL are not served."""
+    cache = PredictionCache(max_entries=2, ttl_s=-1)
+    asyncio.run(cache.set("a", 0.1))
+
+    assert asyncio.run(cache.get("a")) is None
+    assert cache.expirations == 1
+
+
+def test_prediction_cache_invalidated_by_model_version(customer):
+    """Test entries of a previous model version are not served for a new one."""
+    shared = LocalSharedBackend()
+    cache = PredictionCache(max_entries=10, ttl_s=60, shared_backend=shared)
+    digest = cache.request_digest(customer)
+    asyncio.run(cache.set(cache.key(digest, "v1"), 0.7))
+
+    assert asyncio.run(cache.get(cache.key(digest, "v2"))) is None
+    assert asyncio.run(cache.get(cache.key(digest, "v1"))) == 0.7
+
+
+def test_prediction_cache_reads_through_shared_backend(customer):
+    """Test a miss in one process is served from the shared backend filled by another."""
+    shared = LocalSharedBackend()
+    writer = PredictionCache(max_entries=10, ttl_s=60, shared_backend=shared)
+    reader = PredictionCache(max_entries=10, ttl_s=60, shared_backend=shared)
+    key = PredictionCache.key(PredictionCache.request_digest(customer), "v1")
+    asyncio.run(writer.set(key, 0.4))
+
+    assert asyncio.run(reader.get(key)) == 0.4
+    assert reader.shared_hits == 1
+
+
+def test_load_cache_backend():
+    """Test shared backends are created from a module:factory path."""
+    assert isinstance(
+        load_cache_backend("api_server.cache:LocalSharedBackend"), LocalSharedBackend
+    )
+    with pytest.raises(ValueError, match="module:factory"):
+        load_cache_backend("api_server.cache")
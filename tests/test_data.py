@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from api_server.inference import SklearnPredictor
+from api_server.models import CustomerData
+from trainer import data
+from trainer.data import compare_dataset_loading, load_dataset
+from utils import (
+    BINARY_FEATURES,
+    CATEGORICAL_FEATURES,
+    NUMERICAL_FEATURES,
+    TRAINING_FEATURES,
+    encode_binary_columns,
+)
+from utils.compiled import CompiledPipeline
+
+
+@pytest.fixture
+def dataset_csv(tmp_path, synthetic_dataset):
+    """Fixture to provide the synthetic dataset written like dataset.csv."""
+    path = tmp_path / "dataset.csv"
+    synthetic_dataset.to_csv(path, sep=";", index=False)
+    return path
+
+
+def test_load_dataset_compact_dtypes(dataset_csv, synthetic_dataset):
+    """Test the dataset is parsed into categories and 32-bit numerics with the same values."""
+    df = load_dataset(dataset_csv)
+
+    assert all(df[c].dtype == "category" for c in CATEGORICAL_FEATURES + ["y"])
+    assert all(df[c].dtype in ("int32", "float32") for c in NUMERICAL_FEATURES)
+    assert (
+        df.memory_usage(deep=True).sum()
+        < synthetic_dataset.memory_usage(deep=True).sum()
+    )
+    np.testing.assert_allclose(df["balance"], synthetic_dataset["balance"], rtol=1e-6)
+    assert df["job"].astype(str).tolist() == synthetic_dataset["job"].tolist()
+
+
+def test_load_dataset_cache(dataset_csv, tmp_path, monkeypatch):
+    """Test a cached copy is reused for the same CSV and not for a modified one."""
+    pytest.importorskip("pyarrow")
+    cache_dir = tmp_path / "cache"
+    first = load_dataset(dataset_csv, cache_dir)
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+    def fail(csv_path):
+        raise AssertionError("CSV parsed despite the cache")
+
+    with monkeypatch.context() as m:
+        m.setattr(data, "read_dataset_csv", fail)
+        cached = load_dataset(dataset_csv, cache_dir)
+    assert cached.equals(first)
+
+    dataset_csv.write_text(
+        dataset_csv.read_text() + dataset_csv.read_text().splitlines()[1] + "\n"
+    )
+    assert len(load_dataset(dataset_csv, cache_dir)) == len(first) + 1
+    assert len(list(cache_dir.glob("*.parquet"))) == 2
+
+
+def test_pipeline_trained_on_compact_dataset_compiles(dataset_csv):
+    """Test a pipeline fitted on the compact frame serves the same probabilities through both backends."""
+    df = encode_binary_columns(load_dataset(dataset_csv), BINARY_FEATURES + ["y"])
+    pipeline = Pipeline(
+        steps=[
+            (
+                "preprocessor",
+                ColumnTransformer(
+                    transformers=[
+                        ("num", StandardScaler(), NUMERICAL_FEATURES),
+                        (
+                            "cat",
+                            OneHotEncoder(handle_unknown="ignore", sparse_output=False),
+                            CATEGORICAL_FEATURES,
+                        ),
+                    ],
+                    remainder="passthrough",
+                ),
+            ),
+            ("classifier", XGBClassifier(n_estimators=10, max_depth=3)),
+        ]
+    )
+    pipeline.fit(df.drop(columns=["y"]), df["y"])
+
+    rows = load_dataset(dataset_csv).drop(columns=["y"]).head(20)
+    customers = [
+        CustomerData.model_validate(r)
+        for r in rows.astype(object).to_dict(orient="records")
+    ]
+    expected = SklearnPredictor(
+        pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    ).predict_proba(customers)
+    compiled = CompiledPipeline.from_pipeline(pipeline, BINARY_FEATURES)
+
+    np.testing.assert_allclose(compiled.predict_proba(customers), expected, rtol=1e-5)
+
+
+def test_compare_dataset_loading(dataset_csv, tmp_path):
+    """Test each loading mode is measured in a fresh process, down to the size of the frame it loads."""
+    results = compare_dataset_loading(dataset_csv, tmp_path / "cache")
+
+    assert set(results) == {"plain", "compact", "cached"}
+    for stats in results.values():
+        assert stats["load_s"] > 0
+        assert stats["max_rss_mb"] > 0
+    assert results["compact"]["frame_mb"] < results["plain"]["frame_mb"]
+    assert results["cached"]["frame_mb"] == pytest.approx(
+        results["compact"]["frame_mb"], rel=0.05
+    )
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+from trainer.evaluate import (
+    bootstrap_auc_chunk,
+    bootstrap_auc_interval,
+    calibration_bins,
+    curve_summary,
+    evaluate_best_model,
+    measure_inference_latency,
+    threshold_metrics,
+)
+
+
+@pytest.fixture
+def scored_labels():
+    """Fixture to provide binary labels and tied, informative scores."""
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, 500)
+    y_score = np.round(rng.random(500) * 0.6 + y_true * 0.3, 2)
+    return y_true, y_score
+
+
+def test_threshold_metrics_match_sklearn(scored_labels):
+    """Test the single-pass curves give sklearn's ROC AUC and average precision."""
+    y_true, y_score = scored_labels
+    curves = threshold_metrics(y_true, y_score)
+    summary = curve_summary(curves)
+
+    assert len(curves) == len(np.unique(y_score))
+    assert summary["roc_auc"] == pytest.approx(roc_auc_score(y_true, y_score))
+    assert summary["average_precision"] == pytest.approx(
+        average_precision_score(y_true, y_score)
+    )
+
+
+def test_bootstrap_auc_chunk_matches_resampled_auc(scored_labels):
+    """Test the weighted AUC of a resample equals the AUC of the explicitly resampled labels and scores."""
+    y_true, y_score = scored_labels
+    auc = bootstrap_auc_chunk(y_true, y_score, 1, seed=7)[0]
+
+    counts = np.random.default_rng(7).multinomial(
+        len(y_true), np.full(len(y_true), 1 / len(y_true))
+    )
+    resample = np.repeat(np.arange(len(y_true)), counts)
+    assert auc == pytest.approx(roc_auc_score(y_true[resample], y_score[resample]))
+
+
+def test_bootstrap_auc_interval(scored_labels):
+    """Test the interval brackets the AUC and doesn't depend on the number of processes."""
+    y_true, y_score = scored_labels
+    low, high = bootstrap_auc_interval(y_true, y_score, n_resamples=120)
+
+    assert low < roc_auc_score(y_true, y_score) < high
+    assert bootstrap_auc_interval(
+        y_true, y_score, n_resamples=120, jobs=2
+    ) == pytest.approx((low, high))
+
+
+def test_calibration_bins(scored_labels):
+    """Test every row falls in a bin and the bin means are consistent with the data."""
+    y_true, y_score = scored_labels
+    bins = calibration_bins(y_true, y_score, n_bins=5)
+
+    assert bins["count"].sum() == len(y_true)
+    assert (bins["count"] * bins["fraction_positive"]).sum() == pytest.approx(
+        y_true.sum()
+    )
+    assert (
+        (bins["mean_predicted"] >= bins["bin_start"])
+        & (bins["mean_predicted"] <= bins["bin_start"] + 0.2)
+    ).all()
+
+
+def test_measure_inference_latency(synthetic_pipeline, synthetic_dataset):
+    """Test single-row and batch latency is measured on the sklearn and compiled paths."""
+    latency = measure_inference_latency(
+        synthetic_pipeline,
+        synthetic_dataset.drop(columns=["y"]).head(20),
+        batch_size=50,
+        repeats=3,
+    )
+
+    assert set(latency) == {"sklearn", "compiled"}
+    for stats in latency.values():
+        assert 0 < stats["single"]["p50"] <= stats["single"]["p99"]
+        assert 0 < stats["batch"]["p50"] <= stats["batch"]["p99"]
+
+
+def test_evaluate_best_model_reports_chosen_candidate(
+    tmp_path, synthetic_pipeline, synthetic_dataset, scored_labels
+):
+    """Test the report describes the candidate that was chosen, even when it isn't the best ranked one."""
+    cv_results = {
+        "mean_fit_time": np.array([1.0, 2.0, 3.0]),
+        "mean_score_time": np.array([0.1, 0.1, 0.1]),
+        "params": [{"C": 1}, {"C": 2}, {"C": 3}],
+        "mean_test_score": np.array([0.7, 0.9, 0.8]),
+        "rank_test_score": np.array([3, 1, 2]),
+    }
+    requests = synthetic_dataset.drop(columns=["y"]).head(5)
+
+    for candidate, fit_time in ((1, 2.0), (2, 3.0)):
+        report = evaluate_best_model(
+            cv_results,
+            candidate,
+            synthetic_pipeline,
+            *scored_labels,
+            requests,
+            tmp_path,
+            bootstrap_resamples=10,
+        )
+        assert report["candidate"] == candidate
+        assert report["cv_timing_s"]["chosen_fit"] == fit_time
+    assert (tmp_path / "evaluation.json").exists()
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from api_server.executor import (
+    ExecutorSaturatedError,
+    InferenceExecutor,
+    InferenceTimeoutError,
+)
+
+
+class BlockingPredictor:
+    """Predictor that blocks until released, to hold executor slots."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict_proba(self, records):
+        self.release.wait(timeout=5)
+        return np.full(len(records), 0.25)
+
+
+def test_executor_runs_predictions_in_pool():
+    """Test predictions run in the thread pool and return their probabilities."""
+    predictor = BlockingPredictor()
+    predictor.release.set()
+    executor = InferenceExecutor("thread", max_workers=1, max_pending=1, timeout_s=5)
+    try:
+        probs = asyncio.run(executor.predict_proba(predictor, [1, 2]))
+    finally:
+        executor.shutdown()
+
+    np.testing.assert_array_equal(probs, [0.25, 0.25])
+
+
+def test_executor_rejects_when_saturated():
+    """Test tasks beyond max_pending are rejected instead of queued."""
+    predictor = BlockingPredictor()
+    executor = InferenceExecutor("thread", max_workers=1, max_pending=1, timeout_s=5)
+
+    async def scenario():
+        first = asyncio.create_task(executor.predict_proba(predictor, [1]))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.predict_proba(predictor, [2])
+        predictor.release.set()
+        return await first
+
+    try:
+        np.testing.assert_array_equal(asyncio.run(scenario()), [0.25])
+    finally:
+        executor.shutdown()
+
+
+def test_executor_times_out_slow_predictions():
+    """Test a task slower than the timeout raises InferenceTimeoutError."""
+    predictor = BlockingPredictor()
+    executor = InferenceExecutor("thread", max_workers=1, max_pending=1, timeout_s=0.05)
+    try:
+        with pytest.raises(InferenceTimeoutError):
+            asyncio.run(executor.predict_proba(predictor, [1]))
+    finally:
+        predictor.release.set()
+        executor.shutdown()
+
+
+def test_executor_rejects_unknown_kind():
+    """Test an unknown pool kind is rejected."""
+    with pytest.raises(ValueError, match="Unknown executor kind"):
+        InferenceExecutor("fiber", max_workers=1, max_pending=1, timeout_s=1)
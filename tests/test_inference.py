@@ -0,0 +1,215 @@
+import numpy as np
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+from xgboost import XGBClassifier
+
+from api_server.inference import SklearnPredictor, build_predictor, load_predictor
+from api_server.models import CustomerData
+from trainer.preprocessing import make_preprocessor, xgb_categorical_params
+from utils import (
+    BINARY_FEATURES,
+    CATEGORICAL_FEATURES,
+    NUMERICAL_FEATURES,
+    TRAINING_FEATURES,
+    encode_binary_columns,
+)
+from utils.compiled import CompiledPipeline
+from utils.onnx_model import OnnxPipeline
+
+
+@pytest.fixture
+def customers(synthetic_dataset):
+    """Fixture to provide validated request models for a slice of the synthetic dataset."""
+    rows = synthetic_dataset.drop(columns=["y"]).head(50).to_dict(orient="records")
+    return [CustomerData.model_validate(r) for r in rows]
+
+
+@pytest.fixture(scope="module")
+def native_pipeline(synthetic_dataset):
+    """Fixture to provide a pipeline fitted with native categorical features instead of one-hot encoding."""
+    df = encode_binary_columns(synthetic_dataset, BINARY_FEATURES + ["y"])
+    pipeline = Pipeline(
+        steps=[
+            ("preprocessor", make_preprocessor("native")),
+            (
+                "classifier",
+                XGBClassifier(
+                    n_estimators=20,
+                    max_depth=3,
+                    random_state=42,
+                    **xgb_categorical_params("native"),
+                ),
+            ),
+        ]
+    )
+    return pipeline.fit(df.drop(columns=["y"]), df["y"])
+
+
+def test_compiled_pipeline_matches_sklearn(synthetic_pipeline, customers):
+    """Test the compiled transform gives the same probabilities as the sklearn pipeline."""
+    expected = SklearnPredictor(
+        synthetic_pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    ).predict_proba(customers)
+    compiled = CompiledPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES)
+
+    np.testing.assert_allclose(compiled.predict_proba(customers), expected, rtol=1e-6)
+
+
+def test_compiled_pipeline_single_row(synthetic_pipeline, customers):
+    """Test a single record is scored to a one-element array."""
+    compiled = CompiledPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES)
+    prob = compiled.predict_proba(customers[:1])
+
+    assert prob.shape == (1,)
+    assert 0.0 <= prob[0] <= 1.0
+
+
+def test_compiled_pipeline_transform_matches_column_transformer(
+    synthetic_pipeline, synthetic_dataset, customers
+):
+    """Test the compiled transform reproduces the ColumnTransformer output layout."""
+    df = synthetic_dataset.drop(columns=["y"]).head(len(customers)).copy()
+    for bf in BINARY_FEATURES:
+        df[bf] = df[bf].map({"yes": 1, "no": 0})
+    expected = synthetic_pipeline.named_steps["preprocessor"].transform(df)
+
+    compiled = CompiledPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES)
+    np.testing.assert_allclose(compiled.transform(customers), expected)
+
+
+def test_build_predictor_falls_back_for_unsupported_pipeline(
+    synthetic_pipeline, synthetic_dataset
+):
+    """Test an unsupported preprocessor falls back to the sklearn pipeline."""
+    pipeline = Pipeline(
+        steps=[
+            (
+                "preprocessor",
+                ColumnTransformer(
+                    [("num", MinMaxScaler(), NUMERICAL_FEATURES)], remainder="drop"
+                ),
+            ),
+            ("classifier", synthetic_pipeline.named_steps["classifier"]),
+        ]
+    )
+    pipeline.named_steps["preprocessor"].fit(synthetic_dataset)
+
+    predictor = build_predictor(
+        "compiled", pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    )
+    assert isinstance(predictor, SklearnPredictor)
+
+
+def test_build_predictor_falls_back_on_unsupported_classifier(synthetic_pipeline):
+    """Test a classifier other than XGBoost is rejected by the compiler and served by the sklearn pipeline."""
+    pipeline = Pipeline(
+        steps=[
+            ("preprocessor", synthetic_pipeline.named_steps["preprocessor"]),
+            ("classifier", LogisticRegression()),
+        ]
+    )
+    with pytest.raises(TypeError, match="Unsupported classifier type"):
+        CompiledPipeline.from_pipeline(pipeline, BINARY_FEATURES)
+
+    predictor = build_predictor(
+        "compiled", pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    )
+    assert isinstance(predictor, SklearnPredictor)
+
+
+def test_build_predictor_unknown_backend(synthetic_pipeline):
+    """Test an unknown backend name is rejected."""
+    with pytest.raises(ValueError, match="Unknown inference backend"):
+        build_predictor("gpu", synthetic_pipeline, TRAINING_FEATURES, BINARY_FEATURES)
+
+
+def test_flat_artifact_round_trip(synthetic_pipeline, customers, tmp_path):
+    """Test a saved flat artifact loads (memory-mapped) and scores like the compiled pipeline."""
+    compiled = CompiledPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES)
+    compiled.save(tmp_path / "flat_model")
+    loaded = CompiledPipeline.load(tmp_path / "flat_model", mmap_mode="r")
+
+    np.testing.assert_allclose(
+        loaded.predict_proba(customers), compiled.predict_proba(customers), rtol=1e-6
+    )
+
+
+def test_compiled_native_categorical_pipeline_matches_sklearn(
+    native_pipeline, customers, tmp_path
+):
+    """Test category codes are fed like in training, by the compiled transform and its flat artifact."""
+    expected = SklearnPredictor(
+        native_pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    ).predict_proba(customers)
+    compiled = CompiledPipeline.from_pipeline(native_pipeline, BINARY_FEATURES)
+    assert compiled.n_features_out == len(TRAINING_FEATURES)
+    np.testing.assert_allclose(compiled.predict_proba(customers), expected, rtol=1e-6)
+
+    compiled.save(tmp_path / "flat_model")
+    loaded = CompiledPipeline.load(tmp_path / "flat_model", mmap_mode="r")
+    np.testing.assert_allclose(loaded.predict_proba(customers), expected, rtol=1e-6)
+
+
+def test_compiled_native_categorical_unknown_category(
+    native_pipeline, synthetic_dataset
+):
+    """Test an unknown category is encoded as missing, as by the fitted OrdinalEncoder."""
+    df = synthetic_dataset.drop(columns=["y"]).head(3).copy()
+    df["job"] = "astronaut"
+    records = list(df.itertuples(index=False))
+    expected = native_pipeline.named_steps["preprocessor"].transform(
+        encode_binary_columns(df, BINARY_FEATURES)
+    )
+
+    compiled = CompiledPipeline.from_pipeline(native_pipeline, BINARY_FEATURES)
+    transformed = compiled.transform(records)
+    np.testing.assert_allclose(transformed, expected)
+    job_column = len(NUMERICAL_FEATURES) + CATEGORICAL_FEATURES.index("job")
+    assert np.isnan(transformed[:, job_column]).all()
+
+
+def test_onnx_pipeline_matches_sklearn(synthetic_pipeline, customers, tmp_path):
+    """Test the ONNX export, saved and loaded, gives the same probabilities as the sklearn pipeline."""
+    pytest.importorskip("skl2onnx")
+    expected = SklearnPredictor(
+        synthetic_pipeline, TRAINING_FEATURES, BINARY_FEATURES
+    ).predict_proba(customers)
+
+    OnnxPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES).save(
+        tmp_path / "model.onnx"
+    )
+    predictor = load_predictor(
+        "onnx",
+        tmp_path / "model.onnx",
+        "onnx",
+        TRAINING_FEATURES,
+        BINARY_FEATURES,
+        xgb_nthread=1,
+    )
+    # The graph computes in float32 like XGBoost, with the scaling done in float64 like sklearn
+    np.testing.assert_allclose(predictor.predict_proba(customers), expected, atol=1e-6)
+
+
+def test_onnx_pipeline_unknown_values(synthetic_pipeline, synthetic_dataset):
+    """Test unknown categories and binary values are encoded like in the compiled transform."""
+    pytest.importorskip("skl2onnx")
+    df = synthetic_dataset.drop(columns=["y"]).head(3).copy()
+    df["job"] = "astronaut"
+    df["loan"] = "maybe"
+    records = list(df.itertuples(index=False))
+
+    onnx_pipeline = OnnxPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES)
+    compiled = CompiledPipeline.from_pipeline(synthetic_pipeline, BINARY_FEATURES)
+    np.testing.assert_allclose(
+        onnx_pipeline.predict_proba(records), compiled.predict_proba(records), atol=1e-6
+    )
+
+
+def test_onnx_pipeline_rejects_native_categorical(native_pipeline):
+    """Test pipelines with native categorical features are not exported."""
+    pytest.importorskip("skl2onnx")
+    with pytest.raises(TypeError, match="Native categorical"):
+        OnnxPipeline.from_pipeline(native_pipeline, BINARY_FEATURES)
@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+
+from api_server.metrics import Histogram, PrometheusWriter, StageTimer
+
+
+def test_histogram_observe_many_matches_observe():
+    """Test vectorised observations land in the same buckets as single ones."""
+    values = np.array([0.05, 0.1, 0.3, 0.5, 0.99, 1.0])
+    one_by_one = Histogram((0.1, 0.5, 1.0))
+    for v in values:
+        one_by_one.observe(v)
+    vectorised = Histogram((0.1, 0.5, 1.0))
+    vectorised.observe_many(values)
+
+    assert vectorised.snapshot() == one_by_one.snapshot()
+
+
+def test_stage_timer_merges_threads():
+    """Test stage timings recorded from several threads are merged when read."""
+    timer = StageTimer()
+
+    def work():
+        for _ in range(100):
+            with timer.time("predict"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    timer.observe("validate", 0.001)
+
+    merged = timer.merged()
+    assert list(merged) == ["predict", "validate"]
+    assert merged["predict"].count == 400
+
+
+def test_prometheus_writer_histogram():
+    """Test histograms are rendered with cumulative buckets, sum and count."""
+    histogram = Histogram((0.5,))
+    histogram.observe(0.2)
+    histogram.observe(0.7)
+    writer = PrometheusWriter()
+    writer.histogram("latency_seconds", "Latency.", [({"stage": 'a"b'}, histogram)])
+
+    assert writer.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="a\\"b",le="0.5"} 1',
+        'latency_seconds_bucket{stage="a\\"b",le="+Inf"} 2',
+        'latency_seconds_sum{stage="a\\"b"} 0.8999999999999999',
+        'latency_seconds_count{stage="a\\"b"} 2',
+    ]
@@ -0,0 +1,145 @@
+import json
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import trainer.score
+from trainer.score import _init_worker, score_file
+from utils import BINARY_FEATURES, TRAINING_FEATURES, encode_binary_features
+
+
+@pytest.fixture
+def model_path(tmp_path, synthetic_pipeline):
+    """Fixture to provide the synthetic pipeline saved as a joblib artifact."""
+    path = tmp_path / "best_ml_pipeline.joblib"
+    joblib.dump(synthetic_pipeline, path)
+    return path
+
+
+def expected_probabilities(pipeline, df):
+    features = df[TRAINING_FEATURES].copy()
+    encode_binary_features(features, BINARY_FEATURES)
+    return pipeline.predict_proba(features)[:, 1]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_score_csv_in_chunks(
+    tmp_path, model_path, synthetic_pipeline, synthetic_dataset, jobs
+):
+    """Test a CSV file is scored chunk by chunk, in input order, like the whole file at once."""
+    input_path = tmp_path / "customers.csv"
+    synthetic_dataset.to_csv(input_path, sep=";", index=False)
+    output_path = tmp_path / "scored.csv"
+
+    rows = score_file(
+        input_path,
+        output_path,
+        model_path,
+        TRAINING_FEATURES,
+        BINARY_FEATURES,
+        chunk_size=64,
+        jobs=jobs,
+    )
+    scored = pd.read_csv(output_path, sep=";")
+
+    assert rows == len(synthetic_dataset) == len(scored)
+    assert list(scored.columns) == [
+        *synthetic_dataset.columns,
+        "probability",
+        "prediction",
+    ]
+    np.testing.assert_allclose(
+        scored["probability"],
+        expected_probabilities(synthetic_pipeline, synthetic_dataset),
+        rtol=1e-6,
+    )
+
+
+def test_score_parquet_row_groups(
+    tmp_path, model_path, synthetic_pipeline, synthetic_dataset
+):
+    """Test a Parquet file is scored one row group at a time into a Parquet file."""
+    pytest.importorskip("pyarrow")
+    input_path = tmp_path / "customers.parquet"
+    synthetic_dataset.to_parquet(input_path, row_group_size=100, index=False)
+    output_path = tmp_path / "scored.parquet"
+
+    score_file(input_path, output_path, model_path, TRAINING_FEATURES, BINARY_FEATURES)
+    scored = pd.read_parquet(output_path)
+
+    np.testing.assert_allclose(
+        scored["probability"],
+        expected_probabilities(synthetic_pipeline, synthetic_dataset),
+        rtol=1e-6,
+    )
+
+
+def test_score_csv_to_parquet_with_changing_dtypes(
+    tmp_path, model_path, synthetic_dataset
+):
+    """Test CSV chunks whose inferred dtypes differ are written to a single Parquet schema."""
+    pytest.importorskip("pyarrow")
+    df = synthetic_dataset.assign(customer_id=range(len(synthetic_dataset)))
+    # Missing values in later chunks only: an integer feature, a whole chunk of a categorical feature, and an
+    # integer column the pipeline doesn't use
+    df["age"] = df["age"].astype("Int64")
+    df.loc[70, "age"] = pd.NA
+    df.loc[128:191, "job"] = np.nan
+    df["customer_id"] = df["customer_id"].astype("Int64")
+    df.loc[200, "customer_id"] = pd.NA
+    input_path = tmp_path / "customers.csv"
+    df.to_csv(input_path, sep=";", index=False)
+
+    for output_path in (tmp_path / "scored.csv", tmp_path / "scored.parquet"):
+        score_file(
+            input_path,
+            output_path,
+            model_path,
+            TRAINING_FEATURES,
+            BINARY_FEATURES,
+            chunk_size=64,
+        )
+    expected = pd.read_csv(tmp_path / "scored.csv", sep=";")
+    scored = pd.read_parquet(tmp_path / "scored.parquet")
+
+    assert len(scored) == len(df)
+    assert scored["age"].isna().sum() == 1
+    assert scored["job"].isna().sum() == 64
+    assert scored["customer_id"].isna().sum() == 1
+    np.testing.assert_allclose(scored["probability"], expected["probability"])
+
+
+def test_score_threads_only_pinned_in_worker_processes(model_path, synthetic_pipeline):
+    """Test a single scoring process keeps the pipeline's XGBoost threads, while pool workers use one each."""
+    _init_worker(model_path, TRAINING_FEATURES, BINARY_FEATURES)
+    assert (
+        trainer.score._pipeline.named_steps["classifier"].n_jobs
+        == synthetic_pipeline.named_steps["classifier"].n_jobs
+    )
+
+    _init_worker(model_path, TRAINING_FEATURES, BINARY_FEATURES, xgb_nthread=1)
+    assert trainer.score._pipeline.named_steps["classifier"].n_jobs == 1
+
+
+def test_score_reads_feature_lists_next_to_model(tmp_path, model_path, monkeypatch):
+    """Test --model is scored with the feature lists saved alongside it, not those of the artifacts dir."""
+    training_features = TRAINING_FEATURES[::-1]
+    (model_path.parent / "training_features.json").write_text(
+        json.dumps(training_features)
+    )
+    calls = []
+    monkeypatch.setattr(
+        trainer.score, "score_file", lambda *args, **kwargs: calls.append(args) or 0
+    )
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["score", "in.csv", str(tmp_path / "out.csv"), "--model", str(model_path)],
+    )
+
+    trainer.score.main()
+
+    assert calls[0][2:] == (model_path, training_features, BINARY_FEATURES)
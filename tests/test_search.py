@@ -0,0 +1,183 @@
+import pickle
+
+import numpy as np
+from scipy.stats import randint, uniform
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from trainer.search import (
+    MAX_N_ESTIMATORS,
+    EarlyStoppingXGBClassifier,
+    best_n_estimators,
+    build_search_pipeline,
+    checkpoint_size,
+    count_fits,
+    make_search,
+    serving_pipeline,
+    split_parallelism,
+)
+from utils import (
+    BINARY_FEATURES,
+    CATEGORICAL_FEATURES,
+    NUMERICAL_FEATURES,
+    encode_binary_columns,
+)
+
+
+class CountingColumnTransformer(ColumnTransformer):
+    """ColumnTransformer counting its fits (in this process, so only for searches with n_jobs=1)."""
+
+    fits = 0
+
+    def fit_transform(self, X, y=None, **params):
+        type(self).fits += 1
+        return super().fit_transform(X, y, **params)
+
+
+def make_search_pipeline(classifier: XGBClassifier) -> Pipeline:
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUMERICAL_FEATURES),
+            (
+                "cat",
+                OneHotEncoder(handle_unknown="ignore", sparse_output=False),
+                CATEGORICAL_FEATURES,
+            ),
+        ],
+        remainder="passthrough",
+    )
+    return Pipeline(steps=[("preprocessor", preprocessor), ("classifier", classifier)])
+
+
+def test_early_stopping_classifier_stops_and_converts():
+    """Test early stopping uses an inner split, survives cloning and converts to an equivalent XGBClassifier."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, 5))
+    y = (X[:, 0] + rng.normal(size=1000) > 0).astype(int)
+
+    classifier = clone(
+        EarlyStoppingXGBClassifier(
+            n_estimators=500,
+            learning_rate=0.3,
+            early_stopping_rounds=5,
+            validation_fraction=0.2,
+            random_state=42,
+        )
+    )
+    assert classifier.get_params()["validation_fraction"] == 0.2
+    assert "validation_fraction" not in classifier.get_xgb_params()
+
+    classifier.fit(X, y)
+    assert classifier.best_iteration < 499
+
+    plain = classifier.to_xgb_classifier()
+    assert type(plain) is XGBClassifier
+    assert plain.best_iteration == classifier.best_iteration
+    np.testing.assert_allclose(plain.predict_proba(X), classifier.predict_proba(X))
+
+
+def test_halving_search_on_n_estimators(synthetic_dataset):
+    """Test halving on n_estimators grows the boosting rounds instead of searching them."""
+    df = encode_binary_columns(synthetic_dataset, BINARY_FEATURES + ["y"])
+    X, y = df.drop(columns=["y"]), df["y"]
+    param_distributions = {
+        "classifier__n_estimators": randint(100, 1000),
+        "classifier__learning_rate": uniform(loc=0.05, scale=0.25),
+        "classifier__max_depth": randint(2, 4),
+    }
+
+    search = make_search(
+        "halving",
+        make_search_pipeline(XGBClassifier(random_state=42)),
+        param_distributions,
+        n_candidates=9,
+        cv=StratifiedKFold(n_splits=2, shuffle=True, random_state=42),
+        halving_resource="n_estimators",
+        n_jobs=1,
+    )
+    search.fit(X, y)
+
+    assert search.n_resources_[0] == MAX_N_ESTIMATORS // 27
+    # n_estimators is set to the budget of each round rather than sampled
+    assert {
+        params["classifier__n_estimators"] for params in search.cv_results_["params"]
+    } == set(search.n_resources_)
+    assert count_fits(search) == (9 + 3 + 1) * 2
+    assert best_n_estimators(search) == search.n_resources_[-1]
+
+
+def test_split_parallelism():
+    """Test search processes and XGBoost threads never oversubscribe the available cores."""
+    assert split_parallelism(64, parallel_fits=500) == (64, 1)
+    # Cores beyond the fits that can run at once go to XGBoost threads
+    assert split_parallelism(64, parallel_fits=10) == (10, 6)
+    assert split_parallelism(64, parallel_fits=500, xgb_threads=4) == (16, 4)
+    assert split_parallelism(64, parallel_fits=500, outer_jobs=8) == (8, 8)
+    assert split_parallelism(2, parallel_fits=500, outer_jobs=4) == (4, 1)
+    assert split_parallelism(8, parallel_fits=500, outer_jobs=2, xgb_threads=2) == (
+        2,
+        2,
+    )
+
+
+def test_checkpoint_size():
+    """Test checkpointed batches hold a whole number of rounds of fits on every worker."""
+    for n_jobs, n_splits in [(4, 5), (8, 5), (10, 5), (6, 4), (1, 3), (3, 3)]:
+        size = checkpoint_size(n_jobs, n_splits)
+        assert size * n_splits % n_jobs == 0
+        assert all(smaller * n_splits % n_jobs for smaller in range(1, size))
+    assert checkpoint_size(4, 5) == 4
+    assert checkpoint_size(10, 5) == 2
+
+
+def test_preprocessing_cache(synthetic_dataset, tmp_path):
+    """Test a cached search fits the preprocessor once per fold, finds the same parameters, and isn't saved."""
+    df = encode_binary_columns(synthetic_dataset, BINARY_FEATURES + ["y"])
+    X, y = df.drop(columns=["y"]), df["y"]
+    param_distributions = {
+        "classifier__n_estimators": randint(10, 50),
+        "classifier__max_depth": randint(2, 4),
+    }
+    preprocessor = CountingColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUMERICAL_FEATURES),
+            (
+                "cat",
+                OneHotEncoder(handle_unknown="ignore", sparse_output=False),
+                CATEGORICAL_FEATURES,
+            ),
+        ],
+        remainder="passthrough",
+    )
+
+    searches = {}
+    for cache_dir in (None, str(tmp_path)):
+        CountingColumnTransformer.fits = 0
+        search = make_search(
+            "random",
+            build_search_pipeline(
+                clone(preprocessor), XGBClassifier(random_state=42), cache_dir
+            ),
+            param_distributions,
+            n_candidates=4,
+            cv=StratifiedKFold(n_splits=2, shuffle=True, random_state=42),
+            n_jobs=1,
+        )
+        search.fit(X, y)
+        searches[cache_dir] = (search, CountingColumnTransformer.fits)
+
+    uncached, uncached_fits = searches[None]
+    cached, cached_fits = searches[str(tmp_path)]
+    # One fit per (candidate, fold) plus the refit, against one per fold plus the refit
+    assert uncached_fits == 4 * 2 + 1
+    assert cached_fits == 2 + 1
+    assert cached.best_params_ == uncached.best_params_
+    assert cached.best_score_ == uncached.best_score_
+
+    pipeline = serving_pipeline(cached.best_estimator_)
+    assert pipeline.memory is None
+    assert str(tmp_path).encode() not in pickle.dumps(pipeline)
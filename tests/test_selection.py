@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from trainer.selection import pareto_front, select_within_budget, serving_cost
+
+
+def make_finalists():
+    return pd.DataFrame(
+        {
+            "cv_roc_auc": [0.93, 0.92, 0.91, 0.90],
+            "latency_p99_ms": [4.0, 1.0, 2.0, 0.5],
+            "booster_mb": [1.2, 0.3, 0.4, 0.2],
+        }
+    )
+
+
+def test_pareto_front():
+    """Test finalists that are worse on score and every cost than another one are off the front."""
+    np.testing.assert_array_equal(
+        pareto_front(make_finalists()), [True, True, False, True]
+    )
+
+
+def test_select_within_budget():
+    """Test the best scoring finalist within the budgets is selected."""
+    finalists = make_finalists()
+
+    assert select_within_budget(finalists) == (0, True)
+    assert select_within_budget(finalists, max_latency_ms=2.0) == (1, True)
+    assert select_within_budget(finalists, max_booster_mb=0.25) == (3, True)
+
+
+def test_select_within_budget_falls_back_to_fastest():
+    """Test the lowest latency finalist is selected when none is within budget."""
+    assert select_within_budget(make_finalists(), max_latency_ms=0.1) == (3, False)
+
+
+def test_serving_cost(synthetic_pipeline, synthetic_dataset):
+    """Test the serving cost is measured on the compiled path, with the booster's size and trees."""
+    cost = serving_cost(
+        synthetic_pipeline, synthetic_dataset.drop(columns=["y"]).head(20)
+    )
+
+    assert cost["backend"] == "compiled"
+    assert 0 < cost["latency_p50_ms"] <= cost["latency_p99_ms"]
+    assert cost["booster_mb"] > 0
+    assert cost["trees"] == 20
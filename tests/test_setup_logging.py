@@ -0,0 +1,75 @@
+import logging
+import threading
+
+from api_server.models import PredictionResult
+from api_server.setup_logging import (
+    LazyJson,
+    SamplingFilter,
+    load_logging_config,
+    setup_logging,
+)
+
+
+class RecordingHandler(logging.Handler):
+    """Handler keeping the formatted messages and the thread that emitted them."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+        self.threads.append(threading.current_thread().name)
+
+
+def test_sampling_filter_rates():
+    """Test a rate of 0 drops every record and a rate of 1 keeps every record."""
+    record = logging.makeLogRecord({"msg": "payload"})
+    assert not SamplingFilter(0.0).filter(record)
+    assert SamplingFilter(1.0).filter(record)
+
+
+def test_lazy_json_is_not_serialized_for_dropped_records(monkeypatch):
+    """Test payloads are only dumped when a record is actually emitted."""
+    dumps = []
+    result = PredictionResult(status="Success", prediction="no", model_version="v1")
+    monkeypatch.setattr(
+        PredictionResult,
+        "model_dump_json",
+        lambda self, **kwargs: dumps.append(1) or "{}",
+    )
+    logger = logging.getLogger("test.lazy_json")
+    logger.addFilter(SamplingFilter(0.0))
+
+    logger.warning("Result: %s", LazyJson(result))
+
+    assert dumps == []
+    assert str(LazyJson(result)) == "{}"
+
+
+def test_queue_logging_config():
+    """Test loggers are routed through a queue handler and sampling filters are attached."""
+    config = load_logging_config(
+        env="staging", queue=True, sample_rates={"app.payload": 0.0}
+    )
+
+    assert config["loggers"]["app"]["handlers"] == ["queue_json_handler"]
+    assert config["handlers"]["queue_json_handler"]["handlers"] == ["json_handler"]
+    assert config["loggers"]["app.payload"]["filters"] == ["sample_app.payload"]
+
+    recorder = RecordingHandler()
+    config["handlers"]["json_handler"] = {"()": lambda: recorder}
+    setup_logging(config)
+    try:
+        logging.getLogger("app").info("kept")
+        logging.getLogger("app.payload").info("dropped")
+    finally:
+        # Closing the queue handler drains the queue before stopping its listener
+        logging.getHandlerByName("queue_json_handler").close()
+        for logger_name in config["loggers"]:
+            logging.getLogger(logger_name).handlers.clear()
+            logging.getLogger(logger_name).filters.clear()
+
+    assert recorder.messages == ["kept"]
+    assert recorder.threads != [threading.current_thread().name]
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+from scipy.stats import loguniform, randint
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import RandomizedSearchCV, StratifiedKFold
+
+from trainer.trials import (
+    CheckpointedRandomizedSearchCV,
+    TrialStore,
+    make_key,
+    summarize_parameter,
+)
+
+
+@pytest.fixture
+def classification_data():
+    """Fixture to provide a small binary classification problem."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] + rng.normal(size=200) > 0).astype(int)
+    return X, y
+
+
+@pytest.fixture
+def trial_store(tmp_path):
+    """Fixture to provide an empty trial store."""
+    store = TrialStore(tmp_path / "trials.sqlite")
+    yield store
+    store.close()
+
+
+class CountingLogisticRegression(LogisticRegression):
+    """LogisticRegression counting its fits (in this process, so only for searches with n_jobs=1)."""
+
+    fits = 0
+
+    def fit(self, X, y, sample_weight=None):
+        type(self).fits += 1
+        return super().fit(X, y, sample_weight)
+
+
+def make_checkpointed_search(trial_store, n_iter, resume=False):
+    CountingLogisticRegression.fits = 0
+    return CheckpointedRandomizedSearchCV(
+        CountingLogisticRegression(),
+        {"C": loguniform(1e-3, 1e2), "max_iter": randint(50, 200)},
+        n_iter=n_iter,
+        scoring="roc_auc",
+        cv=StratifiedKFold(n_splits=3, shuffle=True, random_state=0),
+        random_state=42,
+        n_jobs=1,
+        trial_store=trial_store,
+        search_key="search",
+        resume=resume,
+        checkpoint_size=2,
+    )
+
+
+def test_search_records_trials(trial_store, classification_data):
+    """Test each candidate is recorded with its per-fold results."""
+    search = make_checkpointed_search(trial_store, n_iter=5)
+    search.fit(*classification_data)
+
+    completed = trial_store.completed("search")
+    assert len(completed) == 5
+    for params, mean_score in zip(
+        search.cv_results_["params"], search.cv_results_["mean_test_score"]
+    ):
+        results = completed[make_key(params)]
+        split_scores = [results[f"split{i}_test_score"] for i in range(3)]
+        assert np.mean(split_scores) == pytest.approx(mean_score)
+
+    trials = trial_store.trials("search")
+    assert list(trials["candidate"]) == list(range(5))
+    assert {"C", "max_iter", "mean_score", "mean_fit_time_s"} <= set(trials.columns)
+
+
+def test_search_resumes_completed_trials(trial_store, classification_data):
+    """Test a resumed search only fits the new candidates of the seeded sequence and selects among all of them."""
+    first = make_checkpointed_search(trial_store, n_iter=4)
+    first.fit(*classification_data)
+
+    resumed = make_checkpointed_search(trial_store, n_iter=6, resume=True)
+    resumed.fit(*classification_data)
+
+    # Only the 2 new candidates were fitted, on 3 folds each, and the best one refitted
+    assert CountingLogisticRegression.fits == 2 * 3 + 1
+    assert len(resumed.cv_results_["params"]) == 6
+    assert len(trial_store.completed("search")) == 6
+    assert resumed.cv_results_["params"][:4] == first.cv_results_["params"]
+    np.testing.assert_allclose(
+        resumed.cv_results_["mean_test_score"][:4], first.cv_results_["mean_test_score"]
+    )
+    assert resumed.best_score_ == max(resumed.cv_results_["mean_test_score"])
+
+
+def test_search_resumes_fully_completed_search(trial_store, classification_data):
+    """Test resuming a search whose candidates are all completed still produces its results and best model."""
+    first = make_checkpointed_search(trial_store, n_iter=3)
+    first.fit(*classification_data)
+
+    resumed = make_checkpointed_search(trial_store, n_iter=3, resume=True)
+    resumed.fit(*classification_data)
+
+    # Only the best candidate is refitted
+    assert CountingLogisticRegression.fits == 1
+    assert resumed.best_params_ == first.best_params_
+    assert resumed.best_score_ == pytest.approx(first.best_score_)
+
+
+def test_search_matches_randomized_search(trial_store, classification_data):
+    """Test the checkpointed search evaluates and ranks the same candidates as RandomizedSearchCV."""
+    search = make_checkpointed_search(trial_store, n_iter=5)
+    search.fit(*classification_data)
+    expected = RandomizedSearchCV(
+        LogisticRegression(),
+        search.param_distributions,
+        n_iter=5,
+        scoring="roc_auc",
+        cv=search.cv,
+        random_state=42,
+        n_jobs=1,
+    ).fit(*classification_data)
+
+    assert search.cv_results_["params"] == expected.cv_results_["params"]
+    for key in ("split0_test_score", "mean_test_score", "std_test_score"):
+        np.testing.assert_allclose(search.cv_results_[key], expected.cv_results_[key])
+    np.testing.assert_array_equal(
+        search.cv_results_["rank_test_score"], expected.cv_results_["rank_test_score"]
+    )
+    assert set(search.cv_results_) == set(expected.cv_results_)
+    assert search.best_params_ == expected.best_params_
+    assert search.best_score_ == pytest.approx(expected.best_score_)
+    np.testing.assert_allclose(
+        search.best_estimator_.coef_, expected.best_estimator_.coef_
+    )
+
+
+def test_summarize_parameter(trial_store, classification_data):
+    """Test trials are grouped into quantile ranges of a numeric parameter."""
+    make_checkpointed_search(trial_store, n_iter=8).fit(*classification_data)
+
+    summary = summarize_parameter(trial_store.trials("search"), "C", bins=2)
+
+    assert len(summary) == 2
+    assert summary["trials"].sum() == 8
+    assert {"mean_score", "best_score", "mean_fit_time_s"} <= set(summary.columns)
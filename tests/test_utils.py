@@ -1,5 +1,13 @@
+import os
+
+import numpy as np
 import pytest
-from utils import encode_binary_features
+from utils import (
+    encode_binary_array,
+    encode_binary_columns,
+    encode_binary_features,
+    get_available_cpu_count,
+)
 
 
 import pandas as pd
@@ -63,3 +71,53 @@ def test_encode_binary_features_no_binary_columns(sample_dataframe):
             [float("nan"), float("nan"), float("nan"), float("nan")], name="feature_c"
         ),
     )
+
+
+@pytest.mark.parametrize("dtype", ["str", "object", "category"])
+def test_encode_binary_columns(sample_dataframe, dtype):
+    """Test binary features are encoded to int8 without modifying the input, whatever their dtype."""
+    df = sample_dataframe.astype({"feature_a": dtype, "feature_b": dtype})
+    encoded = encode_binary_columns(df, ["feature_a", "feature_b"])
+
+    assert encoded["feature_a"].dtype == np.int8
+    assert encoded["feature_a"].tolist() == [1, 0, 1, 0]
+    assert encoded["feature_b"].tolist() == [0, 1, 0, 1]
+    pd.testing.assert_series_equal(
+        df["feature_a"], sample_dataframe["feature_a"].astype(dtype)
+    )
+
+
+def test_encode_binary_columns_unknown_policies(sample_dataframe):
+    """Test values other than yes/no are rejected, encoded as missing, or treated as no."""
+    df = sample_dataframe.assign(feature_a=["yes", "maybe", None, "no"])
+
+    with pytest.raises(ValueError, match="feature_a.*maybe"):
+        encode_binary_columns(df, ["feature_a"])
+
+    missing = encode_binary_columns(df, ["feature_a"], unknown="missing")
+    np.testing.assert_array_equal(missing["feature_a"], [1.0, np.nan, np.nan, 0.0])
+
+    as_no = encode_binary_columns(df, ["feature_a"], unknown="no")
+    assert as_no["feature_a"].tolist() == [1, 0, 0, 0]
+
+
+def test_encode_binary_columns_missing_column(sample_dataframe):
+    """Test a binary feature that is not a column raises instead of being skipped."""
+    with pytest.raises(KeyError, match="non_existent_feature"):
+        encode_binary_columns(sample_dataframe, ["feature_a", "non_existent_feature"])
+
+
+def test_encode_binary_array():
+    """Test the NumPy fast path on a single row of binary features."""
+    row = np.array(["yes", "no", "yes"], dtype=object)
+    assert encode_binary_array(row).tolist() == [1, 0, 1]
+    assert encode_binary_array(row).dtype == np.int8
+
+    with pytest.raises(ValueError, match="maybe"):
+        encode_binary_array(np.array(["maybe"], dtype=object))
+    assert np.isnan(encode_binary_array(np.array(["maybe"]), unknown="missing")[0])
+
+
+def test_get_available_cpu_count():
+    """Test the available CPU count is positive and bounded by the machine's CPUs."""
+    assert 1 <= get_available_cpu_count() <= os.cpu_count()